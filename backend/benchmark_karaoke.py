@@ -0,0 +1,120 @@
+# Salve como: backend/benchmark_karaoke.py
+# Benchmark do rasterizador de karaokê: versão antiga (re-mede tudo por palavra, contorno com
+# offsets e frame inteiro redesenhado) x incremental (sprites + repintura só da palavra ativa).
+#
+# Uso (a partir da raiz do repositório):
+#   python backend/benchmark_karaoke.py [n_segmentos] [perfil]
+import sys
+import time
+import numpy as np
+from PIL import Image, ImageDraw
+
+from main import SubtitleGenerator, ASPECT_RATIOS, load_font, text_width, segment_layout
+
+# --- CONFIGURAÇÃO ---
+N_SEGMENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 60   # ~600 palavras: roteiro médio
+PROFILE = sys.argv[2] if len(sys.argv) > 2 else "balanced"
+WORDS_PER_SEGMENT = 10
+WORD_DURATION = 0.32
+
+TEXT = ("a história esquecida deste império começa com um mistério que ninguém conseguiu "
+        "explicar durante séculos até que arqueólogos encontraram documentos escondidos "
+        "sob as ruínas de uma cidade perdida no deserto").split()
+
+def synthetic_segments(n_segments):
+    segments, t = [], 0.0
+    for s in range(n_segments):
+        words = []
+        for k in range(WORDS_PER_SEGMENT):
+            word = TEXT[(s * WORDS_PER_SEGMENT + k) % len(TEXT)]
+            words.append({"word": word, "start": round(t, 3), "end": round(t + WORD_DURATION, 3)})
+            t += WORD_DURATION
+        segments.append({"words": words})
+    return segments
+
+def legacy_karaoke(gen, segments, video_w, video_h):
+    """Rasterizador anterior (reproduzido para comparação)"""
+    style = gen.karaoke_style(video_w, video_h)
+    font_normal, font_large = style["font_normal"], style["font_large"]
+    base_font_size, pop_font_size = style["base_font_size"], style["pop_font_size"]
+    stroke_width, SPACE_BUFFER = style["stroke_width"], style["space_buffer"]
+    overlays = []
+    for segment in segments:
+        all_words = segment['words']
+        dummy_draw = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
+        words = [w['word'].strip() for w in all_words]
+        lines, current_line, current_w = [], [], 0
+        space_w = dummy_draw.textlength(" ", font=font_normal) + SPACE_BUFFER
+        for word in words:
+            word_w = dummy_draw.textlength(word, font=font_normal)
+            if current_w + word_w <= style["max_text_width"]:
+                current_line.append(word)
+                current_w += word_w + space_w
+            else:
+                if current_line: lines.append(current_line)
+                current_line, current_w = [word], word_w + space_w
+        if current_line: lines.append(current_line)
+        line_height = base_font_size * 1.6
+        start_y = max(style["margin_y"], (video_h - len(lines) * line_height) / 2)
+
+        for i in range(len(words)):
+            img = Image.new('RGBA', (video_w, video_h), (0, 0, 0, 0))
+            draw = ImageDraw.Draw(img)
+            current_y, word_index = start_y, 0
+            for line in lines:
+                line_total_w = sum(draw.textlength(w, font=font_normal) for w in line) + (len(line) - 1) * space_w
+                current_x = (video_w - line_total_w) / 2
+                for word_txt in line:
+                    if word_index > i: break
+                    is_active = (word_index == i)
+                    font = font_large if is_active else font_normal
+                    color = style["highlight_color"] if is_active else style["text_color"]
+                    normal_w = draw.textlength(word_txt, font=font_normal)
+                    draw_x, draw_y = current_x, current_y
+                    if is_active:
+                        large_w = draw.textlength(word_txt, font=font_large)
+                        draw_x -= (large_w - normal_w) / 2
+                        draw_y -= (pop_font_size - base_font_size) / 1.3
+                    for adj_x in range(-stroke_width, stroke_width+1):
+                        for adj_y in range(-stroke_width, stroke_width+1):
+                            if abs(adj_x) >= stroke_width-1 or abs(adj_y) >= stroke_width-1:
+                                draw.text((draw_x+adj_x, draw_y+adj_y), word_txt, font=font, fill=style["stroke_color"])
+                    draw.text((draw_x, draw_y), word_txt, font=font, fill=color)
+                    current_x += normal_w + space_w
+                    word_index += 1
+                current_y += line_height
+            overlays.append(np.array(img))
+    return overlays
+
+def run():
+    video_w, video_h = ASPECT_RATIOS["horizontal"]["resolutions"][PROFILE]
+    segments = synthetic_segments(N_SEGMENTS)
+    n_words = N_SEGMENTS * WORDS_PER_SEGMENT
+    gen = SubtitleGenerator()
+    print(f"🧪 Karaokê: {N_SEGMENTS} segmentos, {n_words} palavras, {video_w}x{video_h}")
+
+    started = time.perf_counter()
+    legacy = legacy_karaoke(gen, segments, video_w, video_h)
+    legacy_s = time.perf_counter() - started
+    legacy_mb = sum(a.nbytes for a in legacy) / 1024 / 1024
+    del legacy
+
+    # Frio: caches de fonte/larguras/layout vazios (primeira cena do processo)
+    for cache in (load_font, text_width, segment_layout):
+        cache.cache_clear()
+    started = time.perf_counter()
+    overlays = gen.rasterize_karaoke(segments, video_w, video_h)
+    cold_s = time.perf_counter() - started
+    new_mb = sum(a.nbytes for a, _, _, _ in overlays) / 1024 / 1024
+
+    # Quente: mesmo roteiro de novo (re-render / reprocess)
+    started = time.perf_counter()
+    gen.rasterize_karaoke(segments, video_w, video_h)
+    warm_s = time.perf_counter() - started
+
+    print(f"   Antigo:      {legacy_s:7.2f}s  ({legacy_mb:.0f}MB)")
+    print(f"   Incremental: {cold_s:7.2f}s  ({new_mb:.0f}MB)  -> {legacy_s / cold_s:.1f}x")
+    print(f"   Quente:      {warm_s:7.2f}s  -> {legacy_s / warm_s:.1f}x")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,171 @@
+# Salve como: backend/fake_replicate_server.py
+# Servidor Replicate falso (API de predictions) para desenvolver/testar o caminho de imagens
+# sem gastar crédito: cria predictions, evolui starting -> processing -> succeeded depois de
+# FAKE_REPLICATE_LATENCY segundos e serve um PNG como output.
+#
+# Uso (a partir da raiz do repositório):
+#   python backend/fake_replicate_server.py [porta]
+#   E no servidor: REPLICATE_API_BASE=http://127.0.0.1:8765/v1 REPLICATE_API_KEY=fake
+#
+# Demonstração (sobe o servidor e gera N imagens em paralelo com o código do main.py):
+#   python backend/fake_replicate_server.py 8765 12
+#
+# Falhas simuladas:
+#   FAKE_REPLICATE_BROKEN=flux-pro     -> 422 ao criar predictions desses modelos/versões (fallback da cadeia)
+#   FAKE_REPLICATE_RPS=5               -> 429 + Retry-After acima de N criações por segundo
+#   FAKE_REPLICATE_FAIL_RATE=0.2       -> fração das predictions que terminam "failed"
+import io
+import os
+import sys
+import time
+import uuid
+import random
+import asyncio
+import hashlib
+import tempfile
+import threading
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from PIL import Image
+
+# --- CONFIGURAÇÃO ---
+PORT = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+DEMO_SCENES = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+LATENCY = float(os.getenv("FAKE_REPLICATE_LATENCY", "3"))
+BROKEN_MODELS = {m for m in os.getenv("FAKE_REPLICATE_BROKEN", "").split(",") if m}
+MAX_CREATES_PER_SECOND = float(os.getenv("FAKE_REPLICATE_RPS", "0"))   # 0 = sem 429
+FAIL_RATE = float(os.getenv("FAKE_REPLICATE_FAIL_RATE", "0"))
+IMAGE_SIZE = (320, 180)
+
+app = FastAPI()
+predictions = {}      # id -> prediction (+ campos internos com "_")
+creates = []          # instantes das criações (limite de taxa)
+stats = {"created": 0, "polls": 0, "cancels": 0, "rate_limited": 0, "max_in_flight": 0}
+
+def base_url(request):
+    return str(request.base_url).rstrip("/")
+
+def public(prediction):
+    return {k: v for k, v in prediction.items() if not k.startswith("_")}
+
+def advance(prediction, request):
+    """Evolui o status conforme o tempo desde a criação"""
+    if prediction["status"] in ("succeeded", "failed", "canceled"):
+        return prediction
+    elapsed = time.time() - prediction["_created"]
+    if elapsed >= LATENCY:
+        if prediction["_fail"]:
+            prediction.update(status="failed", error="fake: falha simulada")
+        else:
+            prediction.update(status="succeeded", output=[f"{base_url(request)}/files/{prediction['id']}.png"])
+    elif elapsed >= LATENCY / 3:
+        prediction["status"] = "processing"
+    return prediction
+
+def in_flight():
+    return sum(1 for p in predictions.values() if p["status"] in ("starting", "processing"))
+
+def create(request, model, body):
+    now = time.time()
+    creates[:] = [t for t in creates if now - t < 1.0]
+    if MAX_CREATES_PER_SECOND and len(creates) >= MAX_CREATES_PER_SECOND:
+        stats["rate_limited"] += 1
+        return JSONResponse({"detail": "Request was throttled."}, status_code=429, headers={"Retry-After": "1"})
+    if any(broken in model for broken in BROKEN_MODELS):
+        return JSONResponse({"detail": f"The specified version does not exist: {model}"}, status_code=422)
+    if not body.get("input", {}).get("prompt"):
+        return JSONResponse({"detail": "input.prompt is required"}, status_code=422)
+
+    creates.append(now)
+    prediction_id = uuid.uuid4().hex[:12]
+    url = f"{base_url(request)}/v1/predictions/{prediction_id}"
+    predictions[prediction_id] = {
+        "id": prediction_id, "model": model, "version": body.get("version"),
+        "input": body["input"], "status": "starting", "output": None, "error": None,
+        "urls": {"get": url, "cancel": f"{url}/cancel"},
+        "_created": now, "_fail": random.random() < FAIL_RATE,
+    }
+    stats["created"] += 1
+    stats["max_in_flight"] = max(stats["max_in_flight"], in_flight())
+    return JSONResponse(public(predictions[prediction_id]), status_code=201)
+
+@app.post("/v1/predictions")
+async def create_versioned(request: Request):
+    body = await request.json()
+    return create(request, f"version:{body.get('version', '')[:12]}", body)
+
+@app.post("/v1/models/{owner}/{name}/predictions")
+async def create_official(owner: str, name: str, request: Request):
+    return create(request, f"{owner}/{name}", await request.json())
+
+@app.get("/v1/predictions/{prediction_id}")
+async def get_prediction(prediction_id: str, request: Request):
+    prediction = predictions.get(prediction_id)
+    if prediction is None:
+        return JSONResponse({"detail": "Not found."}, status_code=404)
+    stats["polls"] += 1
+    return public(advance(prediction, request))
+
+@app.post("/v1/predictions/{prediction_id}/cancel")
+async def cancel_prediction(prediction_id: str, request: Request):
+    prediction = predictions.get(prediction_id)
+    if prediction is None:
+        return JSONResponse({"detail": "Not found."}, status_code=404)
+    if advance(prediction, request)["status"] in ("starting", "processing"):
+        prediction["status"] = "canceled"
+        stats["cancels"] += 1
+    return public(prediction)
+
+@app.get("/files/{prediction_id}.png")
+async def get_file(prediction_id: str):
+    # Cor derivada do id: imagens diferentes por cena, sem depender de fontes
+    color = tuple(hashlib.md5(prediction_id.encode()).digest()[:3])
+    buffer = io.BytesIO()
+    Image.new("RGB", IMAGE_SIZE, color).save(buffer, format="PNG")
+    return Response(buffer.getvalue(), media_type="image/png")
+
+@app.get("/stats")
+async def get_stats():
+    return {**stats, "in_flight": in_flight()}
+
+def serve_in_background():
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+def run_demo(n_scenes):
+    """N cenas pedindo imagem ao mesmo tempo pelo caminho real (attempt_image_generation_with_replicate)"""
+    serve_in_background()
+    # Antes de importar o main: REPLICATE_API_BASE é lido na importação
+    os.environ["REPLICATE_API_BASE"] = f"http://127.0.0.1:{PORT}/v1"
+    os.environ.setdefault("REPLICATE_API_KEY", "fake")
+    import main
+
+    async def scenes():
+        out_dir = tempfile.mkdtemp(prefix="fake_replicate_")
+        started = time.time()
+        results = await asyncio.gather(*[
+            main.attempt_image_generation_with_replicate(
+                "flux_pro", f"cena {k}: ruínas no deserto", 1280, 720, "16:9", 42, os.path.join(out_dir, f"scene{k}.png")
+            )
+            for k in range(n_scenes)
+        ])
+        elapsed = time.time() - started
+        ok = [r for r in results if r]
+        print(f"\n🧪 {len(ok)}/{n_scenes} imagens em {elapsed:.1f}s (latência simulada {LATENCY:.1f}s por prediction)")
+        print(f"   Modelos: {sorted({model for _, model in ok})}")
+        print(f"   Servidor: {stats}")
+        await main.close_http_clients()
+
+    asyncio.run(scenes())
+
+if __name__ == "__main__":
+    if DEMO_SCENES:
+        run_demo(DEMO_SCENES)
+    else:
+        print(f"🧪 Replicate falso em http://127.0.0.1:{PORT}/v1 (latência {LATENCY:.1f}s)")
+        uvicorn.run(app, host="127.0.0.1", port=PORT, log_level="warning")
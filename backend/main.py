@@ -3,29 +3,38 @@ import json
 import re
 import time
 import asyncio
+import hashlib
+import shutil
+import sqlite3
+import threading
 import subprocess
+import uuid
+import functools
+import contextlib
 import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 import traceback
 from typing import AsyncGenerator
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 import edge_tts
-import requests
+import httpx
+from urllib.parse import quote
 from duckduckgo_search import DDGS
 import PIL.Image
 import numpy as np
-import whisper
 from moviepy.config import change_settings
 from moviepy.editor import *
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
 from PIL import Image, ImageDraw, ImageFont
 from fpdf import FPDF
 import random
+from collections import deque
 
 # ==========================================
 # OTIMIZAÇÃO #7: CONFIGURAÇÕES GLOBAIS
@@ -70,6 +79,9 @@ PERFORMANCE_PROFILES = {
         "threads": 1,
         "whisper_model": "medium",
         "enable_subtitles": False,
+        "subtitle_backend": "moviepy",  # "moviepy" (PIL + composição) ou "ass" (libass no encode; SUBTITLE_BACKEND=ass)
+        "render_engine": "moviepy",  # "moviepy" (frames em Python) ou "ffmpeg" (filtergraph único; RENDER_ENGINE=ffmpeg)
+        "single_pass": False,  # documentário inteiro num só filtergraph/encode (sem stitch nem passe de compatibilidade)
     },
     "low": {
         "description": "Hardware modesto (padrão recomendado)",
@@ -81,6 +93,9 @@ PERFORMANCE_PROFILES = {
         "threads": max(1, multiprocessing.cpu_count() // 2),
         "whisper_model": "medium",
         "enable_subtitles": True,
+        "subtitle_backend": "moviepy",
+        "render_engine": "moviepy",
+        "single_pass": False,
     },
     "balanced": {
         "description": "Balanceado (CPUs 4+ núcleos)",
@@ -92,6 +107,9 @@ PERFORMANCE_PROFILES = {
         "threads": max(2, multiprocessing.cpu_count() - 1),
         "whisper_model": "medium",
         "enable_subtitles": True,
+        "subtitle_backend": "moviepy",
+        "render_engine": "moviepy",
+        "single_pass": False,
     },
     "quality": {
         "description": "Máxima qualidade (hardware potente)",
@@ -103,6 +121,9 @@ PERFORMANCE_PROFILES = {
         "threads": multiprocessing.cpu_count() - 1,
         "whisper_model": "medium",
         "enable_subtitles": True,
+        "subtitle_backend": "moviepy",
+        "render_engine": "moviepy",
+        "single_pass": False,
     }
 }
 
@@ -154,6 +175,9 @@ def detect_optimal_profile():
 
 CURRENT_PROFILE = os.getenv("PERFORMANCE_PROFILE", detect_optimal_profile())
 SETTINGS = PERFORMANCE_PROFILES[CURRENT_PROFILE].copy()
+SETTINGS['subtitle_backend'] = os.getenv("SUBTITLE_BACKEND", SETTINGS['subtitle_backend'])
+SETTINGS['render_engine'] = os.getenv("RENDER_ENGINE", SETTINGS['render_engine'])
+SETTINGS['single_pass'] = os.getenv("SINGLE_PASS_RENDER", str(SETTINGS['single_pass'])).lower() in ("1", "true", "yes")
 
 # Aspect ratio padrão (será sobrescrito via parâmetro da API)
 CURRENT_ASPECT_RATIO = "horizontal"
@@ -179,7 +203,8 @@ if os.path.exists(caminho_magick):
 
 load_dotenv()
 
-PROJECTS_DIR = "backend/projects"
+# Em render distribuído, cada host aponta para a mesma pasta compartilhada (montagem pode diferir)
+PROJECTS_DIR = os.getenv("PROJECTS_DIR", "backend/projects")
 os.makedirs(PROJECTS_DIR, exist_ok=True)
 
 # --- CHAVES ---
@@ -370,10 +395,25 @@ app.add_middleware(
 )
 app.mount("/projects", StaticFiles(directory=PROJECTS_DIR), name="projects")
 
-# --- MODELOS WHISPER ---
-print(f"⏳ Carregando modelo Whisper ({SETTINGS['whisper_model']})...")
-whisper_model = whisper.load_model(SETTINGS['whisper_model'])
-print(f"✅ Whisper {SETTINGS['whisper_model']} Carregado!")
+# --- MODELOS WHISPER (carregamento sob demanda) ---
+# Nada de torch no import: servidor, reprocess.py e recover_smart.py sobem em segundos,
+# e jobs sem legenda nunca carregam o modelo.
+WHISPER_MODELS = ["tiny", "base", "small", "medium", "large", "turbo"]
+WHISPER_WARMUP = os.getenv("WHISPER_WARMUP", "1") == "1"
+
+_whisper_models = {}
+_whisper_lock = threading.Lock()
+
+def get_whisper_model(name=None):
+    """Modelo Whisper carregado no primeiro uso (um por nome, por processo)"""
+    name = name or SETTINGS['whisper_model']
+    with _whisper_lock:
+        if name not in _whisper_models:
+            import whisper
+            print(f"⏳ Carregando modelo Whisper ({name})...")
+            _whisper_models[name] = whisper.load_model(name)
+            print(f"✅ Whisper {name} Carregado!")
+        return _whisper_models[name]
 
 # --- UTILITÁRIOS ---
 def clean_text_for_tts(text):
@@ -388,6 +428,417 @@ def clean_text_for_tts(text):
 async def send_log(msg: str):
     return f"data: {json.dumps({'log': msg})}\n\n"
 
+# ==========================================
+# OTIMIZAÇÃO #12: CACHE EM DISCO (CONTEÚDO + LRU)
+# ==========================================
+
+CACHE_DIR = os.getenv("CACHE_DIR", "backend/cache")
+os.makedirs(CACHE_DIR, exist_ok=True)
+
+def content_hash(*parts):
+    """sha256 estável de valores JSON-serializáveis (chave de cache)"""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(json.dumps(part, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        h.update(b"\0")
+    return h.hexdigest()
+
+def file_hash(path):
+    """sha256 do conteúdo de um arquivo"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+class DiskLRUCache:
+    """
+    Cache de arquivos endereçado por chave (hash), compartilhado entre projetos.
+    Recência = mtime da entrada (atualizado a cada hit); despeja as mais antigas
+    quando o total passa de max_bytes. O total é mantido em memória a cada gravação;
+    o diretório só é varrido para despejar ou na recontagem periódica.
+    """
+    # Outros processos (pool de render, workers) gravam no mesmo diretório: recontagem periódica
+    RESCAN_INTERVAL = 300
+
+    def __init__(self, name, max_bytes, ext, use_hardlinks=False):
+        self.name = name
+        self.dir = os.path.join(CACHE_DIR, name)
+        self.max_bytes = max_bytes
+        self.ext = ext
+        # Hard link só é seguro para arquivos que o projeto nunca reescreve no lugar
+        self.use_hardlinks = use_hardlinks
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._total = None       # bytes no diretório (None = varrer de novo)
+        self._scanned_at = 0.0
+        os.makedirs(self.dir, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.dir, key[:2], key + self.ext)
+
+    def contains(self, key):
+        return os.path.exists(self.path_for(key))
+
+    def lookup(self, key):
+        """Caminho da entrada (marcando uso recente) ou None em miss"""
+        src = self.path_for(key)
+        try:
+            os.utime(src)
+        except FileNotFoundError:
+            with self._lock: self.misses += 1
+            return None
+        with self._lock: self.hits += 1
+        return src
+
+    def fetch(self, key, dest_path):
+        """Coloca a entrada em dest_path. Retorna True em hit, False em miss"""
+        src = self.path_for(key)
+        try:
+            os.utime(src)  # marca como usada recentemente
+            if os.path.exists(dest_path):
+                os.remove(dest_path)
+            if self.use_hardlinks:
+                try:
+                    os.link(src, dest_path)
+                except OSError:
+                    shutil.copyfile(src, dest_path)  # outro volume / FS sem hard link
+            else:
+                shutil.copyfile(src, dest_path)
+        except FileNotFoundError:
+            with self._lock: self.misses += 1
+            return False
+        with self._lock: self.hits += 1
+        return True
+
+    def store(self, key, src_path):
+        """Copia src_path para o cache (escrita atômica) e aplica o orçamento de bytes"""
+        dest = self.path_for(key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = f"{dest}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(src_path, tmp)
+        self._commit(tmp, dest)
+
+    def store_bytes(self, key, data):
+        """Grava o conteúdo diretamente no cache (escrita atômica)"""
+        dest = self.path_for(key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = f"{dest}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        self._commit(tmp, dest)
+
+    def _commit(self, tmp, dest):
+        """Publica a entrada e atualiza o total; só despeja quando passa do orçamento"""
+        try:
+            old_size = os.path.getsize(dest)
+        except FileNotFoundError:
+            old_size = 0
+        new_size = os.path.getsize(tmp)
+        os.replace(tmp, dest)
+        with self._lock:
+            if self._total is None or time.time() - self._scanned_at > self.RESCAN_INTERVAL:
+                self._total = None
+            else:
+                self._total += new_size - old_size
+            over = self._total is None or self._total > self.max_bytes
+        if over:
+            self.evict()
+
+    def _scan(self):
+        """[(mtime, tamanho, caminho)] e total do diretório (chamar com o lock)"""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.dir):
+            for name in files:
+                if not name.endswith(self.ext): continue
+                full = os.path.join(root, name)
+                try:
+                    st = os.stat(full)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, full))
+                total += st.st_size
+        self._total = total
+        self._scanned_at = time.time()
+        return entries, total
+
+    def evict(self):
+        """Remove entradas menos usadas até caber em max_bytes"""
+        with self._lock:
+            entries, total = self._scan()
+            if total <= self.max_bytes:
+                return
+            entries.sort()
+            for _, size, full in entries:
+                if total <= self.max_bytes: break
+                try:
+                    os.remove(full)
+                    total -= size
+                    self.evictions += 1
+                except OSError:
+                    pass
+            self._total = total
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "max_mb": round(self.max_bytes / (1024*1024), 1)
+        }
+
+# ==========================================
+# OTIMIZAÇÃO #17: FILA DE TAREFAS PERSISTENTE (SQLITE)
+# ==========================================
+
+TASK_QUEUE_PATH = os.getenv("TASK_QUEUE_PATH", os.path.join(CACHE_DIR, "tasks.sqlite3"))
+# WAL precisa de memória compartilhada entre processos: em disco de rede (NFS/SMB) use DELETE
+TASK_QUEUE_JOURNAL_MODE = os.getenv("TASK_QUEUE_JOURNAL_MODE", "WAL")
+TASK_MAX_ATTEMPTS = int(os.getenv("TASK_MAX_ATTEMPTS", "3"))   # re-despachos por lease vencido antes de falhar
+
+class TaskQueue:
+    """
+    Fila de tarefas em SQLite compartilhada entre processos (API, workers de render e
+    de transcrição). claim() é atômico (BEGIN IMMEDIATE): cada tarefa vai para um só worker.
+    Com lease, o worker renova a posse via heartbeat(); lease vencido (worker morto/travado)
+    devolve a tarefa para o próximo claim, até TASK_MAX_ATTEMPTS tentativas.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    result TEXT,
+                    error TEXT,
+                    worker TEXT,
+                    created_at REAL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_kind_status ON tasks (kind, status, id)")
+            # Colunas de lease (bancos criados antes delas)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(tasks)")}
+            for column, ddl in (("lease_until", "REAL"), ("heartbeat_at", "REAL"), ("attempts", "INTEGER NOT NULL DEFAULT 0")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE tasks ADD COLUMN {column} {ddl}")
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute(f"PRAGMA journal_mode={TASK_QUEUE_JOURNAL_MODE}")
+        return conn
+
+    def enqueue(self, kind, payload):
+        conn = self._connect()
+        try:
+            cur = conn.execute(
+                "INSERT INTO tasks (kind, payload, created_at) VALUES (?, ?, ?)",
+                (kind, json.dumps(payload), time.time())
+            )
+            return cur.lastrowid
+        finally:
+            conn.close()
+
+    def claim(self, kind, worker_id, limit=1, lease=None):
+        """
+        Pega até `limit` tarefas pendentes (ou com lease vencido). Retorna [(task_id, payload)].
+        lease (s): prazo para o próximo heartbeat(); sem lease a tarefa nunca é re-despachada.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            # Lease vencido sem tentativas sobrando: falha definitiva
+            conn.execute(
+                "UPDATE tasks SET status = 'failed', error = 'lease vencido (worker morto?) em todas as tentativas', finished_at = ? "
+                "WHERE kind = ? AND status = 'running' AND lease_until < ? AND attempts >= ?",
+                (now, kind, now, TASK_MAX_ATTEMPTS)
+            )
+            rows = conn.execute(
+                "SELECT id, payload, status FROM tasks WHERE kind = ? "
+                "AND (status = 'pending' OR (status = 'running' AND lease_until < ?)) ORDER BY id LIMIT ?",
+                (kind, now, limit)
+            ).fetchall()
+            for task_id, _, previous in rows:
+                if previous == "running":
+                    print(f"♻️ Tarefa {task_id} ({kind}) re-despachada: lease vencido")
+                conn.execute(
+                    "UPDATE tasks SET status = 'running', worker = ?, started_at = ?, heartbeat_at = ?, "
+                    "lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                    (worker_id, now, now, now + lease if lease else None, task_id)
+                )
+            conn.execute("COMMIT")
+            return [(task_id, json.loads(payload)) for task_id, payload, _ in rows]
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def heartbeat(self, task_id, worker_id, lease):
+        """Renova o lease. False = a tarefa não é mais deste worker (re-despachada/cancelada)"""
+        conn = self._connect()
+        try:
+            now = time.time()
+            return conn.execute(
+                "UPDATE tasks SET heartbeat_at = ?, lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (now, now + lease, task_id, worker_id)
+            ).rowcount == 1
+        finally:
+            conn.close()
+
+    def complete(self, task_id, result, worker_id=None):
+        return self._finish(task_id, "done", result=json.dumps(result), worker_id=worker_id)
+
+    def fail(self, task_id, error, worker_id=None):
+        return self._finish(task_id, "failed", error=str(error)[:2000], worker_id=worker_id)
+
+    def cancel(self, task_id):
+        """Coordenador desistiu da tarefa: ninguém mais deve pegá-la (e o resultado em curso é descartado)"""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "UPDATE tasks SET status = 'cancelled', error = 'cancelada pelo coordenador', finished_at = ?, lease_until = NULL "
+                "WHERE id = ? AND status IN ('pending', 'running')",
+                (time.time(), task_id)
+            ).rowcount == 1
+        finally:
+            conn.close()
+
+    def _finish(self, task_id, status, result=None, error=None, worker_id=None):
+        """Com worker_id, só grava se a tarefa ainda for dele (resultado de worker "zumbi" é descartado)"""
+        conn = self._connect()
+        try:
+            query = "UPDATE tasks SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL WHERE id = ?"
+            args = [status, result, error, time.time(), task_id]
+            if worker_id:
+                query += " AND worker = ? AND status = 'running'"
+                args.append(worker_id)
+            return conn.execute(query, args).rowcount == 1
+        finally:
+            conn.close()
+
+    def get(self, task_id):
+        """(status, result, error) da tarefa"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT status, result, error FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return None, None, "tarefa inexistente"
+        status, result, error = row
+        return status, json.loads(result) if result else None, error
+
+    def find(self, kind, field, value):
+        """Tarefa mais recente cujo payload tem payload[field] == value: (task_id, status) ou None"""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT id, status FROM tasks WHERE kind = ? AND json_extract(payload, ?) = ? ORDER BY id DESC LIMIT 1",
+                (kind, f"$.{field}", value)
+            ).fetchone()
+        finally:
+            conn.close()
+
+    def count(self, kind, status="pending"):
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM tasks WHERE kind = ? AND status = ?", (kind, status)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def list(self, kind, limit=50):
+        """Tarefas mais recentes do tipo: [(task_id, status, payload, created_at, finished_at)]"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT id, status, payload, created_at, finished_at FROM tasks WHERE kind = ? ORDER BY id DESC LIMIT ?",
+                (kind, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [(task_id, status, json.loads(payload), created, finished) for task_id, status, payload, created, finished in rows]
+
+    def wait(self, task_id, timeout, poll_interval=0.25, pickup_timeout=None):
+        """
+        Bloqueia até a tarefa terminar (usar fora do event loop). Levanta erro em falha/timeout.
+        pickup_timeout: desiste antes se nenhum worker pegou a tarefa nesse tempo.
+        """
+        started = time.time()
+        deadline = started + timeout
+        while time.time() < deadline:
+            status, result, error = self.get(task_id)
+            if status == "done":
+                return result
+            if status in ("failed", "cancelled", None):
+                raise RuntimeError(f"Tarefa {task_id} falhou: {error}")
+            if status == "pending" and pickup_timeout is not None and time.time() - started > pickup_timeout:
+                raise TimeoutError(f"Tarefa {task_id}: nenhum worker pegou em {pickup_timeout:.0f}s")
+            time.sleep(poll_interval)
+        raise TimeoutError(f"Tarefa {task_id} sem resposta após {timeout:.0f}s")
+
+task_queue = TaskQueue(TASK_QUEUE_PATH)
+
+class LeaseHeartbeat:
+    """
+    Mantém o lease das tarefas enquanto o worker trabalha (thread em background).
+    Tarefas cuja posse foi perdida ficam em .lost: o resultado delas não deve ser gravado.
+    """
+    def __init__(self, task_ids, worker_id, lease):
+        self.task_ids = list(task_ids)
+        self.worker_id = worker_id
+        self.lease = lease
+        self.lost = set()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.lease / 3):
+            for task_id in self.task_ids:
+                try:
+                    if not task_queue.heartbeat(task_id, self.worker_id, self.lease):
+                        self.lost.add(task_id)
+                except Exception as e:
+                    print(f"⚠️ Heartbeat falhou para a tarefa {task_id}: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+def shared_path(path):
+    """Caminho para outro host: relativo a PROJECTS_DIR quando o arquivo está lá dentro"""
+    try:
+        rel = os.path.relpath(os.path.abspath(path), os.path.abspath(PROJECTS_DIR))
+    except ValueError:  # outro drive no Windows
+        return os.path.abspath(path)
+    return os.path.abspath(path) if rel.startswith("..") else rel.replace("\\", "/")
+
+def local_path(path):
+    """Inverso de shared_path no host que recebe a tarefa"""
+    return path if os.path.isabs(path) else os.path.join(PROJECTS_DIR, path)
+
+# Narração: mesma voz + estilo + texto limpo => mesmo mp3, em qualquer projeto
+tts_cache = DiskLRUCache("tts", int(os.getenv("TTS_CACHE_MAX_MB", "2048")) * 1024 * 1024, ".mp3")
+# Tempos por palavra do TTS, na mesma chave do áudio
+tts_alignment_cache = DiskLRUCache("tts_words", int(os.getenv("TTS_CACHE_MAX_MB", "2048")) * 1024 * 1024 // 20, ".json")
+
 # ==========================================
 # OTIMIZAÇÃO #6: STITCH OTIMIZADO
 # ==========================================
@@ -439,7 +890,29 @@ def stitch_video_files(video_files, output_path):
     with open(list_file, 'r', encoding='utf-8') as f:
         print(f"Conteúdo de files.txt:\n{f.read()}")
     
-    # PASSO 1: Tenta stream copy direto (RÁPIDO)
+    # Concat demuxer com -c copy só é seguro se todas as cenas têm os mesmos parâmetros
+    compatible, reason = concat_compatible(valid_files)
+    print(f"🔎 Stream copy: {'possível' if compatible else 'incompatível'} ({reason})")
+
+    try:
+        # PASSO 1: Stream copy direto (RÁPIDO). Copiar cenas diferentes "funciona" mas gera
+        # arquivo quebrado: nesse caso vai direto ao re-encode
+        if compatible:
+            if concat_stream_copy(list_file, output_path):
+                return True
+        else:
+            print(f"⏭️ Pulando stream copy: cenas incompatíveis ({reason})")
+        
+        # PASSO 2: Fallback com re-encoding otimizado e compatível
+        print("\n🔄 Tentando re-encoding com codec compatível...")
+        return concat_reencode(list_file, output_path)
+    
+    finally:
+        if os.path.exists(list_file):
+            os.remove(list_file)
+
+def concat_stream_copy(list_file, output_path):
+    """Concat demuxer com -c copy. Retorna False se o ffmpeg falhar"""
     print("\n🔄 Tentando concatenação com stream copy...")
     cmd_fast = [
         "ffmpeg", "-y", "-f", "concat", "-safe", "0",
@@ -448,79 +921,219 @@ def stitch_video_files(video_files, output_path):
         "-movflags", "+faststart",
         output_path
     ]
-    
     try:
-        result = subprocess.run(cmd_fast, check=True, capture_output=True, text=True)
-        print("✅ Stream copy SUCESSO")
-        
-        # Valida arquivo de saída
-        if os.path.exists(output_path):
-            size = os.path.getsize(output_path)
-            print(f"   Arquivo final: {size/1024:.1f}KB")
-            
-            # Testa o arquivo final
-            try:
-                probe_cmd = ["ffprobe", "-v", "error", "-show_entries", 
-                           "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", output_path]
-                result = subprocess.run(probe_cmd, capture_output=True, text=True, timeout=30)
-                duration = float(result.stdout.strip())
-                print(f"   Duração total: {duration:.2f}s")
-            except subprocess.TimeoutExpired:
-                print("   ⏳ Timeout na verificação (mas arquivo foi criado)")
-            except:
-                print("   ⚠️ Não foi possível verificar duração (mas arquivo existe)")
-        
-        if os.path.exists(list_file):
-            os.remove(list_file)
-        return True
-    
+        subprocess.run(cmd_fast, check=True, capture_output=True, text=True)
     except subprocess.CalledProcessError as e:
         print(f"⚠️ Stream copy FALHOU")
         print(f"STDERR: {e.stderr[:500]}")
-        print("\n🔄 Tentando re-encoding com codec compatível...")
-        
-        # PASSO 2: Fallback com re-encoding otimizado e compatível
-        cmd_slow = [
-            "ffmpeg", "-y", "-f", "concat", "-safe", "0",
-            "-i", list_file,
-            "-c:v", "libx264",
-            "-preset", SETTINGS['preset'],
-            "-crf", SETTINGS['crf'],
-            "-pix_fmt", "yuv420p",
-            "-profile:v", "baseline",  # Máxima compatibilidade
-            "-level", "3.0",
-            "-movflags", "+faststart",
-            "-c:a", "aac",
-            "-b:a", "128k",
-            "-ar", "44100",
-            "-ac", "2",
-            "-threads", str(SETTINGS['threads']),
-            output_path
-        ]
+        return False
+    print("✅ Stream copy SUCESSO")
+    
+    # Valida arquivo de saída
+    if os.path.exists(output_path):
+        size = os.path.getsize(output_path)
+        print(f"   Arquivo final: {size/1024:.1f}KB")
         
+        # Testa o arquivo final
         try:
-            result = subprocess.run(cmd_slow, check=True, capture_output=True, text=True)
-            print("✅ Re-encoding SUCESSO")
-            
-            # Valida arquivo de saída
-            if os.path.exists(output_path):
-                size = os.path.getsize(output_path)
-                print(f"   Arquivo final: {size/1024:.1f}KB")
-            
-            return True
-        except subprocess.CalledProcessError as e2:
-            print(f"❌ Re-encoding FALHOU")
-            print(f"STDERR: {e2.stderr[:500]}")
-            return False
+            probe_cmd = ["ffprobe", "-v", "error", "-show_entries", 
+                       "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", output_path]
+            result = subprocess.run(probe_cmd, capture_output=True, text=True, timeout=30)
+            duration = float(result.stdout.strip())
+            print(f"   Duração total: {duration:.2f}s")
+        except subprocess.TimeoutExpired:
+            print("   ⏳ Timeout na verificação (mas arquivo foi criado)")
+        except:
+            print("   ⚠️ Não foi possível verificar duração (mas arquivo existe)")
+    return True
+
+def concat_reencode(list_file, output_path):
+    """Concat com re-encode no formato de entrega. Retorna False se o ffmpeg falhar"""
+    cmd_slow = [
+        "ffmpeg", "-y", "-f", "concat", "-safe", "0",
+        "-i", list_file,
+        "-c:v", "libx264",
+        "-preset", SETTINGS['preset'],
+        "-crf", SETTINGS['crf'],
+        "-pix_fmt", "yuv420p",
+        "-profile:v", "baseline",  # Máxima compatibilidade
+        "-level", "3.0",
+        "-movflags", "+faststart",
+        "-c:a", "aac",
+        "-b:a", "128k",
+        "-ar", "44100",
+        "-ac", "2",
+        "-threads", str(SETTINGS['threads']),
+        output_path
+    ]
     
-    finally:
-        if os.path.exists(list_file):
-            os.remove(list_file)
+    try:
+        subprocess.run(cmd_slow, check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e2:
+        print(f"❌ Re-encoding FALHOU")
+        print(f"STDERR: {e2.stderr[:500]}")
+        return False
+    print("✅ Re-encoding SUCESSO")
+    
+    # Valida arquivo de saída
+    if os.path.exists(output_path):
+        size = os.path.getsize(output_path)
+        print(f"   Arquivo final: {size/1024:.1f}KB")
+    return True
+
+# ==========================================
+# OTIMIZAÇÃO #19: POLÍTICA DE ENCODE ÚNICO (PROBE)
+# ==========================================
+# Antes de re-encodar, confere o que o arquivo já é. Cenas do MoviePy/ffmpeg já saem
+# baseline/yuv420p/AAC 44.1kHz estéreo: o stitch por cópia + faststart já é o arquivo final.
+
+# Formato de entrega (navegadores antigos): o mesmo que as cenas e o passe de compatibilidade usam
+DELIVERY_FORMAT = {
+    "video_codec": "h264",
+    "video_profiles": ("Baseline", "Constrained Baseline"),
+    "max_level": 30,
+    "pix_fmt": "yuv420p",
+    "audio_codec": "aac",
+    "sample_rate": 44100,
+    "channels": 2,
+}
+
+# Velocidade aproximada do libx264 (x tempo real, 720p) por preset: só para estimar a economia no log
+X264_REALTIME_FACTOR = {"ultrafast": 12.0, "superfast": 9.0, "veryfast": 6.0, "faster": 4.5,
+                        "fast": 3.0, "medium": 2.0, "slow": 1.0}
+
+def probe_media(path):
+    """Parâmetros de vídeo/áudio relevantes para decidir entre cópia e re-encode"""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_streams", "-show_format", "-of", "json", path],
+        capture_output=True, text=True, timeout=30, check=True
+    )
+    info = json.loads(result.stdout)
+    video = next((st for st in info.get("streams", []) if st.get("codec_type") == "video"), {})
+    audio = next((st for st in info.get("streams", []) if st.get("codec_type") == "audio"), {})
+    return {
+        "duration": float(info.get("format", {}).get("duration", 0) or 0),
+        "video_codec": video.get("codec_name"),
+        "profile": video.get("profile"),
+        "level": video.get("level"),
+        "pix_fmt": video.get("pix_fmt"),
+        "width": video.get("width"),
+        "height": video.get("height"),
+        "video_time_base": video.get("time_base"),
+        "frame_rate": video.get("r_frame_rate"),
+        "audio_codec": audio.get("codec_name"),
+        "sample_rate": int(audio["sample_rate"]) if audio.get("sample_rate") else None,
+        "channels": audio.get("channels"),
+        "audio_time_base": audio.get("time_base"),
+    }
+
+CONCAT_KEYS = ("video_codec", "profile", "pix_fmt", "width", "height", "video_time_base", "frame_rate",
+               "audio_codec", "sample_rate", "channels", "audio_time_base")
+
+def concat_compatible(video_files):
+    """Todas as cenas podem ir para o concat com -c copy? Retorna (bool, motivo)"""
+    try:
+        probes = [probe_media(v) for v in video_files]
+    except Exception as e:
+        return True, f"probe indisponível ({str(e)[:40]}), tentando mesmo assim"
+    reference = probes[0]
+    for v, probe in zip(video_files[1:], probes[1:]):
+        diff = [k for k in CONCAT_KEYS if probe[k] != reference[k]]
+        if diff:
+            return False, f"{os.path.basename(v)} difere em {', '.join(diff)}"
+    return True, f"{len(probes)} cenas com parâmetros idênticos"
+
+def has_faststart(path):
+    """O 'moov' vem antes do 'mdat'? (stream progressivo sem precisar remux)"""
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return False
+            size, box = int.from_bytes(header[:4], "big"), header[4:8]
+            if box == b"moov":
+                return True
+            if box == b"mdat":
+                return False
+            if size == 1:
+                size = int.from_bytes(f.read(8), "big")
+                f.seek(size - 16, 1)
+            elif size < 8:
+                return False
+            else:
+                f.seek(size - 8, 1)
+
+def encode_plan(path):
+    """
+    Decide o passe de compatibilidade: 'skip' (já pronto), 'remux' (só faststart),
+    'audio' (re-encode só do áudio) ou 'full'. Retorna (modo, motivos, probe)
+    """
+    probe = probe_media(path)
+    fmt = DELIVERY_FORMAT
+    video_issues = []
+    if probe["video_codec"] != fmt["video_codec"]:
+        video_issues.append(f"codec {probe['video_codec']}")
+    if probe["profile"] not in fmt["video_profiles"]:
+        video_issues.append(f"profile {probe['profile']}")
+    if (probe["level"] or 0) > fmt["max_level"]:
+        video_issues.append(f"level {probe['level']}")
+    if probe["pix_fmt"] != fmt["pix_fmt"]:
+        video_issues.append(f"pix_fmt {probe['pix_fmt']}")
+    audio_issues = []
+    if probe["audio_codec"] != fmt["audio_codec"]:
+        audio_issues.append(f"áudio {probe['audio_codec']}")
+    if probe["sample_rate"] != fmt["sample_rate"]:
+        audio_issues.append(f"{probe['sample_rate']}Hz")
+    if probe["channels"] != fmt["channels"]:
+        audio_issues.append(f"{probe['channels']} canais")
+
+    if video_issues:
+        return "full", video_issues + audio_issues, probe
+    if audio_issues:
+        return "audio", audio_issues, probe
+    if not has_faststart(path):
+        return "remux", ["moov no fim do arquivo"], probe
+    return "skip", ["já está no formato de entrega"], probe
+
+def compat_command(mode, input_path, output_path):
+    """Comando ffmpeg do passe de compatibilidade para o modo escolhido"""
+    if mode == "remux":
+        return ["ffmpeg", "-y", "-i", input_path, "-c", "copy", "-movflags", "+faststart", output_path]
+    if mode == "audio":
+        return ["ffmpeg", "-y", "-i", input_path, "-c:v", "copy",
+                "-c:a", "aac", "-b:a", "128k", "-ar", "44100", "-ac", "2",
+                "-movflags", "+faststart", output_path]
+    return [
+        "ffmpeg", "-y", "-i", input_path,
+        "-c:v", "libx264",
+        "-preset", "fast",
+        "-crf", "23",
+        "-pix_fmt", "yuv420p",
+        "-profile:v", "baseline",
+        "-level", "3.0",
+        "-movflags", "+faststart",
+        "-c:a", "aac",
+        "-b:a", "128k",
+        "-ar", "44100",
+        "-ac", "2",
+        output_path
+    ]
+
+def estimated_full_encode_seconds(duration, preset="fast"):
+    """Estimativa do re-encode completo (para registrar quanto tempo a política economizou)"""
+    return duration / X264_REALTIME_FACTOR.get(preset, 3.0)
 
 # --- LOGGER ---
 class ProjectLogger:
-    def __init__(self, project_path, topic, writer_config, critic_config, duration, voice_config, voice_style):
+    def __init__(self, project_path, topic, writer_config, critic_config, duration, voice_config, voice_style, resume=False):
         self.filepath = os.path.join(project_path, "production_log.json")
+        if resume and os.path.exists(self.filepath):
+            # Retomada: continua a mesma timeline
+            with open(self.filepath, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+            self.data["meta"]["status"] = "in_progress"
+            self.log_event("retomada", "started")
+            return
         self.data = {
             "meta": {
                 "project_id": os.path.basename(project_path),
@@ -557,6 +1170,58 @@ class ProjectLogger:
         with open(self.filepath, 'w', encoding='utf-8') as f:
             json.dump(self.data, f, indent=4, ensure_ascii=False)
 
+# --- CHECKPOINTS DO JOB ---
+class JobManifest:
+    """
+    Estado do job em projects/<pid>/job_manifest.json, salvo a cada etapa concluída
+    (pesquisa, plano de atos, roteiro por ato, assets por cena, renders, SEO, stitch).
+    /resume-stream/<pid> continua dali sem repetir chamadas pagas (LLM, TTS, imagens).
+    """
+    FILENAME = "job_manifest.json"
+
+    def __init__(self, project_path, params):
+        self.filepath = os.path.join(project_path, self.FILENAME)
+        self.data = {
+            "project_id": os.path.basename(project_path),
+            "params": params,
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "status": "in_progress",
+            "stages": {}
+        }
+        self.save()
+
+    @classmethod
+    def load(cls, project_path):
+        manifest = cls.__new__(cls)
+        manifest.filepath = os.path.join(project_path, cls.FILENAME)
+        with open(manifest.filepath, 'r', encoding='utf-8') as f:
+            manifest.data = json.load(f)
+        manifest.data["status"] = "in_progress"
+        return manifest
+
+    def get(self, stage, default=None):
+        return self.data["stages"].get(stage, default)
+
+    def set(self, stage, value):
+        self.data["stages"][stage] = value
+        self.save()
+
+    def set_item(self, stage, key, value):
+        """Etapas por ato/cena: guarda um item sem reescrever os outros"""
+        self.data["stages"].setdefault(stage, {})[str(key)] = value
+        self.save()
+
+    def finish(self, status="completed"):
+        self.data["status"] = status
+        self.save()
+
+    def save(self):
+        # Escrita atômica: um crash no meio não pode corromper o checkpoint
+        tmp_path = self.filepath + ".part"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.filepath)
+
 # --- PDF GENERATOR ---
 class PDFGenerator:
     def safe_encode(self, text):
@@ -594,53 +1259,265 @@ class PDFGenerator:
         pdf.output(full_path)
         return filename
 
+# ==========================================
+# OTIMIZAÇÃO #15: CACHE DE TRANSCRIÇÃO WHISPER
+# ==========================================
+
+# Opções de decodificação (fazem parte da chave do cache)
+WHISPER_DECODE_OPTIONS = {
+    "word_timestamps": True,
+    "language": "en",
+    "beam_size": 1,
+    "best_of": 1,
+    "fp16": False,
+    "temperature": 0.0
+}
+
+# "local": Whisper no próprio processo de render
+# "worker": envia para o transcription_worker.py (processo separado, inferência em lote);
+#           o processo da API/render não importa torch
+TRANSCRIPTION_BACKEND = os.getenv("TRANSCRIPTION_BACKEND", "local")
+TRANSCRIPTION_WORKER_TIMEOUT = float(os.getenv("TRANSCRIPTION_WORKER_TIMEOUT", "600"))
+TRANSCRIPTION_PICKUP_TIMEOUT = float(os.getenv("TRANSCRIPTION_PICKUP_TIMEOUT", "20"))   # nenhum worker rodando -> local
+TRANSCRIPTION_FALLBACK_LOCAL = os.getenv("TRANSCRIPTION_FALLBACK_LOCAL", "1") == "1"
+
+# JSON compacto com só o que a legenda usa (palavras + tempos), chaveado pelo hash do mp3
+transcription_cache = DiskLRUCache("whisper", int(os.getenv("WHISPER_CACHE_MAX_MB", "256")) * 1024 * 1024, ".json")
+
+def compact_segments(segments):
+    """Reduz a saída do Whisper a [{"words": [{"word", "start", "end"}]}]"""
+    return [
+        {"words": [
+            {"word": w["word"], "start": round(w["start"], 3), "end": round(w["end"], 3)}
+            for w in seg.get("words", [])
+        ]}
+        for seg in segments
+    ]
+
+def transcribe_words(audio_path, model_name=None):
+    """Segmentos com timestamps por palavra; reaproveita transcrições do mesmo áudio"""
+    model_name = model_name or SETTINGS['whisper_model']
+    key = content_hash(file_hash(audio_path), model_name, WHISPER_DECODE_OPTIONS)
+
+    cached = transcription_cache.lookup(key)
+    if cached:
+        try:
+            with open(cached, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass  # entrada corrompida/despejada: transcreve de novo
+
+    segments = None
+    if TRANSCRIPTION_BACKEND == "worker":
+        task_id = None
+        try:
+            task_id = task_queue.enqueue("transcribe", {
+                "audio_path": shared_path(audio_path),
+                "model": model_name,
+                "options": WHISPER_DECODE_OPTIONS
+            })
+            segments = task_queue.wait(task_id, TRANSCRIPTION_WORKER_TIMEOUT,
+                                       pickup_timeout=TRANSCRIPTION_PICKUP_TIMEOUT)
+        except Exception as e:
+            # Tarefa abandonada não pode ser transcrita por um worker que suba depois
+            if task_id is not None:
+                try:
+                    task_queue.cancel(task_id)
+                except Exception:
+                    pass
+            if not TRANSCRIPTION_FALLBACK_LOCAL:
+                raise
+            print(f"   ⚠️ Worker de transcrição indisponível ({str(e)[:80]}), usando Whisper local")
+
+    if segments is None:
+        result = get_whisper_model(model_name).transcribe(audio_path, **WHISPER_DECODE_OPTIONS)
+        segments = compact_segments(result['segments'])
+    transcription_cache.store_bytes(key, json.dumps(segments, separators=(",", ":")).encode('utf-8'))
+    return segments
+
+# ==========================================
+# OTIMIZAÇÃO #16: TIMESTAMPS NATIVOS DO TTS (ALINHAMENTO SEM WHISPER)
+# ==========================================
+
+# Agrupamento das palavras do provider em segmentos (equivalentes aos do Whisper)
+ALIGNMENT_MAX_WORDS_PER_SEGMENT = 10
+ALIGNMENT_MAX_GAP = 0.6  # pausa (s) que quebra o segmento
+
+def alignment_path(audio_path):
+    """Sidecar com os tempos por palavra: act0_scene0.mp3 -> act0_scene0.words.json"""
+    return os.path.splitext(audio_path)[0] + ".words.json"
+
+def group_words_into_segments(words):
+    """Quebra a lista plana de palavras em frases (pontuação, pausa longa ou limite de palavras)"""
+    segments = []
+    current = []
+    for word in words:
+        if current and word["start"] - current[-1]["end"] > ALIGNMENT_MAX_GAP:
+            segments.append({"words": current})
+            current = []
+        current.append(word)
+        if word["word"].rstrip().rstrip("\"'”’)»").endswith((".", "!", "?")) or len(current) >= ALIGNMENT_MAX_WORDS_PER_SEGMENT:
+            segments.append({"words": current})
+            current = []
+    if current:
+        segments.append({"words": current})
+    return segments
+
+def words_from_character_alignment(alignment):
+    """Converte o alinhamento por caractere (ElevenLabs with-timestamps) em palavras"""
+    words = []
+    text, start, end = "", None, None
+    for char, char_start, char_end in zip(
+        alignment.get("characters", []),
+        alignment.get("character_start_times_seconds", []),
+        alignment.get("character_end_times_seconds", [])
+    ):
+        if char.isspace():
+            if text:
+                words.append({"word": text, "start": start, "end": end})
+            text = ""
+            continue
+        if not text:
+            start = char_start
+        text += char
+        end = char_end
+    if text:
+        words.append({"word": text, "start": start, "end": end})
+    return words
+
+def save_word_alignment(audio_path, words, source):
+    """Grava o sidecar de alinhamento amarrado ao hash do áudio (evita tempos de um áudio antigo)"""
+    if not words:
+        return
+    data = {
+        "audio_sha256": file_hash(audio_path),
+        "source": source,
+        "segments": compact_segments(group_words_into_segments(words))
+    }
+    with open(alignment_path(audio_path), 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(",", ":"))
+
+class ProviderAlignment:
+    """Tempos emitidos pelo próprio TTS (Edge WordBoundary, ElevenLabs with-timestamps)"""
+    name = "tts"
+
+    def segments(self, audio_path):
+        path = alignment_path(audio_path)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("audio_sha256") != file_hash(audio_path):
+            return None  # áudio foi regerado depois do sidecar
+        self.name = f"tts:{data.get('source', '?')}"
+        return data.get("segments") or None
+
+class WhisperAlignment:
+    """Fallback: transcreve o áudio (com cache por hash)"""
+    name = "whisper"
+
+    def __init__(self, model_name=None):
+        self.model_name = model_name
+
+    def segments(self, audio_path):
+        return transcribe_words(audio_path, self.model_name)
+
+def resolve_word_timings(audio_path, whisper_model=None):
+    """Primeira fonte de alinhamento que tiver tempos para o áudio. Retorna (segments, fonte)"""
+    for source in (ProviderAlignment(), WhisperAlignment(whisper_model)):
+        segments = source.segments(audio_path)
+        if segments:
+            return segments, source.name
+    return [], "none"
+
 # --- SUBTITLE GENERATOR ---
+# Teto de memória dos overlays de legenda por cena (arrays RGBA recortados no bloco de texto)
+SUBTITLE_MEMORY_CAP_MB = int(os.getenv("SUBTITLE_MEMORY_CAP_MB", "256"))
+
+# Caches do rasterizador: ImageFont.truetype é caro e as larguras se repetem entre cenas
+@functools.lru_cache(maxsize=32)
+def load_font(size):
+    fonts = ["arialbd.ttf", "ariblk.ttf", "SegoeUI-Bold.ttf", "impact.ttf", "DejaVuSans-Bold.ttf"]
+    for name in fonts:
+        try: return ImageFont.truetype(name, size)
+        except: continue
+    return ImageFont.load_default()
+
+@functools.lru_cache(maxsize=16384)
+def text_width(font, text):
+    return font.getlength(text)
+
+@functools.lru_cache(maxsize=512)
+def segment_layout(words, video_w, video_h):
+    """Layout do bloco (linhas + posições) por texto do segmento; reusado entre estados, backends e re-renders"""
+    gen = SubtitleGenerator()
+    style = gen.karaoke_style(video_w, video_h)
+    font_normal, font_large = style["font_normal"], style["font_large"]
+    base_font_size, pop_font_size = style["base_font_size"], style["pop_font_size"]
+    margin_y = style["margin_y"]
+    normal_space_w = text_width(font_normal, " ") + style["space_buffer"]
+
+    lines = gen.split_text_into_lines(words, font_normal, style["max_text_width"], style["space_buffer"])
+    line_height = base_font_size * 1.6
+    total_block_height = len(lines) * line_height
+    
+    # CORREÇÃO: Posicionamento seguro com margens
+    # Centraliza verticalmente com margem de segurança
+    start_y = (video_h - total_block_height) / 2
+    
+    # Garante que não ultrapasse os limites
+    if start_y < margin_y:
+        start_y = margin_y  # Não passa do topo
+    if start_y + total_block_height > video_h - margin_y:
+        start_y = video_h - margin_y - total_block_height  # Não passa do fundo
+    
+    positions = []
+    current_y = start_y
+    for line in lines:
+        line_total_w = sum(text_width(font_normal, w_str) for w_str in line)
+        if len(line) > 1:
+            line_total_w += (len(line) - 1) * normal_space_w
+        current_x = (video_w - line_total_w) / 2
+
+        for word_txt in line:
+            normal_w = text_width(font_normal, word_txt)
+            large_w = text_width(font_large, word_txt)
+            large_pos = (
+                current_x - (large_w - normal_w) / 2,
+                current_y - (pop_font_size - base_font_size) / 1.3
+            )
+            positions.append((word_txt, (current_x, current_y), large_pos))
+            current_x += normal_w + normal_space_w
+        current_y += line_height
+    return tuple(positions)
+
 class SubtitleGenerator:
     def get_font(self, size):
-        fonts = ["arialbd.ttf", "ariblk.ttf", "SegoeUI-Bold.ttf", "impact.ttf", "DejaVuSans-Bold.ttf"]
-        for name in fonts:
-            try: return ImageFont.truetype(name, size)
-            except: continue
-        return ImageFont.load_default()
+        return load_font(size)
 
-    def split_text_into_lines(self, words, font, max_width, draw, space_width_buffer):
+    def split_text_into_lines(self, words, font, max_width, space_width_buffer):
         lines = []
         current_line = []
         current_w = 0
-        space_w = draw.textlength(" ", font=font) + space_width_buffer
+        space_w = text_width(font, " ") + space_width_buffer
 
-        for word_data in words:
-            word = word_data['word'].strip()
-            word_w = draw.textlength(word, font=font)
+        for word in words:
+            word_w = text_width(font, word)
             if current_w + word_w <= max_width:
-                current_line.append(word_data)
+                current_line.append(word)
                 current_w += word_w + space_w
             else:
                 if current_line: lines.append(current_line)
-                current_line = [word_data]
+                current_line = [word]
                 current_w = word_w + space_w
         if current_line: lines.append(current_line)
         return lines
 
-    def generate_karaoke(self, audio_path, video_w, video_h):
-        try:
-            # Transcrição otimizada
-            result = whisper_model.transcribe(
-                audio_path,
-                word_timestamps=True,
-                language="en",
-                beam_size=1,
-                best_of=1,
-                fp16=False,
-                temperature=0.0
-            )
-            segments = result['segments']
-        except Exception as e:
-            print(f"Erro Whisper: {e}")
-            return []
-
-        subtitle_clips = []
-        
+    def karaoke_style(self, video_w, video_h):
+        """Estilo do karaokê (compartilhado pelos backends MoviePy e ASS)"""
         # Adapta tamanho da fonte baseado na altura do vídeo
         base_font_size = int(video_h * 0.055)  # Reduzido de 0.085 para melhor fit vertical
         pop_font_size = int(base_font_size * 1.25)
@@ -649,105 +1526,328 @@ class SubtitleGenerator:
         margin_x = int(video_w * 0.10)  # 10% nas laterais
         margin_y = int(video_h * 0.10)  # 10% superior e inferior
         
-        max_text_width = video_w - (margin_x * 2)
-        font_normal = self.get_font(base_font_size)
-        font_large = self.get_font(pop_font_size)
-        text_color = (255, 255, 255, 255)
-        highlight_color = (255, 215, 0, 255)
-        stroke_color = (0, 0, 0, 255)
-        stroke_width = 6
-        SPACE_BUFFER = 25
+        return {
+            "base_font_size": base_font_size,
+            "pop_font_size": pop_font_size,
+            "margin_x": margin_x,
+            "margin_y": margin_y,
+            "max_text_width": video_w - (margin_x * 2),
+            "font_normal": self.get_font(base_font_size),
+            "font_large": self.get_font(pop_font_size),
+            "text_color": (255, 255, 255, 255),
+            "highlight_color": (255, 215, 0, 255),
+            "stroke_color": (0, 0, 0, 255),
+            "stroke_width": 6,
+            "space_buffer": 25,
+        }
+
+    def layout_segment(self, all_words, style, video_w, video_h):
+        """Posição de cada palavra do segmento: [(word_data, texto, pos_normal, pos_destacada)]"""
+        words = tuple(w['word'].strip() for w in all_words)
+        positions = segment_layout(words, video_w, video_h)
+        return [(word_data, txt, normal_pos, large_pos)
+                for word_data, (txt, normal_pos, large_pos) in zip(all_words, positions)]
+
+    def word_sprite(self, text, font, fill, style):
+        """Palavra com contorno nativo do Pillow, recortada na própria caixa. Retorna (img, dx, dy)"""
+        sw = style["stroke_width"]
+        l, t, r, b = font.getbbox(text, stroke_width=sw)
+        img = Image.new('RGBA', (max(1, r - l), max(1, b - t)), (0, 0, 0, 0))
+        ImageDraw.Draw(img).text((-l, -t), text, font=font, fill=fill,
+                                 stroke_width=sw, stroke_fill=style["stroke_color"])
+        return img, l, t
+
+    def rasterize_karaoke(self, segments, video_w, video_h):
+        """
+        Overlays do karaokê: [(array RGBA, (x0, y0), início, fim)].
+        Cada segmento tem sprites das palavras (normal e destacada) renderizados uma vez;
+        a cada estado só a região da palavra que muda é repintada no canvas do bloco.
+        """
+        style = self.karaoke_style(video_w, video_h)
+        font_normal, font_large = style["font_normal"], style["font_large"]
+
+        overlays = []
+        subtitle_bytes = 0
+        static_segments = 0
+        memory_cap = SUBTITLE_MEMORY_CAP_MB * 1024 * 1024
 
         for segment in segments:
             all_words = segment['words']
             if not all_words: continue
-            dummy_img = Image.new('RGBA', (1, 1))
-            dummy_draw = ImageDraw.Draw(dummy_img)
-            lines = self.split_text_into_lines(all_words, font_normal, max_text_width, dummy_draw, SPACE_BUFFER)
-            line_height = base_font_size * 1.6
-            total_block_height = len(lines) * line_height
-            
-            # CORREÇÃO: Posicionamento seguro com margens
-            # Centraliza verticalmente com margem de segurança
-            start_y = (video_h - total_block_height) / 2
-            
-            # Garante que não ultrapasse os limites
-            if start_y < margin_y:
-                start_y = margin_y  # Não passa do topo
-            if start_y + total_block_height > video_h - margin_y:
-                start_y = video_h - margin_y - total_block_height  # Não passa do fundo
-            
-            flat_words = [w for line in lines for w in line]
+            layout = self.layout_segment(all_words, style, video_w, video_h)
+
+            # Sprites e caixas (coordenadas do frame) de cada palavra nos dois estados
+            normal, large = [], []
+            for _, word_txt, normal_pos, large_pos in layout:
+                for sprites, pos, font, fill in ((normal, normal_pos, font_normal, style["text_color"]),
+                                                 (large, large_pos, font_large, style["highlight_color"])):
+                    img, dx, dy = self.word_sprite(word_txt, font, fill, style)
+                    x, y = int(round(pos[0] + dx)), int(round(pos[1] + dy))
+                    sprites.append((img, (x, y, x + img.width, y + img.height)))
+
+            # Bounding box do bloco (palavras normais e destacadas + contorno); o overlay é recortado ao frame
+            boxes = [box for _, box in normal + large]
+            block_x0, block_y0 = min(b[0] for b in boxes), min(b[1] for b in boxes)
+            block_x1, block_y1 = max(b[2] for b in boxes), max(b[3] for b in boxes)
+            box_x0, box_y0 = max(0, block_x0), max(0, block_y0)
+            crop = (box_x0 - block_x0, box_y0 - block_y0,
+                    min(video_w, block_x1) - block_x0, min(video_h, block_y1) - block_y0)
+            overlay_bytes = (crop[2] - crop[0]) * (crop[3] - crop[1]) * 4
+
+            canvas = Image.new('RGBA', (block_x1 - block_x0, block_y1 - block_y0), (0, 0, 0, 0))
+
+            def paste(sprite):
+                img, (x, y, _, _) = sprite
+                canvas.alpha_composite(img, dest=(x - block_x0, y - block_y0))
+
+            # Teto de memória: sem espaço para um overlay por palavra, o segmento vira um
+            # overlay só (frase inteira, sem destaque). Nunca reaproveita bitmap de outro segmento
+            if overlays and subtitle_bytes + overlay_bytes * len(layout) > memory_cap:
+                for sprite in normal:
+                    paste(sprite)
+                img_np = np.array(canvas.crop(crop))
+                subtitle_bytes += img_np.nbytes
+                overlays.append((img_np, (box_x0, box_y0), layout[0][0]['start'], layout[-1][0]['end']))
+                static_segments += 1
+                continue
 
-            for i, active_word in enumerate(flat_words):
+            for i, (active_word, _, _, _) in enumerate(layout):
                 start_t = active_word['start']
                 end_t = active_word['end']
-                img = Image.new('RGBA', (video_w, video_h), (0, 0, 0, 0))
-                draw = ImageDraw.Draw(img)
-                current_y = start_y
-                word_global_index = 0
-
-                for line in lines:
-                    line_total_w = 0
-                    normal_space_w = dummy_draw.textlength(" ", font=font_normal) + SPACE_BUFFER
-                    words_in_line = [w['word'].strip() for w in line]
-                    for w_str in words_in_line:
-                        line_total_w += dummy_draw.textlength(w_str, font=font_normal)
-                    if len(words_in_line) > 1:
-                        line_total_w += (len(words_in_line) - 1) * normal_space_w
-                    current_x = (video_w - line_total_w) / 2
-
-                    for word_data in line:
-                        word_txt = word_data['word'].strip()
-                        if word_global_index > i:
-                            w_len = dummy_draw.textlength(word_txt, font=font_normal)
-                            current_x += w_len + normal_space_w
-                            word_global_index += 1
-                            continue
-
-                        is_active = (word_global_index == i)
-                        current_font = font_large if is_active else font_normal
-                        current_color = highlight_color if is_active else text_color
-                        normal_w = dummy_draw.textlength(word_txt, font=font_normal)
-                        draw_x = current_x
-                        draw_y = current_y
-
-                        if is_active:
-                            large_w = dummy_draw.textlength(word_txt, font=font_large)
-                            offset_x = (large_w - normal_w) / 2
-                            offset_y = (pop_font_size - base_font_size) / 1.3
-                            draw_x = current_x - offset_x
-                            draw_y = current_y - offset_y
-
-                        for adj_x in range(-stroke_width, stroke_width+1):
-                            for adj_y in range(-stroke_width, stroke_width+1):
-                                if abs(adj_x) >= stroke_width-1 or abs(adj_y) >= stroke_width-1:
-                                    draw.text((draw_x+adj_x, draw_y+adj_y), word_txt, font=current_font, fill=stroke_color)
-                        draw.text((draw_x, draw_y), word_txt, font=current_font, fill=current_color)
-
-                        current_x += normal_w + normal_space_w
-                        word_global_index += 1
-                    current_y += line_height
-
-                img_np = np.array(img)
-                txt_clip = ImageClip(img_np).set_start(start_t).set_end(end_t).set_duration(end_t - start_t)
-                subtitle_clips.append(txt_clip)
-
-        return subtitle_clips
+
+                if i > 0:
+                    # A palavra anterior volta ao tamanho normal: a região dela é refeita do zero
+                    # com as palavras já visíveis que a cruzam, na ordem original (cada pixel
+                    # composto uma vez só, mesma sobreposição do desenho completo)
+                    rx0, ry0, rx1, ry1 = large[i - 1][1]
+                    region = Image.new('RGBA', (rx1 - rx0, ry1 - ry0), (0, 0, 0, 0))
+                    for img, (x0, y0, x1, y1) in normal[:i]:
+                        if x0 < rx1 and x1 > rx0 and y0 < ry1 and y1 > ry0:
+                            region.alpha_composite(img, dest=(max(0, x0 - rx0), max(0, y0 - ry0)),
+                                                   source=(max(0, rx0 - x0), max(0, ry0 - y0)))
+                    canvas.paste(region, (rx0 - block_x0, ry0 - block_y0))
+                paste(large[i])
+
+                img_np = np.array(canvas.crop(crop))
+                subtitle_bytes += img_np.nbytes
+                overlays.append((img_np, (box_x0, box_y0), start_t, end_t))
+
+        print(f"   Memória das legendas: {subtitle_bytes/1024/1024:.1f}MB em {len(overlays)} overlays (teto {SUBTITLE_MEMORY_CAP_MB}MB)")
+        if static_segments:
+            print(f"   ⚠️ Teto de memória: {static_segments} segmento(s) sem destaque por palavra")
+        return overlays
+
+    def generate_karaoke(self, audio_path, video_w, video_h, whisper_model=None):
+        try:
+            # Tempos do TTS quando disponíveis; senão Whisper (com cache por hash do áudio)
+            segments, timing_source = resolve_word_timings(audio_path, whisper_model)
+            print(f"   Alinhamento das legendas: {timing_source}")
+        except Exception as e:
+            print(f"Erro Whisper: {e}")
+            return []
+
+        return [ImageClip(img_np).set_position(pos).set_start(start_t).set_end(end_t).set_duration(end_t - start_t)
+                for img_np, pos, start_t, end_t in self.rasterize_karaoke(segments, video_w, video_h)]
+
+    def generate_ass(self, audio_path, video_w, video_h, ass_path, whisper_model=None):
+        """Escreve o karaokê como script ASS (queimado pelo libass no encode). Retorna nº de eventos"""
+        try:
+            segments, timing_source = resolve_word_timings(audio_path, whisper_model)
+            print(f"   Alinhamento das legendas: {timing_source}")
+        except Exception as e:
+            print(f"Erro Whisper: {e}")
+            return 0
+
+        style = self.karaoke_style(video_w, video_h)
+        font_name, bold = ass_font_name(style["font_normal"])
+        # O libass escala a fonte pela altura total (ascendente + descendente), o PIL pelo em
+        base_size = sum(style["font_normal"].getmetrics())
+        pop_size = sum(style["font_large"].getmetrics())
+
+        events = []
+        for segment in segments:
+            all_words = segment['words']
+            if not all_words: continue
+            layout = self.layout_segment(all_words, style, video_w, video_h)
+
+            # Mesmo layout do MoviePy: cada estado mostra as palavras até a ativa, na posição fixa
+            for i, (active_word, _, _, _) in enumerate(layout):
+                start_t = ass_timestamp(active_word['start'])
+                end_t = ass_timestamp(active_word['end'])
+                for word_index, (_, word_txt, normal_pos, large_pos) in enumerate(layout[:i + 1]):
+                    if word_index == i:
+                        x, y = large_pos
+                        tags = f"\\an7\\pos({x:.0f},{y:.0f})\\fs{pop_size}\\c{ass_color(style['highlight_color'])}"
+                    else:
+                        x, y = normal_pos
+                        tags = f"\\an7\\pos({x:.0f},{y:.0f})"
+                    events.append(f"Dialogue: 0,{start_t},{end_t},Karaoke,,0,0,0,,{{{tags}}}{ass_escape(word_txt)}")
+
+        header = [
+            "[Script Info]",
+            "ScriptType: v4.00+",
+            f"PlayResX: {video_w}",
+            f"PlayResY: {video_h}",
+            "WrapStyle: 2",
+            "ScaledBorderAndShadow: yes",
+            "",
+            "[V4+ Styles]",
+            "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+            "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+            "Alignment, MarginL, MarginR, MarginV, Encoding",
+            f"Style: Karaoke,{font_name},{base_size},{ass_color(style['text_color'])},{ass_color(style['highlight_color'])},"
+            f"{ass_color(style['stroke_color'])},&H00000000,{-1 if bold else 0},0,0,0,100,100,0,0,1,"
+            f"{style['stroke_width']},0,7,{style['margin_x']},{style['margin_x']},{style['margin_y']},1",
+            "",
+            "[Events]",
+            "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+        ]
+        with open(ass_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(header + events) + "\n")
+        return len(events)
+
+# --- BACKEND ASS (LIBASS) ---
+def ass_timestamp(seconds):
+    """Tempo no formato do ASS: H:MM:SS.cc"""
+    cs = int(round(max(0.0, seconds) * 100))
+    return f"{cs // 360000}:{cs // 6000 % 60:02d}:{cs // 100 % 60:02d}.{cs % 100:02d}"
+
+def ass_color(rgba):
+    """(R, G, B, A) do PIL -> &HAABBGGRR (alfa invertido no ASS)"""
+    r, g, b, a = rgba
+    return f"&H{255 - a:02X}{b:02X}{g:02X}{r:02X}"
+
+def ass_escape(text):
+    return text.replace("\\", "\\\\").replace("{", "\\{").replace("}", "\\}")
+
+def ass_font_name(font):
+    """Família/negrito da fonte carregada pelo PIL, para o libass achar o mesmo arquivo"""
+    try:
+        family, weight = font.getname()
+        return family, any(w in weight for w in ("Bold", "Black", "Heavy"))
+    except Exception:
+        return "Arial", True
+
+def ass_fonts_dir(font):
+    path = getattr(font, "path", None)
+    return os.path.dirname(os.path.abspath(path)) if isinstance(path, str) else None
+
+def ffmpeg_filter_path(path):
+    """Escapa um caminho para uso dentro de um filtergraph (C:\\ e ':' quebram o parser)"""
+    return path.replace("\\", "/").replace(":", "\\:").replace("'", "\\'")
+
+@functools.lru_cache(maxsize=1)
+def libass_available():
+    """O ffmpeg instalado tem o filtro 'ass'? (builds mínimos vêm sem libass)"""
+    try:
+        result = subprocess.run(["ffmpeg", "-hide_banner", "-filters"], capture_output=True, text=True, timeout=15)
+        return any(line.split()[1:2] == ["ass"] for line in result.stdout.splitlines())
+    except Exception:
+        return False
+
+def subtitle_backend():
+    """Backend de legendas do perfil ('moviepy' ou 'ass'); cai para MoviePy sem libass"""
+    backend = SETTINGS.get("subtitle_backend", "moviepy")
+    if backend == "ass" and not libass_available():
+        print("⚠️ ffmpeg sem libass: legendas via MoviePy")
+        return "moviepy"
+    return backend
+
+def ass_filter(ass_path, font):
+    fonts_dir = ass_fonts_dir(font)
+    vf = f"ass='{ffmpeg_filter_path(ass_path)}'"
+    if fonts_dir:
+        vf += f":fontsdir='{ffmpeg_filter_path(fonts_dir)}'"
+    return vf
+
+# ==========================================
+# OTIMIZAÇÃO #10: CAMADA HTTP ASSÍNCRONA (POOL DE CONEXÕES)
+# ==========================================
+
+# Limites de conexões keep-alive por provider (um AsyncClient por host)
+HTTP_POOL_LIMITS = {
+    "gemini": httpx.Limits(max_connections=10, max_keepalive_connections=5),
+    "google_tts": httpx.Limits(max_connections=8, max_keepalive_connections=4),
+    "elevenlabs": httpx.Limits(max_connections=6, max_keepalive_connections=3),
+    "pollinations": httpx.Limits(max_connections=6, max_keepalive_connections=3),
+    "downloads": httpx.Limits(max_connections=10, max_keepalive_connections=5),  # CDNs Replicate/DALL-E
+    "replicate": httpx.Limits(max_connections=10, max_keepalive_connections=5),  # API de predictions
+}
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+_http_clients = {}
+_openai_client = None
+_http_loop = None
+
+def _bind_http_loop():
+    """Clientes async (e limitadores por provider) ficam presos ao event loop; recria se o loop
+    mudou (ex: asyncio.run em scripts)"""
+    global _http_loop, _openai_client
+    loop = asyncio.get_running_loop()
+    if loop is not _http_loop:
+        _http_clients.clear()
+        _openai_client = None
+        _provider_limiters.clear()
+        _http_loop = loop
+
+def get_http_client(provider):
+    """AsyncClient compartilhado (keep-alive) para o provider"""
+    _bind_http_loop()
+    if provider not in _http_clients:
+        _http_clients[provider] = httpx.AsyncClient(
+            limits=HTTP_POOL_LIMITS.get(provider, httpx.Limits(max_connections=5)),
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            follow_redirects=True
+        )
+    return _http_clients[provider]
+
+def get_openai_client():
+    """Cliente AsyncOpenAI único, reaproveitado por texto, TTS, imagens e listagem de modelos"""
+    global _openai_client
+    _bind_http_loop()
+    if _openai_client is None:
+        # Sem retries do SDK: 429/5xx passam pelo call_with_rate_limit (pausa compartilhada + backoff)
+        _openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+    return _openai_client
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    """Fecha os pools de conexão (shutdown do servidor)"""
+    global _openai_client
+    for client in list(_http_clients.values()):
+        await client.aclose()
+    _http_clients.clear()
+    if _openai_client is not None:
+        await _openai_client.close()
+        _openai_client = None
+
+async def stream_response_to_file(response, path):
+    """Grava o corpo da resposta em disco em blocos (.part + rename, nunca deixa arquivo pela metade)"""
+    tmp_path = path + ".part"
+    with open(tmp_path, 'wb') as f:
+        async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+            f.write(chunk)
+    os.replace(tmp_path, path)
+
+async def download_to_file(provider, url, path, timeout=30, **kwargs):
+    """GET com streaming direto para disco. Levanta httpx.HTTPStatusError se status != 2xx"""
+    async with get_http_client(provider).stream("GET", url, timeout=timeout, **kwargs) as r:
+        r.raise_for_status()
+        await stream_response_to_file(r, path)
+    return path
 
 # --- API WRAPPERS ---
-def call_gemini_api(prompt_text, model, max_retries=3):
+async def call_gemini_api(prompt_text, model, max_retries=3, temperature=0.7):
     if not GEMINI_API_KEY: return {"error": "Chave Gemini não configurada"}
     url = f"https://generativelanguage.googleapis.com/v1beta/{model}:generateContent?key={GEMINI_API_KEY}"
     headers = {"Content-Type": "application/json"}
-    payload = {"contents": [{"parts": [{"text": prompt_text}]}], "generationConfig": {"temperature": 0.7}}
+    payload = {"contents": [{"parts": [{"text": prompt_text}]}], "generationConfig": {"temperature": temperature}}
+    client = get_http_client("gemini")
     
     for attempt in range(max_retries):
         try:
-            r = requests.post(url, headers=headers, json=payload, timeout=120)
-            
-            if r.status_code == 429: 
-                return {"error": "ERRO DE COTA (429): Limite do Gemini excedido."}
+            # 429/503 esperam o Retry-After (compartilhado entre jobs) e repetem
+            r = await call_with_rate_limit("gemini", lambda: client.post(url, headers=headers, json=payload, timeout=120))
             
             if r.status_code != 200: 
                 return {"error": f"Erro Gemini ({r.status_code}): {r.text}"}
@@ -783,18 +1883,21 @@ def call_gemini_api(prompt_text, model, max_retries=3):
             
             return {"text": text}
         
-        except requests.exceptions.Timeout:
+        except RateLimited as e:
+            return {"error": f"ERRO DE COTA (429): Limite do Gemini excedido ({e})."}
+        
+        except httpx.TimeoutException:
             if attempt < max_retries - 1:
                 print(f"⚠️ Timeout no Gemini (tentativa {attempt+1}/{max_retries}). Retentando em 2s...")
-                time.sleep(2)
+                await asyncio.sleep(2)
                 continue
             else:
                 return {"error": f"TIMEOUT: Gemini não respondeu após {max_retries} tentativas (120s cada)."}
         
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             if attempt < max_retries - 1:
                 print(f"⚠️ Erro de conexão Gemini (tentativa {attempt+1}/{max_retries}). Retentando...")
-                time.sleep(2)
+                await asyncio.sleep(2)
                 continue
             else:
                 return {"error": f"Erro de conexão: {str(e)}"}
@@ -808,20 +1911,23 @@ def call_gemini_api(prompt_text, model, max_retries=3):
     
     return {"error": "Falha após todas as tentativas"}
 
-def call_openai_api(prompt_text, model, max_retries=3):
+async def call_openai_api(prompt_text, model, max_retries=3, temperature=0.7):
     if not OPENAI_API_KEY: return {"error": "Chave OpenAI não configurada"}
-    client = OpenAI(api_key=OPENAI_API_KEY)
+    client = get_openai_client()
     
     for attempt in range(max_retries):
         try:
-            response = client.chat.completions.create(
+            response = await call_with_rate_limit("openai", lambda: client.chat.completions.create(
                 model=model, 
                 messages=[{"role": "user", "content": prompt_text}], 
-                temperature=0.7,
+                temperature=temperature,
                 timeout=120  # Timeout de 120s
-            )
+            ))
             return {"text": response.choices[0].message.content}
         
+        except RateLimited as e:
+            return {"error": f"ERRO DE COTA (429): Limite da OpenAI excedido ({e})."}
+        
         except Exception as e:
             error_str = str(e)
             
@@ -831,23 +1937,132 @@ def call_openai_api(prompt_text, model, max_retries=3):
             if "timeout" in error_str.lower() or "timed out" in error_str.lower():
                 if attempt < max_retries - 1:
                     print(f"⚠️ Timeout na OpenAI (tentativa {attempt+1}/{max_retries}). Retentando em 2s...")
-                    time.sleep(2)
+                    await asyncio.sleep(2)
                     continue
                 else:
                     return {"error": f"TIMEOUT: OpenAI não respondeu após {max_retries} tentativas."}
             
             if attempt < max_retries - 1:
                 print(f"⚠️ Erro OpenAI (tentativa {attempt+1}/{max_retries}). Retentando...")
-                time.sleep(2)
+                await asyncio.sleep(2)
                 continue
             
             return {"error": f"Erro OpenAI: {error_str}"}
     
     return {"error": "Falha após todas as tentativas"}
 
-async def generate_text(provider, model, prompt):
-    if provider == "openai": return call_openai_api(prompt, model)
-    return call_gemini_api(prompt, model)
+# ==========================================
+# OTIMIZAÇÃO #14: CACHE PERSISTENTE DE RESPOSTAS LLM
+# ==========================================
+
+# "on": usa o cache respeitando o TTL | "off": sempre chama a API
+# "replay": ignora o TTL para reproduzir instantaneamente a etapa de texto de um job anterior
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "on")
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", "168"))
+
+class LLMResponseCache:
+    """Respostas de LLM em SQLite, chaveadas por provider, modelo, temperatura e hash do prompt"""
+    def __init__(self, db_path, ttl_seconds):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    provider TEXT,
+                    model TEXT,
+                    temperature REAL,
+                    prompt_hash TEXT,
+                    response TEXT,
+                    created_at REAL
+                )
+            """)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @staticmethod
+    def make_key(provider, model, temperature, prompt, tag=""):
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        return content_hash(provider, model, temperature, prompt_hash, tag), prompt_hash
+
+    def get(self, key, ignore_ttl=False):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+        if row and (ignore_ttl or time.time() - row[1] <= self.ttl_seconds):
+            self.hits += 1
+            return row[0]
+        self.misses += 1
+        return None
+
+    def put(self, key, provider, model, temperature, prompt_hash, response):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, provider, model, temperature, prompt_hash, response, time.time())
+                )
+        finally:
+            conn.close()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "mode": LLM_CACHE_MODE,
+            "ttl_hours": self.ttl_seconds / 3600
+        }
+
+llm_cache = LLMResponseCache(os.path.join(CACHE_DIR, "llm_responses.sqlite3"), LLM_CACHE_TTL_HOURS * 3600)
+
+async def generate_text(provider, model, prompt, temperature=0.7, use_cache=True, cache_tag=""):
+    """
+    Gera texto com o LLM, consultando o cache persistente primeiro.
+    
+    Args:
+        use_cache: False desliga o cache nesta chamada
+        cache_tag: diferencia chamadas com prompt idêntico que devem ter respostas próprias
+                   (ex: iterações do writer)
+    """
+    use_cache = use_cache and LLM_CACHE_MODE != "off"
+    if use_cache:
+        key, prompt_hash = LLMResponseCache.make_key(provider, model, temperature, prompt, cache_tag)
+        cached = await run_blocking(llm_cache.get, key, LLM_CACHE_MODE == "replay")
+        if cached is not None:
+            return {"text": cached, "cached": True}
+
+    if provider == "openai":
+        res = await call_openai_api(prompt, model, temperature=temperature)
+    else:
+        res = await call_gemini_api(prompt, model, temperature=temperature)
+
+    # Erros nunca vão para o cache
+    if use_cache and "text" in res:
+        await run_blocking(llm_cache.put, key, provider, model, temperature, prompt_hash, res["text"])
+    return res
+
+async def research_topic(topic, use_cache=True):
+    """Pesquisa DuckDuckGo com o mesmo cache (necessário para o replay reproduzir o job todo)"""
+    use_cache = use_cache and LLM_CACHE_MODE != "off"
+    if use_cache:
+        key, prompt_hash = LLMResponseCache.make_key("ddgs", "text", 0, topic)
+        cached = await run_blocking(llm_cache.get, key, LLM_CACHE_MODE == "replay")
+        if cached is not None:
+            return cached
+    facts = await run_blocking(search_facts, topic)
+    if use_cache and facts:
+        await run_blocking(llm_cache.put, key, "ddgs", "text", 0, prompt_hash, facts)
+    return facts
 
 # --- CÉREBRO VIRAL ---
 class ViralBrain:
@@ -1133,7 +2348,8 @@ SCRIPT:
             res_writer = await generate_text(
                 self.writer_provider,
                 self.writer_model,
-                writer_prompt
+                writer_prompt,
+                cache_tag=f"writer:{i}"
             )
 
             try:
@@ -1153,7 +2369,8 @@ SCRIPT:
             res_critic = await generate_text(
                 self.critic_provider,
                 self.critic_model,
-                critic_prompt
+                critic_prompt,
+                cache_tag=f"critic:{i}"
             )
 
             try:
@@ -1232,12 +2449,148 @@ REPLICATE_FALLBACK_MODELS = {
 }
 
 # ==========================================
-# FUNÇÃO AUXILIAR: RETRY INTELIGENTE PARA REPLICATE
+# OTIMIZAÇÃO #25: REPLICATE VIA API DE PREDICTIONS (HTTP ASSÍNCRONO)
 # ==========================================
+# Em vez de replicate.run() numa thread (uma thread presa por imagem durante toda a predição),
+# cria a prediction com um POST e acompanha por polling no event loop. A geração roda no
+# Replicate: as imagens de todas as cenas podem estar em andamento ao mesmo tempo, e o limitador
+# do provider só conta as chamadas HTTP (criar/consultar), não o tempo da predição.
+# REPLICATE_API_BASE aponta para outro servidor (ex: backend/fake_replicate_server.py).
+
+REPLICATE_API_BASE = os.getenv("REPLICATE_API_BASE", "https://api.replicate.com/v1").rstrip("/")
+REPLICATE_POLL_INTERVAL = float(os.getenv("REPLICATE_POLL_INTERVAL", "1.0"))
+REPLICATE_POLL_MAX_INTERVAL = 5.0     # predições longas (cold start) consultam com menos frequência
+REPLICATE_PREDICTION_TIMEOUT = float(os.getenv("REPLICATE_PREDICTION_TIMEOUT", "300"))
+
+# Erros de modelo (versão removida, sem permissão...): vale tentar o próximo da cadeia
+REPLICATE_RECOVERABLE_ERRORS = ["422", "permission", "version", "not permitted", "does not exist", "not found"]
+
+class ReplicateError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+def replicate_model_name(model_path):
+    """'owner/model:version' -> 'model'"""
+    return model_path.split('/')[1].split(':')[0] if '/' in model_path else model_path
+
+def replicate_headers():
+    return {"Authorization": f"Bearer {REPLICATE_API_KEY}", "Content-Type": "application/json"}
+
+def replicate_input(model_path, enhanced_prompt, width, height, aspect, seed, attempt):
+    """Parâmetros do modelo; em retry (attempt > 0) usa versões mais leves/compatíveis"""
+    # Parâmetros base
+    input_params = {
+        "prompt": enhanced_prompt,
+        "num_outputs": 1
+    }
+    
+    # Adiciona parâmetros específicos baseado no modelo
+    if "flux" in model_path.lower():
+        input_params["aspect_ratio"] = aspect
+        input_params["output_format"] = "png"
+        input_params["output_quality"] = 90 if attempt > 0 else 100  # Reduz qualidade em retry
+        if seed is not None and attempt == 0:  # Só usa seed na primeira tentativa
+            input_params["seed"] = seed
+    else:
+        # SDXL variants
+        input_params["width"] = width
+        input_params["height"] = height
+        
+        if attempt == 0:
+            # Parâmetros completos só na primeira tentativa
+            input_params["num_inference_steps"] = 50
+            input_params["guidance_scale"] = 7.5
+            input_params["scheduler"] = "K_EULER"
+            if seed is not None:
+                input_params["seed"] = seed
+        else:
+            # Parâmetros simplificados em retry (mais rápido e mais compatível)
+            input_params["num_inference_steps"] = 25
+            input_params["guidance_scale"] = 7.0
+    return input_params
 
-async def attempt_image_generation_with_replicate(provider_key, enhanced_prompt, width, height, aspect, seed, attempt=0):
+def replicate_raise_for_status(r):
+    if r.status_code >= 400:
+        try:
+            detail = r.json().get("detail") or r.text
+        except ValueError:
+            detail = r.text
+        raise ReplicateError(f"Replicate ({r.status_code}): {str(detail)[:200]}", r.status_code)
+
+async def create_replicate_prediction(model_path, input_params):
+    """POST da prediction: versão fixa ('owner/model:hash') ou modelo oficial ('owner/model')"""
+    client = get_http_client("replicate")
+    if ":" in model_path:
+        url = f"{REPLICATE_API_BASE}/predictions"
+        body = {"version": model_path.split(":", 1)[1], "input": input_params}
+    else:
+        url = f"{REPLICATE_API_BASE}/models/{model_path}/predictions"
+        body = {"input": input_params}
+
+    async def post():
+        # POST blindado: se a cena for cancelada com o pedido já enviado, a prediction criada
+        # é cancelada assim que a resposta chegar (senão ela roda e cobra sem ninguém esperar)
+        sent = asyncio.ensure_future(client.post(url, json=body, headers=replicate_headers()))
+        try:
+            return await asyncio.shield(sent)
+        except asyncio.CancelledError:
+            sent.add_done_callback(cancel_orphan_prediction)
+            raise
+
+    r = await call_with_rate_limit("replicate", post)
+    replicate_raise_for_status(r)
+    return r.json()
+
+def cancel_orphan_prediction(sent):
+    """Callback do POST abandonado: cancela a prediction se ela chegou a ser criada"""
+    if sent.cancelled() or sent.exception() is not None:
+        return
+    r = sent.result()
+    if r.status_code < 400:
+        asyncio.ensure_future(cancel_replicate_prediction(r.json()))
+
+async def cancel_replicate_prediction(prediction):
+    """Melhor esforço: a predição abandonada (hedge perdedor, job abortado) para de gastar crédito"""
+    url = prediction.get("urls", {}).get("cancel") or f"{REPLICATE_API_BASE}/predictions/{prediction['id']}/cancel"
+    try:
+        await get_http_client("replicate").post(url, headers=replicate_headers(), timeout=10)
+    except httpx.HTTPError:
+        pass
+
+async def wait_replicate_prediction(prediction):
+    """Consulta a prediction até terminar (intervalo crescente). Retorna a URL da imagem"""
+    client = get_http_client("replicate")
+    url = prediction.get("urls", {}).get("get") or f"{REPLICATE_API_BASE}/predictions/{prediction['id']}"
+    started = time.monotonic()
+    interval = REPLICATE_POLL_INTERVAL
+    try:
+        while prediction["status"] not in ("succeeded", "failed", "canceled"):
+            if time.monotonic() - started > REPLICATE_PREDICTION_TIMEOUT:
+                raise TimeoutError(f"prediction {prediction['id']} sem resultado em {REPLICATE_PREDICTION_TIMEOUT:.0f}s")
+            await asyncio.sleep(interval)
+            interval = min(REPLICATE_POLL_MAX_INTERVAL, interval * 1.5)
+            r = await call_with_rate_limit("replicate_poll", lambda: client.get(url, headers=replicate_headers()))
+            replicate_raise_for_status(r)
+            prediction = r.json()
+    except BaseException:
+        # Qualquer saída sem resultado (cancelamento, timeout, erro no polling) libera a prediction
+        if prediction["status"] not in ("succeeded", "failed", "canceled"):
+            asyncio.ensure_future(cancel_replicate_prediction(prediction))
+        raise
+
+    if prediction["status"] != "succeeded":
+        raise ReplicateError(f"prediction {prediction['status']}: {prediction.get('error')}")
+    output = prediction.get("output")
+    if isinstance(output, list):
+        output = output[0] if output else None
+    if not output:
+        raise ReplicateError("prediction sem output")
+    return str(output)
+
+async def attempt_image_generation_with_replicate(provider_key, enhanced_prompt, width, height, aspect, seed, output_path, attempt=0):
     """
-    Tenta gerar imagem com Replicate usando modelos alternativos em caso de falha
+    Gera imagem com Replicate usando modelos alternativos em caso de falha
     
     Args:
         provider_key: 'banana', 'sdxl' ou 'flux_pro'
@@ -1246,87 +2599,79 @@ async def attempt_image_generation_with_replicate(provider_key, enhanced_prompt,
         height: Altura da imagem
         aspect: Aspect ratio string (ex: "16:9")
         seed: Seed para consistência (opcional)
-        attempt: Número da tentativa atual (0-2)
+        output_path: Onde gravar a imagem (download em streaming)
+        attempt: Primeiro modelo da cadeia a tentar (0-2)
     
     Returns:
-        tuple: (image_data, model_used) ou None se falhar
+        tuple: (output_path, model_used) ou None se falhar
     """
-    import replicate
-    
     models_to_try = REPLICATE_FALLBACK_MODELS.get(provider_key, [])
     
-    if attempt >= len(models_to_try):
-        return None  # Esgotou todas as tentativas
-    
-    model_path = models_to_try[attempt]
-    
-    try:
-        model_name = model_path.split('/')[1].split(':')[0] if '/' in model_path else model_path
-        print(f"   🔄 Tentativa {attempt + 1}/{len(models_to_try)}: {model_name}")
-        
-        # Parâmetros base
-        input_params = {
-            "prompt": enhanced_prompt,
-            "num_outputs": 1
-        }
-        
-        # Adiciona parâmetros específicos baseado no modelo
-        if "flux" in model_path.lower():
-            input_params["aspect_ratio"] = aspect
-            input_params["output_format"] = "png"
-            input_params["output_quality"] = 90 if attempt > 0 else 100  # Reduz qualidade em retry
-            if seed is not None and attempt == 0:  # Só usa seed na primeira tentativa
-                input_params["seed"] = seed
-        else:
-            # SDXL variants
-            input_params["width"] = width
-            input_params["height"] = height
+    for attempt in range(attempt, len(models_to_try)):
+        model_path = models_to_try[attempt]
+        model_name = replicate_model_name(model_path)
+        try:
+            print(f"   🔄 Tentativa {attempt + 1}/{len(models_to_try)}: {model_name}")
+            prediction = await create_replicate_prediction(
+                model_path, replicate_input(model_path, enhanced_prompt, width, height, aspect, seed, attempt)
+            )
+            image_url = await wait_replicate_prediction(prediction)
             
-            if attempt == 0:
-                # Parâmetros completos só na primeira tentativa
-                input_params["num_inference_steps"] = 50
-                input_params["guidance_scale"] = 7.5
-                input_params["scheduler"] = "K_EULER"
-                if seed is not None:
-                    input_params["seed"] = seed
-            else:
-                # Parâmetros simplificados em retry (mais rápido e mais compatível)
-                input_params["num_inference_steps"] = 25
-                input_params["guidance_scale"] = 7.0
-        
-        # Executa a geração
-        output = replicate.run(model_path, input=input_params)
-        
-        # Extrai URL da imagem
-        if isinstance(output, list):
-            image_url = str(output[0])
-        else:
-            image_url = str(output)
-        
-        # Download da imagem
-        image_data = requests.get(image_url, timeout=30).content
-        
-        print(f"   ✅ Sucesso com {model_name}")
-        
-        return image_data, model_name
-        
-    except Exception as e:
-        error_msg = str(e)
-        print(f"   ⚠️ Falha na tentativa {attempt + 1}: {error_msg[:120]}")
-        
-        # Se não foi erro de permissão/versão/quota, não tenta mais
-        if not any(keyword in error_msg.lower() for keyword in ["422", "permission", "version", "not permitted", "does not exist"]):
-            print(f"   ⚠️ Erro não recuperável, pulando retries")
-            return None
+            # Download da imagem direto para disco (assim que a prediction termina)
+            await download_to_file("downloads", image_url, output_path)
+            
+            print(f"   ✅ Sucesso com {model_name}")
+            return output_path, model_name
         
-        # Tenta próximo modelo
-        return await attempt_image_generation_with_replicate(
-            provider_key, enhanced_prompt, width, height, aspect, seed, attempt + 1
-        )
+        except Exception as e:
+            error_msg = str(e)
+            print(f"   ⚠️ Falha na tentativa {attempt + 1}: {error_msg[:120]}")
+            
+            # Se não foi erro de permissão/versão, não tenta mais
+            if not any(keyword in error_msg.lower() for keyword in REPLICATE_RECOVERABLE_ERRORS):
+                print(f"   ⚠️ Erro não recuperável, pulando retries")
+                return None
+            # Tenta próximo modelo
+    
+    return None  # Esgotou todas as tentativas
+
 
+def pollinations_url(prompt, width, height):
+    return f"https://image.pollinations.ai/prompt/{quote(prompt, safe='')}?width={width}&height={height}&model=flux&nologo=true"
+
+# ==========================================
+# OTIMIZAÇÃO #13: CACHE GLOBAL DE IMAGENS
+# ==========================================
+
+# Imagens nunca são reescritas no lugar (download usa .part + rename), então hard link é seguro
+image_cache = DiskLRUCache("images", int(os.getenv("IMAGE_CACHE_MAX_MB", "4096")) * 1024 * 1024, ".img", use_hardlinks=True)
+
+def image_cache_models(provider):
+    """Modelos que podem atender o provider (ordem de preferência)"""
+    if provider in REPLICATE_FALLBACK_MODELS:
+        return [replicate_model_name(m) for m in REPLICATE_FALLBACK_MODELS[provider]]
+    if provider == "dalle3":
+        return ["dall-e-3"]
+    return ["flux"]  # Pollinations
+
+def image_cache_key(enhanced_prompt, provider, model, seed, width, height):
+    """Chave: prompt já expandido pelo template, provider, modelo realmente usado, seed e tamanho"""
+    if not IMAGE_PROVIDERS.get(provider, {}).get("supports_seed"):
+        seed = None  # provider ignora seed: não fragmenta o cache
+    return content_hash(enhanced_prompt, provider, model, seed, width, height)
+
+def image_cache_origin(provider, provider_used):
+    """Traduz o rótulo retornado pela geração em (provider, modelo) para gravar no cache"""
+    if provider_used == "DALL-E 3":
+        return "dalle3", "dall-e-3"
+    if provider_used in ("Pollinations", "Pollinations (Fallback)"):
+        return "pollinations", "flux"
+    if provider in REPLICATE_FALLBACK_MODELS and provider_used in image_cache_models(provider):
+        return provider, provider_used
+    return None  # ex: Pollinations (Simple) usa prompt reduzido, não corresponde à chave
 
 # --- GERAÇÃO DE IMAGENS COM RETRY INTELIGENTE ---
-async def generate_image_with_provider(prompt, provider, aspect_ratio, seed=None, style_template="documentary"):
+async def generate_image_with_provider(prompt, provider, aspect_ratio, output_path, seed=None, style_template="documentary"):
     """
     Gera imagem usando o provider especificado com SISTEMA DE RETRY AUTOMÁTICO
     
@@ -1334,11 +2679,12 @@ async def generate_image_with_provider(prompt, provider, aspect_ratio, seed=None
         prompt: Descrição da cena
         provider: flux_pro, dalle3, sdxl, banana, pollinations
         aspect_ratio: vertical ou horizontal
+        output_path: Onde gravar a imagem (download em streaming)
         seed: Seed para consistência (opcional)
         style_template: documentary, cinematic, photorealistic
     
     Returns:
-        tuple: (image_data, provider_used) - NUNCA retorna erro, sempre gera imagem
+        tuple: (output_path, provider_used) - NUNCA retorna erro, sempre gera imagem
     """
     
     # ===== VALIDAÇÃO =====
@@ -1359,9 +2705,6 @@ async def generate_image_with_provider(prompt, provider, aspect_ratio, seed=None
             print(f"⚠️ {provider} requer REPLICATE_API_KEY, usando Pollinations")
             provider = "pollinations"
             config = IMAGE_PROVIDERS["pollinations"]
-        
-        if api_key_var == "REPLICATE_API_KEY" and REPLICATE_API_KEY:
-            os.environ["REPLICATE_API_TOKEN"] = REPLICATE_API_KEY
     
     # Aplica template de estilo
     template = VISUAL_STYLE_TEMPLATES.get(style_template, VISUAL_STYLE_TEMPLATES["documentary"])
@@ -1372,242 +2715,536 @@ async def generate_image_with_provider(prompt, provider, aspect_ratio, seed=None
     width = 720 if aspect_ratio == "vertical" else 1280
     height = 1280 if aspect_ratio == "vertical" else 720
     
-    # ===== TENTATIVA COM PROVIDER ORIGINAL =====
-    try:
-        # ===== DALL-E 3 =====
-        if provider == "dalle3":
-            client = OpenAI(api_key=OPENAI_API_KEY)
-            size = "1024x1792" if aspect_ratio == "vertical" else "1792x1024"
-            
-            try:
-                response = client.images.generate(
-                    model="dall-e-3",
-                    prompt=enhanced_prompt[:4000],
-                    size=size,
-                    quality="hd",
-                    n=1
-                )
-                image_url = response.data[0].url
-                image_data = requests.get(image_url, timeout=30).content
-                return image_data, "DALL-E 3"
-            
-            except Exception as e:
-                print(f"   ⚠️ DALL-E 3 falhou: {str(e)[:80]}")
-                # DALL-E não tem retry, vai direto pro fallback
-        
-        # ===== REPLICATE PROVIDERS (com retry inteligente) =====
-        elif provider in ["flux_pro", "sdxl", "banana"]:
-            result = await attempt_image_generation_with_replicate(
-                provider, enhanced_prompt, width, height, aspect, seed, attempt=0
-            )
-            
-            if result:
-                return result  # Sucesso com algum dos modelos!
-            
-            print(f"   ⚠️ Todas as tentativas com {provider} falharam")
-        
-        # ===== POLLINATIONS (sempre funciona) =====
-        elif provider == "pollinations":
-            url = f"https://image.pollinations.ai/prompt/{enhanced_prompt.replace(' ','%20')}?width={width}&height={height}&model=flux&nologo=true"
-            image_data = requests.get(url, timeout=30).content
-            return image_data, "Pollinations"
-    
-    except Exception as e:
-        print(f"   ⚠️ Erro inesperado com {provider}: {str(e)[:100]}")
-    
-    # ===== FALLBACK FINAL: POLLINATIONS =====
-    print(f"   🔄 Fallback automático para Pollinations (gratuito e sempre disponível)")
-    try:
-        url = f"https://image.pollinations.ai/prompt/{enhanced_prompt.replace(' ','%20')}?width={width}&height={height}&model=flux&nologo=true"
-        image_data = requests.get(url, timeout=30).content
-        return image_data, "Pollinations (Fallback)"
-    
-    except Exception as e:
-        # Última tentativa: Pollinations com prompt simplificado
-        print(f"   ⚠️ Pollinations falhou, tentando com prompt simplificado")
-        simple_prompt = prompt[:200]  # Usa prompt original, mais curto
-        url = f"https://image.pollinations.ai/prompt/{simple_prompt.replace(' ','%20')}?width={width}&height={height}&model=flux&nologo=true"
-        image_data = requests.get(url, timeout=30).content
-        return image_data, "Pollinations (Simple)"
-
-    narr_text = scene.get('narration') or scene.get('script') or scene.get('text')
-    if not narr_text: return None
-    
-    audio_path = os.path.join(project_path, f"act{act_index}_scene{index}.mp3")
-    clean_txt = clean_text_for_tts(narr_text)
-    
-    # Obtém configurações de voz e estilo
-    voice_config = VOICE_CONFIGS.get(voice_config_key, VOICE_CONFIGS["edge_tts"])
-    style_config = VOICE_STYLES.get(voice_style, VOICE_STYLES["documentary"])
+    # ===== CACHE GLOBAL (mesmo prompt/seed/modelo em outro projeto) =====
+    for model in image_cache_models(provider):
+        key = image_cache_key(enhanced_prompt, provider, model, seed, width, height)
+        if await run_blocking(image_cache.fetch, key, output_path):
+            return output_path, f"Cache ({model})"
     
-    # Adiciona instrução de estilo ao texto (para TTS que suportam)
-    styled_prompt = f"{style_config['instruction']}\n\n{clean_txt}"
+    result = await request_image(prompt, enhanced_prompt, provider, aspect_ratio, aspect, width, height, seed, output_path)
     
-    tts_model_used = "None"
-    provider = voice_config["provider"]
-    
-    # ===== OPENAI TTS =====
-    if provider == "openai":
-        if not OPENAI_API_KEY:
-            return {"error": "ERRO VOZ: OpenAI TTS selecionado mas sem chave API."}
-        
-        try:
-            from openai import OpenAI
-            client = OpenAI(api_key=OPENAI_API_KEY)
-            
-            response = client.audio.speech.create(
-                model="tts-1-hd",  # ou "tts-1" para mais rápido
-                voice=voice_config["voice"],
-                input=clean_txt,
-                speed=style_config["speed"]
-            )
-            
-            response.stream_to_file(audio_path)
-            tts_model_used = f"OpenAI TTS ({voice_config['voice']})"
-        
-        except Exception as e:
-            return {"error": f"FALHA OpenAI TTS: {str(e)}"}
+    origin = image_cache_origin(provider, result[1])
+    if origin and os.path.exists(output_path):
+        cache_provider, cache_model = origin
+        key = image_cache_key(enhanced_prompt, cache_provider, cache_model, seed, width, height)
+        await run_blocking(image_cache.store, key, output_path)
+    return result
+
+# ==========================================
+# OTIMIZAÇÃO #24: REQUISIÇÕES DE IMAGEM COM HEDGING
+# ==========================================
+# O provider principal recebe um prazo = p90 da sua latência recente. Passou do prazo sem
+# resposta, a próxima opção da cadeia dispara em paralelo; vence o primeiro sucesso e o
+# perdedor é cancelado. Falha rápida continua caindo para a próxima opção como antes.
+
+IMAGE_HEDGING = os.getenv("IMAGE_HEDGING", "1") == "1"
+IMAGE_HEDGE_DEADLINE = float(os.getenv("IMAGE_HEDGE_DEADLINE", "30"))   # prazo sem histórico e teto do p90
+IMAGE_HEDGE_MIN_DEADLINE = float(os.getenv("IMAGE_HEDGE_MIN_DEADLINE", "3"))
+HEDGE_WINDOW = 50          # latências guardadas por provider
+HEDGE_MIN_SAMPLES = 5      # abaixo disso o p90 não é confiável: usa IMAGE_HEDGE_DEADLINE
+
+class HedgeStats:
+    """Latências de sucesso e contadores de hedge por provider (deste processo)"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.counters = {}
+
+    def _counters(self, provider):
+        return self.counters.setdefault(provider, {"requests": 0, "hedged": 0, "backup_wins": 0, "failures": 0})
+
+    def record(self, provider, seconds):
+        self.latencies.setdefault(provider, deque(maxlen=HEDGE_WINDOW)).append(seconds)
+
+    def p90(self, provider):
+        samples = sorted(self.latencies.get(provider, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.9))]
+
+    def deadline(self, provider):
+        p90 = self.p90(provider)
+        if p90 is None:
+            return IMAGE_HEDGE_DEADLINE
+        return min(IMAGE_HEDGE_DEADLINE, max(IMAGE_HEDGE_MIN_DEADLINE, p90))
+
+    def count(self, provider, key):
+        self._counters(provider)[key] += 1
+
+    def stats(self):
+        out = {}
+        for provider in set(self.counters) | set(self.latencies):
+            c = self._counters(provider)
+            p90 = self.p90(provider)
+            out[provider] = {**c, "hedge_rate": round(c["hedged"] / c["requests"], 3) if c["requests"] else 0.0,
+                             "p90_s": round(p90, 2) if p90 is not None else None,
+                             "deadline_s": round(self.deadline(provider), 2)}
+        return out
+
+hedge_stats = HedgeStats()
+
+def discard_partial(path):
+    for leftover in (path, path + ".part"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+
+async def run_hedged(attempts, output_path):
+    """
+    attempts: [(provider, fn(caminho) -> rótulo ou None, hedge)] em ordem de preferência.
+    hedge=False: a opção só entra depois que as anteriores falharem (nunca em paralelo).
+    Cada tentativa grava no próprio arquivo temporário; o vencedor vira output_path.
     
-    # ===== ELEVENLABS =====
-    elif provider == "elevenlabs":
-        if not ELEVENLABS_API_KEY:
-            return {"error": "ERRO VOZ: ElevenLabs selecionado mas sem chave API."}
-        
-        try:
-            url = f"https://api.elevenlabs.io/v1/text-to-speech/{ELEVENLABS_VOICE_ID}"
-            headers = {"xi-api-key": ELEVENLABS_API_KEY, "Content-Type": "application/json"}
-            
-            # ElevenLabs suporta stability e similarity_boost para controle de estilo
-            data = {
-                "text": clean_txt,
-                "model_id": "eleven_turbo_v2",
-                "voice_settings": {
-                    "stability": 0.5 if voice_style == "hype" else 0.75,
-                    "similarity_boost": 0.75
-                }
-            }
-            
-            r = requests.post(url, json=data, headers=headers, timeout=20)
-            
-            if r.status_code == 200:
-                with open(audio_path, 'wb') as f: f.write(r.content)
-                tts_model_used = "ElevenLabs"
-            else:
-                return {"error": f"ElevenLabs Error ({r.status_code}): {r.text}"}
-        
-        except Exception as e:
-            return {"error": f"FALHA ElevenLabs: {str(e)}"}
+    Returns:
+        str: rótulo do provider vencedor, ou None se todas falharem
+    """
+    running = {}   # task -> (provider, caminho temporário, início, é backup)
+    next_index = 0
+    primary = attempts[0][0]
+    hedge_stats.count(primary, "requests")
+
+    def launch(is_backup):
+        nonlocal next_index
+        provider, fn, _ = attempts[next_index]
+        tmp_path = f"{output_path}.{next_index}.tmp"
+        running[asyncio.ensure_future(fn(tmp_path))] = (provider, tmp_path, time.monotonic(), is_backup)
+        next_index += 1
+
+    launch(False)
+    try:
+        while running:
+            timeout = None
+            if IMAGE_HEDGING and next_index < len(attempts) and attempts[next_index][2]:
+                # Prazo da tentativa mais recente (a mais lenta já teve o seu)
+                provider, _, started, _ = max(running.values(), key=lambda r: r[2])
+                timeout = max(0.0, started + hedge_stats.deadline(provider) - time.monotonic())
+            done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                late = max(running.values(), key=lambda r: r[2])[0]
+                print(f"   🏁 {late} passou de {hedge_stats.deadline(late):.1f}s: disparando {attempts[next_index][0]} em paralelo")
+                hedge_stats.count(primary, "hedged")
+                launch(True)
+                continue
+
+            for task in done:
+                provider, tmp_path, started, is_backup = running.pop(task)
+                label = None if task.exception() else task.result()
+                if label and os.path.exists(tmp_path):
+                    hedge_stats.record(provider, time.monotonic() - started)
+                    os.replace(tmp_path, output_path)
+                    if is_backup:
+                        hedge_stats.count(primary, "backup_wins")
+                    return label
+                if task.exception():
+                    print(f"   ⚠️ {provider} falhou: {str(task.exception())[:100]}")
+                hedge_stats.count(provider, "failures")
+                discard_partial(tmp_path)
+
+            # Falhou sem ninguém em voo: próxima opção da cadeia (fallback sequencial)
+            if not running and next_index < len(attempts):
+                launch(False)
+        return None
+    finally:
+        # Perdedores (ou aborto do job): cancela e limpa os temporários
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+            for _, tmp_path, _, _ in running.values():
+                discard_partial(tmp_path)
+
+async def request_image(prompt, enhanced_prompt, provider, aspect_ratio, aspect, width, height, seed, output_path):
+    """Chama o provider (com hedging e fallback Pollinations). Retorna (output_path, provider_used)"""
+
+    async def dalle3(path):
+        client = get_openai_client()
+        size = "1024x1792" if aspect_ratio == "vertical" else "1792x1024"
+        response = await call_with_rate_limit("dalle3", lambda: client.images.generate(
+            model="dall-e-3",
+            prompt=enhanced_prompt[:4000],
+            size=size,
+            quality="hd",
+            n=1
+        ))
+        await download_to_file("downloads", response.data[0].url, path)
+        return "DALL-E 3"
+
+    async def replicate_chain(path):
+        # REPLICATE PROVIDERS (com retry inteligente entre modelos)
+        result = await attempt_image_generation_with_replicate(
+            provider, enhanced_prompt, width, height, aspect, seed, path, attempt=0
+        )
+        if not result:
+            print(f"   ⚠️ Todas as tentativas com {provider} falharam")
+            return None
+        return result[1]  # Sucesso com algum dos modelos!
+
+    def pollinations(image_prompt, label):
+        async def fetch(path):
+            await call_with_rate_limit("pollinations", lambda: download_to_file("pollinations", pollinations_url(image_prompt, width, height), path))
+            return label
+        return fetch
+
+    # Última opção: Pollinations com prompt simplificado (prompt original, mais curto).
+    # Não entra em paralelo: só depois que as outras falharem
+    simple = ("pollinations", pollinations(prompt[:200], "Pollinations (Simple)"), False)
+    if provider == "dalle3":
+        attempts = [("dalle3", dalle3, True), ("pollinations", pollinations(enhanced_prompt, "Pollinations (Fallback)"), True), simple]
+    elif provider in ["flux_pro", "sdxl", "banana"]:
+        attempts = [(provider, replicate_chain, True), ("pollinations", pollinations(enhanced_prompt, "Pollinations (Fallback)"), True), simple]
+    else:
+        # Pollinations (sempre funciona)
+        attempts = [("pollinations", pollinations(enhanced_prompt, "Pollinations"), True), simple]
+
+    label = await run_hedged(attempts, output_path)
+    if label is None:
+        raise RuntimeError(f"Nenhum provider de imagem respondeu ({provider} + Pollinations)")
+    return output_path, label
+
+# ==========================================
+# OTIMIZAÇÃO #8: PRODUÇÃO CONCORRENTE DE ASSETS
+# ==========================================
+
+# Máximo de chamadas simultâneas por provider (compartilhado entre cenas)
+PROVIDER_CONCURRENCY = {
+    "openai": 4,
+    "elevenlabs": 3,
+    "gemini": 4,
+    "edge": 6,
+    "replicate": 4,
+    "replicate_poll": 8,
+    "dalle3": 2,
+    "pollinations": 3,
+}
+
+# Máximo de cenas produzindo assets ao mesmo tempo (todos os atos)
+ASSET_CONCURRENCY = int(os.getenv("ASSET_CONCURRENCY", "8"))
+
+# Intervalo entre comentários SSE de keep-alive enquanto aguardamos trabalho pesado
+KEEP_ALIVE_INTERVAL = 10
+
+async def keep_alive_until(task, interval=KEEP_ALIVE_INTERVAL):
+    """Aguarda a task emitindo keep-alive SSE enquanto ela não termina"""
+    while not task.done():
+        done, _ = await asyncio.wait({task}, timeout=interval)
+        if not done:
+            yield ": keep-alive\n\n"
+
+def start_asset_production(full_script_data, project_path, voice_config_key, voice_style, image_provider, project_seed, visual_style, completed=None):
+    """
+    Dispara a produção de assets de TODAS as cenas de todos os atos em paralelo.
+    completed: {"ato_cena": resultado} de um checkpoint; essas cenas não são produzidas de novo.
     
-    # ===== GEMINI TTS (usando Google Cloud TTS) =====
-    elif provider == "gemini":
-        if not GEMINI_API_KEY:
-            return {"error": "ERRO VOZ: Gemini TTS selecionado mas sem chave API."}
-        
+    Returns:
+        list: [(act_index, scene_index, total_scenes_no_ato, task)] na ordem ato/cena
+    """
+    gate = asyncio.Semaphore(ASSET_CONCURRENCY)
+    # Replicate gera no servidor deles (predictions): as imagens de TODAS as cenas começam já,
+    # fora do limite de cenas simultâneas; o limitador do provider controla as chamadas HTTP
+    prefetch_images = image_provider in REPLICATE_FALLBACK_MODELS and bool(REPLICATE_API_KEY)
+
+    async def produce(scene, index, act_index):
+        image_task = None
+        if prefetch_images and scene_narration(scene):
+            image_task = asyncio.ensure_future(scene_image_job(
+                scene, index, act_index, project_path, image_provider, project_seed, visual_style
+            ))
         try:
-            # Usa a API do Google Cloud Text-to-Speech via REST
-            url = f"https://texttospeech.googleapis.com/v1/text:synthesize?key={GEMINI_API_KEY}"
-            headers = {"Content-Type": "application/json"}
-            
-            payload = {
-                "input": {"text": clean_txt},
-                "voice": {
-                    "languageCode": "en-US",
-                    "name": voice_config["voice"],
-                    "ssmlGender": "MALE"
-                },
-                "audioConfig": {
-                    "audioEncoding": "MP3",
-                    "speakingRate": style_config["speed"],
-                    "pitch": float(style_config["pitch"].replace("Hz", ""))
-                }
-            }
-            
-            r = requests.post(url, json=payload, headers=headers, timeout=20)
-            
-            if r.status_code == 200:
-                import base64
-                audio_content = base64.b64decode(r.json()["audioContent"])
-                with open(audio_path, 'wb') as f: f.write(audio_content)
-                tts_model_used = "Gemini TTS"
+            async with gate, scheduler.slot("network"):
+                return await generate_visuals_and_audio(
+                    scene, index, act_index, project_path, voice_config_key,
+                    voice_style, image_provider, project_seed, visual_style, image_task
+                )
+        finally:
+            # Cena abortada antes de entrar no gate: a imagem não fica órfã
+            if image_task is not None and not image_task.done():
+                image_task.cancel()
+
+    completed = completed or {}
+    loop = asyncio.get_running_loop()
+    jobs = []
+    for act_index, act_data in enumerate(full_script_data):
+        scenes = act_data.get('scenes', [])
+        for index, scene in enumerate(scenes):
+            previous = completed.get(f"{act_index}_{index}")
+            if previous and all(os.path.exists(p) for p in previous[:2]):
+                task = loop.create_future()
+                task.set_result(tuple(previous))
             else:
-                # Fallback para Edge TTS se Gemini falhar
-                await edge_tts.Communicate(clean_txt, "en-US-ChristopherNeural").save(audio_path)
-                tts_model_used = "EdgeTTS (Fallback)"
-        
-        except Exception as e:
-            # Fallback para Edge TTS
-            await edge_tts.Communicate(clean_txt, "en-US-ChristopherNeural").save(audio_path)
-            tts_model_used = "EdgeTTS (Fallback)"
-    
-    # ===== EDGE TTS (Fallback padrão) =====
-    else:
+                task = asyncio.create_task(produce(scene, index, act_index))
+            jobs.append((act_index, index, len(scenes), task))
+    return jobs
+
+# ==========================================
+# OTIMIZAÇÃO #23: LIMITE DE TAXA POR PROVIDER (TOKEN BUCKET + BACKOFF)
+# ==========================================
+# Um limitador por provider, compartilhado por todos os jobs do processo: requisições por minuto
+# (token bucket), chamadas simultâneas (semáforo) e pausa do provider inteiro depois de um 429.
+# 429/503 não abortam mais o job: esperam o Retry-After (ou backoff exponencial com jitter) e repetem.
+
+# Requisições por minuto (0 = sem limite de taxa, só concorrência)
+PROVIDER_RPM = {
+    "openai": 500,
+    "elevenlabs": 120,
+    "gemini": 60,          # generateContent (texto)
+    "google_tts": 300,     # Cloud TTS (voz "gemini")
+    "edge": 0,
+    "replicate": 600,      # criação de predictions
+    "replicate_poll": 3000,
+    "dalle3": 5,           # tier 1: 5 imagens/min
+    "pollinations": 60,
+}
+PROVIDER_CONCURRENCY["google_tts"] = 4
+
+# Sobrescreve por provider: RATE_LIMIT_GEMINI_RPM=15, RATE_LIMIT_ELEVENLABS_CONCURRENCY=2, ...
+for _name in set(PROVIDER_RPM) | set(PROVIDER_CONCURRENCY):
+    PROVIDER_RPM[_name] = float(os.getenv(f"RATE_LIMIT_{_name.upper()}_RPM", PROVIDER_RPM.get(_name, 0)))
+    PROVIDER_CONCURRENCY[_name] = int(os.getenv(f"RATE_LIMIT_{_name.upper()}_CONCURRENCY", PROVIDER_CONCURRENCY.get(_name, 2)))
+
+RATE_LIMIT_RETRIES = int(os.getenv("RATE_LIMIT_RETRIES", "6"))
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "120"))   # Retry-After maior (cota diária): desiste
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+RETRYABLE_STATUS = (429, 503)
+
+class RateLimited(Exception):
+    """O provider pediu para esperar (429/503) e as tentativas acabaram"""
+    def __init__(self, provider, retry_after=None, detail=""):
+        super().__init__(f"{provider}: limite de taxa ({detail})")
+        self.provider = provider
+        self.retry_after = retry_after
+
+class ProviderLimiter:
+    """Token bucket (rpm) + semáforo (concorrência) + pausa compartilhada depois de um 429"""
+
+    def __init__(self, name, rpm, concurrency):
+        self.name = name
+        self.rate = rpm / 60.0 if rpm else None   # tokens por segundo
+        self.capacity = max(1.0, float(concurrency))   # rajada máxima
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.lock = asyncio.Lock()
+        self.counters = {"requests": 0, "throttled": 0, "rate_limited": 0, "waited_s": 0.0}
+
+    async def _take_token(self):
+        async with self.lock:   # ordem de chegada: quem espera há mais tempo leva o próximo token
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                if self.rate is None:
+                    return
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    async def __aenter__(self):
+        started = time.monotonic()
+        await self.semaphore.acquire()
         try:
-            # Edge TTS com ajuste de velocidade via SSML
-            if voice_style == "hype":
-                ssml_text = f'<speak><prosody rate="fast">{clean_txt}</prosody></speak>'
-            elif voice_style == "asmr":
-                ssml_text = f'<speak><prosody rate="slow" volume="soft">{clean_txt}</prosody></speak>'
+            await self._take_token()
+        except BaseException:
+            self.semaphore.release()
+            raise
+        waited = time.monotonic() - started
+        self.counters["requests"] += 1
+        if waited > 0.05:
+            self.counters["throttled"] += 1
+            self.counters["waited_s"] += waited
+        return self
+
+    async def __aexit__(self, *exc):
+        self.semaphore.release()
+
+    def pause(self, seconds):
+        """Todos os jobs esperam; depois da pausa o bucket recomeça vazio (sem rajada)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+        self.updated = self.paused_until
+
+    def stats(self):
+        return {**self.counters, "waited_s": round(self.counters["waited_s"], 1),
+                "rpm": round(self.rate * 60) if self.rate else None,
+                "concurrency": PROVIDER_CONCURRENCY.get(self.name, 2),
+                "paused_s": round(max(0.0, self.paused_until - time.monotonic()), 1)}
+
+_provider_limiters = {}
+
+def provider_slot(provider):
+    """Limitador (async with) compartilhado do provider: taxa + concorrência"""
+    _bind_http_loop()
+    if provider not in _provider_limiters:
+        _provider_limiters[provider] = ProviderLimiter(
+            provider, PROVIDER_RPM.get(provider, 0), PROVIDER_CONCURRENCY.get(provider, 2)
+        )
+    return _provider_limiters[provider]
+
+def retry_after_seconds(headers, body=""):
+    """Retry-After (segundos ou data HTTP), retry-after-ms (OpenAI) ou retryDelay no corpo (Google)"""
+    if headers:
+        if headers.get("retry-after-ms"):
+            try:
+                return float(headers["retry-after-ms"]) / 1000
+            except ValueError:
+                pass
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                try:
+                    from email.utils import parsedate_to_datetime
+                    return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+    match = re.search(r'"retryDelay"\s*:\s*"([\d.]+)s"', body or "")
+    return float(match.group(1)) if match else None
+
+def rate_limit_signal(provider, outcome):
+    """Resposta ou exceção que pede para esperar -> RateLimited; qualquer outra coisa -> None"""
+    if isinstance(outcome, httpx.Response):
+        response = outcome
+    elif isinstance(outcome, httpx.HTTPStatusError):
+        response = outcome.response
+    else:
+        # SDKs (OpenAI, Replicate): exceção com status e, às vezes, a resposta httpx
+        status = getattr(outcome, "status_code", None) or getattr(outcome, "status", None)
+        if status not in RETRYABLE_STATUS or "insufficient_quota" in str(outcome):
+            return None   # sem crédito não adianta esperar
+        headers = getattr(getattr(outcome, "response", None), "headers", None)
+        return RateLimited(provider, retry_after_seconds(headers), f"HTTP {status}")
+    if response.status_code not in RETRYABLE_STATUS:
+        return None
+    try:
+        body = response.text
+    except httpx.ResponseNotRead:
+        body = ""   # download em streaming: corpo não lido
+    return RateLimited(provider, retry_after_seconds(response.headers, body), f"HTTP {response.status_code}")
+
+def backoff_delay(attempt, retry_after=None):
+    """Retry-After do provider (+ jitter) ou exponencial com jitter (metade fixa, metade aleatória)"""
+    if retry_after is not None:
+        return retry_after + random.uniform(0, BACKOFF_BASE)
+    cap = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+    return random.uniform(cap / 2, cap)
+
+async def call_with_rate_limit(provider, request, max_retries=None):
+    """
+    Executa request() (corrotina sem argumentos) dentro do limitador do provider.
+    429/503 pausam o provider para todos os jobs e a chamada é repetida; esgotadas as
+    tentativas (ou Retry-After acima de RATE_LIMIT_MAX_WAIT) levanta RateLimited.
+    """
+    max_retries = RATE_LIMIT_RETRIES if max_retries is None else max_retries
+    limiter = provider_slot(provider)
+    for attempt in range(max_retries + 1):
+        async with limiter:
+            try:
+                outcome = await request()
+            except Exception as e:
+                limited = rate_limit_signal(provider, e)
+                if limited is None:
+                    raise
             else:
-                ssml_text = clean_txt
-            
-            await edge_tts.Communicate(ssml_text, voice_config["voice"]).save(audio_path)
-            tts_model_used = "EdgeTTS"
-        except Exception as e:
-            return {"error": f"FALHA TOTAL DE VOZ: {str(e)}"}
-    
+                limited = rate_limit_signal(provider, outcome)
+                if limited is None:
+                    return outcome
+        limiter.counters["rate_limited"] += 1
+        if attempt == max_retries or (limited.retry_after or 0) > RATE_LIMIT_MAX_WAIT:
+            raise limited
+        delay = backoff_delay(attempt, limited.retry_after)
+        limiter.pause(delay)
+        print(f"   ⏳ {provider}: limite de taxa, aguardando {delay:.1f}s (tentativa {attempt + 1}/{max_retries})")
+
 # --- GERAÇÃO DE MÍDIA ---
-async def generate_visuals_and_audio(scene, index, act_index, project_path, voice_config_key, voice_style, image_provider, project_seed, visual_style):
-    narr_text = scene.get('narration') or scene.get('script') or scene.get('text')
-    if not narr_text: return None
-    
-    audio_path = os.path.join(project_path, f"act{act_index}_scene{index}.mp3")
-    clean_txt = clean_text_for_tts(narr_text)
-    
-    # --- LÓGICA DE SELEÇÃO DE VOZ ATUALIZADA ---
+def resolve_voice_config(voice_config_key):
+    """Resolve a chave de voz (preset ou voz dinâmica ElevenLabs 'el_dyn_<id>')"""
     if voice_config_key.startswith("el_dyn_"):
         # É uma voz dinâmica do ElevenLabs
-        real_voice_id = voice_config_key.replace("el_dyn_", "")
-        voice_config = {
+        return {
             "provider": "elevenlabs",
-            "voice": real_voice_id, # ID real da API
+            "voice": voice_config_key.replace("el_dyn_", ""),  # ID real da API
             "name": "ElevenLabs Dynamic"
         }
-    else:
-        # É um preset (OpenAI, Edge, ou preset ElevenLabs do .env)
-        voice_config = VOICE_CONFIGS.get(voice_config_key, VOICE_CONFIGS["edge_tts"])
+    # É um preset (OpenAI, Edge, ou preset ElevenLabs do .env)
+    return VOICE_CONFIGS.get(voice_config_key, VOICE_CONFIGS["edge_tts"])
 
-    style_config = VOICE_STYLES.get(voice_style, VOICE_STYLES["documentary"])
-    
-    # Adiciona instrução de estilo
-    styled_prompt = f"{style_config['instruction']}\n\n{clean_txt}"
+def restore_word_punctuation(words, text):
+    """
+    WordBoundary do Edge vem sem pontuação: localiza cada palavra no texto original (em ordem)
+    e devolve o token completo, com a pontuação final, para a quebra de frases funcionar.
+    """
+    cursor = 0
+    lowered = text.lower()
+    for word in words:
+        found = lowered.find(word["word"].lower(), cursor)
+        if found < 0:
+            continue  # palavra normalizada pelo TTS (números, abreviações): mantém como veio
+        end = found + len(word["word"])
+        while end < len(text) and not text[end].isspace() and not text[end].isalnum():
+            end += 1
+        word["word"] = text[found:end]
+        cursor = end
+    return words
+
+async def edge_tts_with_timings(text, voice, audio_path, source_text=None):
+    """
+    Edge TTS gravando o áudio e coletando os eventos WordBoundary (offset em unidades de 100ns).
+    source_text: texto sem SSML, usado para recuperar a pontuação das palavras.
+    """
+    communicate = edge_tts.Communicate(text, voice, boundary="WordBoundary")
+    words = []
+    tmp_path = audio_path + ".part"
+    with open(tmp_path, 'wb') as f:
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                f.write(chunk["data"])
+            elif chunk["type"] == "WordBoundary":
+                start = chunk["offset"] / 10_000_000
+                words.append({"word": chunk["text"], "start": start, "end": start + chunk["duration"] / 10_000_000})
+    os.replace(tmp_path, audio_path)
+    return restore_word_punctuation(words, source_text or text)
+
+async def synthesize_speech(clean_txt, audio_path, voice_config, voice_style):
+    """
+    Gera o áudio da narração com o provider da voz
     
-    tts_model_used = "None"
+    Returns:
+        str: tts_model_used, ou dict com error
+    """
+    style_config = VOICE_STYLES.get(voice_style, VOICE_STYLES["documentary"])
     provider = voice_config["provider"]
-    
-    # ===== GERAÇÃO DE ÁUDIO (mantém lógica original) =====
+
+    # ===== OPENAI TTS =====
     if provider == "openai":
         if not OPENAI_API_KEY:
             return {"error": "ERRO VOZ: OpenAI TTS selecionado mas sem chave API."}
         
         try:
-            from openai import OpenAI
-            client = OpenAI(api_key=OPENAI_API_KEY)
+            client = get_openai_client()
             
-            response = client.audio.speech.create(
-                model="tts-1-hd",
-                voice=voice_config["voice"],
-                input=clean_txt,
-                speed=style_config["speed"]
-            )
+            async def speak():
+                async with client.audio.speech.with_streaming_response.create(
+                    model="tts-1-hd",
+                    voice=voice_config["voice"],
+                    input=clean_txt,
+                    speed=style_config["speed"]
+                ) as response:
+                    await response.stream_to_file(audio_path)
             
-            response.stream_to_file(audio_path)
-            tts_model_used = f"OpenAI TTS ({voice_config['voice']})"
+            await call_with_rate_limit("openai", speak)
+            return f"OpenAI TTS ({voice_config['voice']})"
         
         except Exception as e:
             return {"error": f"FALHA OpenAI TTS: {str(e)}"}
     
-# ===== ELEVENLABS (ATUALIZADO) =====
-    if provider == "elevenlabs": # Alterei de elif para if para facilitar a leitura aqui, mas mantenha a cadeia elif
+    # ===== ELEVENLABS =====
+    elif provider == "elevenlabs":
         if not ELEVENLABS_API_KEY:
             return {"error": "ERRO VOZ: ElevenLabs selecionado mas sem chave API."}
         
@@ -1617,7 +3254,8 @@ async def generate_visuals_and_audio(scene, index, act_index, project_path, voic
             if not target_voice_id:
                 target_voice_id = ELEVENLABS_VOICE_ID # Fallback para o .env se for o preset antigo
             
-            url = f"https://api.elevenlabs.io/v1/text-to-speech/{target_voice_id}"
+            # with-timestamps devolve o áudio + alinhamento por caractere (dispensa o Whisper)
+            url = f"https://api.elevenlabs.io/v1/text-to-speech/{target_voice_id}/with-timestamps"
             headers = {"xi-api-key": ELEVENLABS_API_KEY, "Content-Type": "application/json"}
             
             data = {
@@ -1629,17 +3267,23 @@ async def generate_visuals_and_audio(scene, index, act_index, project_path, voic
                 }
             }
             
-            r = requests.post(url, json=data, headers=headers, timeout=20)
+            r = await call_with_rate_limit("elevenlabs", lambda: get_http_client("elevenlabs").post(url, json=data, headers=headers, timeout=30))
             
             if r.status_code == 200:
-                with open(audio_path, 'wb') as f: f.write(r.content)
-                tts_model_used = f"ElevenLabs ({target_voice_id})"
-            else:
-                return {"error": f"ElevenLabs Error ({r.status_code}): {r.text}"}
+                import base64
+                payload = r.json()
+                tmp_path = audio_path + ".part"
+                with open(tmp_path, 'wb') as f: f.write(base64.b64decode(payload["audio_base64"]))
+                os.replace(tmp_path, audio_path)
+                if payload.get("alignment"):
+                    save_word_alignment(audio_path, words_from_character_alignment(payload["alignment"]), "elevenlabs")
+                return f"ElevenLabs ({target_voice_id})"
+            return {"error": f"ElevenLabs Error ({r.status_code}): {r.text}"}
         
         except Exception as e:
             return {"error": f"FALHA ElevenLabs: {str(e)}"}
     
+    # ===== GEMINI TTS (usando Google Cloud TTS) =====
     elif provider == "gemini":
         if not GEMINI_API_KEY:
             return {"error": "ERRO VOZ: Gemini TTS selecionado mas sem chave API."}
@@ -1662,21 +3306,23 @@ async def generate_visuals_and_audio(scene, index, act_index, project_path, voic
                 }
             }
             
-            r = requests.post(url, json=payload, headers=headers, timeout=20)
+            r = await call_with_rate_limit("google_tts", lambda: get_http_client("google_tts").post(url, json=payload, headers=headers, timeout=20))
             
             if r.status_code == 200:
                 import base64
                 audio_content = base64.b64decode(r.json()["audioContent"])
                 with open(audio_path, 'wb') as f: f.write(audio_content)
-                tts_model_used = "Gemini TTS"
-            else:
-                await edge_tts.Communicate(clean_txt, "en-US-ChristopherNeural").save(audio_path)
-                tts_model_used = "EdgeTTS (Fallback)"
+                return "Gemini TTS"
         
         except Exception as e:
-            await edge_tts.Communicate(clean_txt, "en-US-ChristopherNeural").save(audio_path)
-            tts_model_used = "EdgeTTS (Fallback)"
+            print(f"   ⚠️ Gemini TTS falhou: {str(e)[:80]}")
+        
+        # Fallback para Edge TTS se Gemini falhar
+        words = await call_with_rate_limit("edge", lambda: edge_tts_with_timings(clean_txt, "en-US-ChristopherNeural", audio_path))
+        save_word_alignment(audio_path, words, "edge")
+        return "EdgeTTS (Fallback)"
     
+    # ===== EDGE TTS (Fallback padrão) =====
     else:
         try:
             if voice_style == "hype":
@@ -1686,45 +3332,247 @@ async def generate_visuals_and_audio(scene, index, act_index, project_path, voic
             else:
                 ssml_text = clean_txt
             
-            await edge_tts.Communicate(ssml_text, voice_config["voice"]).save(audio_path)
-            tts_model_used = "EdgeTTS"
+            words = await call_with_rate_limit("edge", lambda: edge_tts_with_timings(ssml_text, voice_config["voice"], audio_path, clean_txt))
+            save_word_alignment(audio_path, words, "edge")
+            return "EdgeTTS"
         except Exception as e:
             return {"error": f"FALHA TOTAL DE VOZ: {str(e)}"}
+
+# Modelo usado por provider (entra na chave do cache: trocar o modelo invalida o áudio)
+TTS_PROVIDER_MODELS = {
+    "openai": "tts-1-hd",
+    "elevenlabs": "eleven_turbo_v2",
+    "gemini": "google-cloud-tts-v1",
+    "edge": "edge-tts",
+}
+
+def tts_cache_key(voice_config, voice_style, clean_txt):
+    """Chave do cache TTS: provider, voz, modelo, estilo (velocidade/tom) e texto limpo"""
+    provider = voice_config["provider"]
+    voice_id = voice_config.get("voice")
+    if provider == "elevenlabs" and not voice_id:
+        voice_id = ELEVENLABS_VOICE_ID
+    style_config = VOICE_STYLES.get(voice_style, VOICE_STYLES["documentary"])
+    return content_hash(
+        provider, voice_id, TTS_PROVIDER_MODELS.get(provider),
+        voice_style, style_config["speed"], style_config["pitch"], clean_txt
+    )
+
+async def generate_scene_audio(clean_txt, audio_path, voice_config_key, voice_style):
+    """Gera a narração (cache TTS primeiro) respeitando o limite de concorrência do provider"""
+    voice_config = resolve_voice_config(voice_config_key)
+    cache_key = tts_cache_key(voice_config, voice_style, clean_txt)
+    
+    words_path = alignment_path(audio_path)
+    if os.path.exists(words_path):
+        os.remove(words_path)  # sidecar antigo não vale para o áudio novo
     
-    # ===== GERAÇÃO DE IMAGEM (NOVO SISTEMA) =====
+    if await run_blocking(tts_cache.fetch, cache_key, audio_path):
+        await run_blocking(tts_alignment_cache.fetch, cache_key, words_path)
+        return f"Cache TTS ({voice_config['provider']})"
+    
+    # Taxa/concorrência do provider são aplicadas por requisição dentro de synthesize_speech
+    result = await synthesize_speech(clean_txt, audio_path, voice_config, voice_style)
+    
+    # Só guarda áudio do provider pedido (fallback não corresponde à chave)
+    if isinstance(result, str) and "Fallback" not in result and os.path.exists(audio_path):
+        await run_blocking(tts_cache.store, cache_key, audio_path)
+        if os.path.exists(words_path):
+            await run_blocking(tts_alignment_cache.store, cache_key, words_path)
+    return result
+
+async def generate_scene_image(scene, media_path, image_provider, aspect_ratio, project_seed, visual_style):
+    """Gera a imagem da cena (reutiliza se já existir na pasta do projeto)"""
+    if os.path.exists(media_path):
+        return "Cache"
+
     search_term = scene.get('visual_search_term', 'business concept')
     ai_prompt = scene.get('visual_ai_prompt', search_term)
+    
+    # Usa o provider selecionado pelo usuário
+    result = await generate_image_with_provider(
+        prompt=ai_prompt,
+        provider=image_provider,
+        aspect_ratio=aspect_ratio,
+        output_path=media_path,
+        seed=project_seed,
+        style_template=visual_style
+    )
+    
+    # A função SEMPRE retorna imagem (nunca erro)
+    # Formato: (output_path, provider_used)
+    _, vis_source = result
+    
+    print(f"   ✅ Imagem salva: {os.path.getsize(media_path)/1024:.1f}KB via {vis_source}")
+    return vis_source
+
+def scene_narration(scene):
+    return scene.get('narration') or scene.get('script') or scene.get('text')
+
+def scene_image_job(scene, index, act_index, project_path, image_provider, project_seed, visual_style):
+    """Corrotina que gera a imagem da cena (caminho e formato derivados do projeto)"""
     media_path = os.path.join(project_path, f"act{act_index}_media{index}.png")
+    return generate_scene_image(
+        scene, media_path, image_provider,
+        "vertical" if "vertical" in project_path else "horizontal",
+        project_seed, visual_style
+    )
+
+async def generate_visuals_and_audio(scene, index, act_index, project_path, voice_config_key, voice_style, image_provider, project_seed, visual_style, image_task=None):
+    """image_task: imagem já em andamento (predictions Replicate criadas antes, em start_asset_production)"""
+    narr_text = scene_narration(scene)
+    if not narr_text: return None
     
-    if not os.path.exists(media_path):
-        # Usa o provider selecionado pelo usuário
-        result = await generate_image_with_provider(
-            prompt=ai_prompt,
-            provider=image_provider,
-            aspect_ratio="vertical" if "vertical" in project_path else "horizontal",
-            seed=project_seed,
-            style_template=visual_style
-        )
-        
-        # A nova função SEMPRE retorna imagem (nunca erro)
-        # Formato: (image_data, provider_used)
-        image_data, vis_source = result
-        with open(media_path, 'wb') as f:
-            f.write(image_data)
-        
-        print(f"   ✅ Imagem salva: {len(image_data)/1024:.1f}KB via {vis_source}")
-    else:
-        vis_source = "Cache"
+    audio_path = os.path.join(project_path, f"act{act_index}_scene{index}.mp3")
+    media_path = os.path.join(project_path, f"act{act_index}_media{index}.png")
+    clean_txt = clean_text_for_tts(narr_text)
+    
+    # Voz e imagem são independentes: produz as duas em paralelo
+    tts_result, vis_source = await asyncio.gather(
+        generate_scene_audio(clean_txt, audio_path, voice_config_key, voice_style),
+        image_task or scene_image_job(scene, index, act_index, project_path, image_provider, project_seed, visual_style)
+    )
+    
+    if isinstance(tts_result, dict):
+        return tts_result
 
-    return audio_path, media_path, tts_model_used, vis_source
+    return audio_path, media_path, tts_result, vis_source
 
 # ==========================================
 # OTIMIZAÇÃO #2: RENDERIZAÇÃO OTIMIZADA
 # ==========================================
 
-def render_scene_optimized(audio_path, media_path, output_path, aspect_ratio="horizontal"):
-    """Renderização com configurações otimizadas para hardware modesto"""
+SCENE_FADE_DURATION = 0.25   # fade de entrada/saída de cada cena (áudio e vídeo)
+SCENE_TAIL = 0.2             # respiro depois do fim da narração
+ZOOM_RATE = 0.015            # Ken Burns: +1.5% de zoom por segundo
+ZOOM_OVERSAMPLE = 2          # zoompan anda em pixels inteiros: amostra maior evita o "tremido"
+
+SCENE_VIDEO_CODEC = "libx264"  # encoder das cenas nas duas engines (entra no hash do render)
+
+# Mesmos parâmetros de saída do MoviePy: cenas de engines diferentes continuam concatenáveis
+SCENE_OUTPUT_PARAMS = [
+    "-pix_fmt", "yuv420p",  # Compatibilidade universal
+    "-profile:v", "baseline",  # Mudado de 'high' para 'baseline' (máxima compatibilidade)
+    "-level", "3.0",  # Mudado de 4.0 para 3.0 (compatível com navegadores antigos)
+    "-movflags", "+faststart",  # Stream progressivo
+    "-ar", "44100",
+    "-ac", "2"
+]
+
+def probe_duration(path):
+    """Duração (s) de um arquivo de mídia via ffprobe"""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+         "-of", "default=noprint_wrappers=1:nokey=1", path],
+        capture_output=True, text=True, timeout=30, check=True
+    )
+    return float(result.stdout.strip())
+
+def ken_burns_filters(target_w, target_h, fps):
+    """Imagem parada -> cobre o quadro (crop central) + zoom central lento"""
+    zw, zh = target_w * ZOOM_OVERSAMPLE, target_h * ZOOM_OVERSAMPLE
+    return [
+        f"scale={zw}:{zh}:force_original_aspect_ratio=increase",
+        f"crop={zw}:{zh}",
+        f"zoompan=z='1+{ZOOM_RATE}*in/{fps}':d=1"
+        f":x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)':s={target_w}x{target_h}:fps={fps}",
+    ]
+
+def scene_video_filter(target_w, target_h, fps, duration, subtitle_filter=None):
+    """Cadeia de vídeo da cena: Ken Burns, legendas ASS e fades"""
+    chain = ken_burns_filters(target_w, target_h, fps)
+    if subtitle_filter:
+        chain.append(subtitle_filter)
+    chain += [
+        f"fade=t=in:st=0:d={SCENE_FADE_DURATION}",
+        f"fade=t=out:st={max(0, duration - SCENE_FADE_DURATION):.3f}:d={SCENE_FADE_DURATION}",
+        "format=yuv420p",
+    ]
+    return ",".join(chain)
+
+def scene_audio_filter(duration):
+    """Fades da narração + silêncio até o fim da cena"""
+    return ",".join([
+        f"afade=t=in:st=0:d={SCENE_FADE_DURATION}",
+        f"afade=t=out:st={max(0, duration - SCENE_FADE_DURATION):.3f}:d={SCENE_FADE_DURATION}",
+        f"apad=whole_dur={duration:.3f}",
+    ])
+
+def render_scene_ffmpeg(audio_path, media_path, output_path, aspect_ratio="horizontal", threads=None, whisper_model=None):
+    """Mesma cena do MoviePy numa única chamada do ffmpeg (sem frames passando pelo Python)"""
+    threads = threads or SETTINGS['threads']
+    if not os.path.exists(audio_path):
+        raise Exception(f"Áudio não encontrado: {audio_path}")
+    if not os.path.exists(media_path):
+        raise Exception(f"Imagem não encontrada: {media_path}")
+    if SETTINGS['enable_subtitles'] and not libass_available():
+        raise Exception("ffmpeg sem libass (legendas exigem o filtro 'ass')")
+
+    target_w, target_h = ASPECT_RATIOS[aspect_ratio]["resolutions"][CURRENT_PROFILE]
+    fps = SETTINGS['fps']
+    duration = probe_duration(audio_path) + SCENE_TAIL
+
+    print(f"\n🎬 RENDERIZANDO CENA via ffmpeg ({ASPECT_RATIOS[aspect_ratio]['name']}):")
+    print(f"   Áudio: {os.path.basename(audio_path)} ({duration:.2f}s) | Imagem: {os.path.basename(media_path)}")
+
+    subtitle_filter = None
+    ass_path = f"{output_path}.ass"
+    if SETTINGS['enable_subtitles']:
+        sub_gen = SubtitleGenerator()
+        n_events = sub_gen.generate_ass(audio_path, target_w, target_h, ass_path, whisper_model)
+        print(f"   Legendas (ASS): {n_events} eventos")
+        if n_events:
+            subtitle_filter = ass_filter(ass_path, sub_gen.get_font(int(target_h * 0.055)))
+
+    cmd = [
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+        "-loop", "1", "-framerate", str(fps), "-i", media_path,
+        "-i", audio_path,
+        "-filter_complex",
+        f"[0:v]{scene_video_filter(target_w, target_h, fps, duration, subtitle_filter)}[v];"
+        f"[1:a]{scene_audio_filter(duration)}[a]",
+        "-map", "[v]", "-map", "[a]",
+        "-t", f"{duration:.3f}",
+        "-c:v", SCENE_VIDEO_CODEC, "-preset", SETTINGS['preset'], "-b:v", SETTINGS['bitrate'],
+        "-r", str(fps),
+        "-c:a", "aac", "-b:a", "128k",
+        "-threads", str(threads),
+    ] + SCENE_OUTPUT_PARAMS + [output_path]
+
+    started = time.time()
+    try:
+        subprocess.run(cmd, check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        raise Exception(f"ffmpeg falhou: {e.stderr[-500:]}")
+    finally:
+        if os.path.exists(ass_path):
+            os.remove(ass_path)
+
+    print(f"   ✅ Vídeo salvo em {time.time() - started:.1f}s: {os.path.getsize(output_path)/1024:.1f}KB")
+    return output_path
+
+def scene_render_engine():
+    """Engine que a cena vai usar de fato: o ffmpeg só queima legendas com libass"""
+    if SETTINGS['render_engine'] == "ffmpeg" and not (SETTINGS['enable_subtitles'] and not libass_available()):
+        return "ffmpeg"
+    return "moviepy"
+
+def render_scene(audio_path, media_path, output_path, aspect_ratio="horizontal", threads=None, whisper_model=None):
+    """Renderiza com a engine efetiva (ffmpeg com fallback para MoviePy). Retorna a engine usada"""
+    if scene_render_engine() == "ffmpeg":
+        try:
+            render_scene_ffmpeg(audio_path, media_path, output_path, aspect_ratio, threads, whisper_model)
+            return "ffmpeg"
+        except Exception as e:
+            print(f"⚠️ Engine ffmpeg falhou ({e}); renderizando com MoviePy")
+    render_scene_optimized(audio_path, media_path, output_path, aspect_ratio, threads, whisper_model)
+    return "moviepy"
+
+def render_scene_optimized(audio_path, media_path, output_path, aspect_ratio="horizontal", threads=None, whisper_model=None):
+    """Renderização (MoviePy) com configurações otimizadas para hardware modesto"""
+    threads = threads or SETTINGS['threads']
     try:
+        started = time.time()
         # Verifica se os arquivos de entrada existem
         if not os.path.exists(audio_path):
             raise Exception(f"Áudio não encontrado: {audio_path}")
@@ -1739,7 +3587,7 @@ def render_scene_optimized(audio_path, media_path, output_path, aspect_ratio="ho
         print(f"   Imagem: {os.path.basename(media_path)} ({os.path.getsize(media_path)/1024:.1f}KB)")
         
         audio_clip = AudioFileClip(audio_path)
-        duration = audio_clip.duration + 0.2
+        duration = audio_clip.duration + SCENE_TAIL
         print(f"   Duração áudio: {duration:.2f}s")
 
         # Cria clip de imagem e verifica dimensões
@@ -1759,13 +3607,26 @@ def render_scene_optimized(audio_path, media_path, output_path, aspect_ratio="ho
         print(f"   Resolução final: {target_w}x{target_h} ({ASPECT_RATIOS[aspect_ratio]['ratio']})")
 
         # Zoom sutil
-        clip = clip.resize(lambda t: 1 + 0.015*t)
+        clip = clip.resize(lambda t: 1 + ZOOM_RATE*t)
 
         # Legendas (se habilitadas no perfil)
-        if SETTINGS['enable_subtitles']:
+        video_filters = []
+        if SETTINGS['enable_subtitles'] and subtitle_backend() == "ass":
+            # Karaokê como script ASS, queimado pelo ffmpeg no mesmo encode (fora do loop de frames do Python)
+            final_scene = clip.set_audio(audio_clip)
+            try:
+                sub_gen = SubtitleGenerator()
+                ass_path = f"{output_path}.ass"
+                n_events = sub_gen.generate_ass(audio_path, target_w, target_h, ass_path, whisper_model)
+                print(f"   Legendas (ASS): {n_events} eventos")
+                if n_events:
+                    video_filters.append(ass_filter(ass_path, sub_gen.get_font(int(target_h * 0.055))))
+            except Exception as e:
+                print(f"⚠️ Erro legendas: {e}")
+        elif SETTINGS['enable_subtitles']:
             try:
                 sub_gen = SubtitleGenerator()
-                subs = sub_gen.generate_karaoke(audio_path, target_w, target_h)
+                subs = sub_gen.generate_karaoke(audio_path, target_w, target_h, whisper_model)
                 print(f"   Legendas: {len(subs)} clips")
                 final_scene = CompositeVideoClip([clip] + subs).set_audio(audio_clip)
             except Exception as e:
@@ -1775,13 +3636,13 @@ def render_scene_optimized(audio_path, media_path, output_path, aspect_ratio="ho
             print(f"   Legendas: desabilitadas")
             final_scene = clip.set_audio(audio_clip)
 
-        print(f"   Renderizando com preset={SETTINGS['preset']}, fps={SETTINGS['fps']}, threads={SETTINGS['threads']}...")
+        print(f"   Renderizando com preset={SETTINGS['preset']}, fps={SETTINGS['fps']}, threads={threads}...")
         
         # ==========================================
         # SUAVIZAÇÃO DE TRANSIÇÕES (FADES)
         # ==========================================
         # Define a duração da suavização (0.2s a 0.3s é ideal para documentários)
-        FADE_DURATION = 0.25 
+        FADE_DURATION = SCENE_FADE_DURATION
 
         # 1. Suaviza o Áudio (Evita estalos e cortes secos na voz)
         # Importante: Aplicamos no audio_clip antes de juntar, ou na final_scene
@@ -1789,27 +3650,25 @@ def render_scene_optimized(audio_path, media_path, output_path, aspect_ratio="ho
 
         # 2. Suaviza o Vídeo (Cria um leve fade do preto e para o preto)
         # Isso disfarça a troca brusca de imagens
-        final_scene = final_scene.fadein(FADE_DURATION).fadeout(FADE_DURATION)
+        if video_filters:
+            # Com legenda ASS o fade vai no filtergraph, depois das legendas (senão elas não esmaecem)
+            video_filters.append(f"fade=t=in:st=0:d={FADE_DURATION}")
+            video_filters.append(f"fade=t=out:st={max(0, duration - FADE_DURATION):.3f}:d={FADE_DURATION}")
+        else:
+            final_scene = final_scene.fadein(FADE_DURATION).fadeout(FADE_DURATION)
         # ==========================================
 
         # Renderização com parâmetros otimizados e garantidos para concatenação
         final_scene.write_videofile(
             output_path,
             fps=SETTINGS['fps'],
-            codec="libx264",
+            codec=SCENE_VIDEO_CODEC,
             audio_codec="aac",
             preset=SETTINGS['preset'],
-            threads=SETTINGS['threads'],
+            threads=threads,
             bitrate=SETTINGS['bitrate'],
             # Parâmetros críticos para compatibilidade universal
-            ffmpeg_params=[
-                "-pix_fmt", "yuv420p",  # Compatibilidade universal
-                "-profile:v", "baseline",  # Mudado de 'high' para 'baseline' (máxima compatibilidade)
-                "-level", "3.0",  # Mudado de 4.0 para 3.0 (compatível com navegadores antigos)
-                "-movflags", "+faststart",  # Stream progressivo
-                "-ar", "44100",
-                "-ac", "2"
-            ],
+            ffmpeg_params=SCENE_OUTPUT_PARAMS + (["-vf", ",".join(video_filters)] if video_filters else []),
             logger=None,
             write_logfile=False,
             temp_audiofile=f"{output_path}_temp_audio.m4a",
@@ -1820,14 +3679,550 @@ def render_scene_optimized(audio_path, media_path, output_path, aspect_ratio="ho
         final_scene.close()
         audio_clip.close()
         clip.close()
+        if os.path.exists(f"{output_path}.ass"):
+            os.remove(f"{output_path}.ass")
         
-        print(f"   ✅ Vídeo salvo: {os.path.getsize(output_path)/1024:.1f}KB")
+        print(f"   ✅ Vídeo salvo em {time.time() - started:.1f}s: {os.path.getsize(output_path)/1024:.1f}KB")
 
         return output_path
 
     except Exception as e:
         raise Exception(f"Erro na renderização: {str(e)}")
-    
+
+# ==========================================
+# OTIMIZAÇÃO #20: CACHE DE RENDER POR HASH DAS ENTRADAS
+# ==========================================
+# Cada scene_X_Y.mp4 ganha um manifesto (scene_X_Y.mp4.render.json) com o hash de tudo que
+# muda o resultado. Re-render (reprocess, resgate, retomada) pula cenas inalteradas e válidas.
+
+def scene_render_inputs(audio_path, media_path, aspect_ratio="horizontal", whisper_model=None, engine=None):
+    """Tudo que influencia o MP4 da cena (conteúdo dos arquivos + configuração efetiva)"""
+    target_w, target_h = ASPECT_RATIOS[aspect_ratio]["resolutions"][CURRENT_PROFILE]
+    inputs = {
+        "audio": file_hash(audio_path),
+        "image": file_hash(media_path),
+        "aspect_ratio": aspect_ratio,
+        "resolution": [target_w, target_h],
+        # Engine/encoder/backend efetivos, não os pedidos: sem libass o perfil "ffmpeg"/"ass" vira MoviePy
+        "profile": {**{k: SETTINGS[k] for k in ("fps", "preset", "bitrate", "crf")},
+                    "render_engine": engine or scene_render_engine(), "encoder": SCENE_VIDEO_CODEC},
+        "scene": {"fade": SCENE_FADE_DURATION, "tail": SCENE_TAIL, "zoom": ZOOM_RATE},
+        "subtitles": None,
+    }
+    if SETTINGS['enable_subtitles']:
+        style = SubtitleGenerator().karaoke_style(target_w, target_h)
+        sidecar = alignment_path(audio_path)
+        inputs["subtitles"] = {
+            "backend": subtitle_backend(),
+            "whisper_model": whisper_model or SETTINGS['whisper_model'],
+            "font": getattr(style["font_normal"], "path", "default"),
+            "style": {k: v for k, v in style.items() if not k.startswith("font_")},
+            # Tempos do TTS (sidecar) mudam as legendas mesmo com o mesmo áudio
+            "alignment": file_hash(sidecar) if os.path.exists(sidecar) else None,
+        }
+    return inputs
+
+def scene_manifest_path(output_path):
+    return f"{output_path}.render.json"
+
+def scene_render_valid(output_path, render_hash):
+    """O MP4 existente foi gerado com estas entradas e abre no ffprobe?"""
+    manifest_path = scene_manifest_path(output_path)
+    if not (os.path.exists(output_path) and os.path.exists(manifest_path)):
+        return False
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("hash") != render_hash or os.path.getsize(output_path) <= 1000:
+            return False
+        return probe_duration(output_path) > 0
+    except Exception:
+        return False
+
+def render_scene_cached(audio_path, media_path, output_path, aspect_ratio="horizontal", threads=None, whisper_model=None, work_path=None):
+    """
+    render_scene que pula a cena quando o hash das entradas não mudou.
+    work_path: renderiza (MP4 + manifesto) nesse caminho temporário e retorna ele; quem chamou
+    publica com publish_scene_render. Retorna output_path quando a cena foi reaproveitada.
+    """
+    inputs = scene_render_inputs(audio_path, media_path, aspect_ratio, whisper_model)
+    render_hash = content_hash(inputs)
+    if scene_render_valid(output_path, render_hash):
+        print(f"♻️ Cena inalterada, reaproveitando: {os.path.basename(output_path)} ({render_hash[:10]})")
+        return output_path
+
+    output_path = work_path or output_path
+    # Manifesto antigo sai antes do render: um encode interrompido não pode parecer válido depois
+    if os.path.exists(scene_manifest_path(output_path)):
+        os.remove(scene_manifest_path(output_path))
+    started = time.time()
+    engine = render_scene(audio_path, media_path, output_path, aspect_ratio, threads, whisper_model)
+    if engine != inputs["profile"]["render_engine"]:
+        # Fallback em tempo de execução: o manifesto registra o que gerou o MP4 de fato
+        inputs = scene_render_inputs(audio_path, media_path, aspect_ratio, whisper_model, engine)
+        render_hash = content_hash(inputs)
+    manifest = {
+        "hash": render_hash,
+        "inputs": inputs,
+        "rendered_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "seconds": round(time.time() - started, 1)
+    }
+    tmp_path = scene_manifest_path(output_path) + ".part"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, scene_manifest_path(output_path))
+    return output_path
+
+def scene_work_path(output_path, owner):
+    """Caminho temporário exclusivo de quem renderiza (scene_1_2.<owner>.tmp.mp4)"""
+    root, ext = os.path.splitext(output_path)
+    owner = re.sub(r"[^\w.-]", "_", owner)
+    return f"{root}.{owner}.tmp{ext}"
+
+def publish_scene_render(work_path, output_path):
+    """Troca atômica do MP4 e depois do manifesto (MP4 novo com manifesto antigo = hash não bate)"""
+    os.replace(work_path, output_path)
+    os.replace(scene_manifest_path(work_path), scene_manifest_path(output_path))
+
+def discard_scene_render(work_path):
+    for path in (work_path, scene_manifest_path(work_path)):
+        if os.path.exists(path):
+            os.remove(path)
+
+def render_scene_atomic(audio_path, media_path, output_path, aspect_ratio="horizontal", threads=None, whisper_model=None):
+    """render_scene_cached num caminho deste processo + troca no final: outro render da mesma
+    cena (worker remoto atrasado) nunca escreve por cima de um encode em andamento"""
+    work_path = scene_work_path(output_path, f"local{os.getpid()}")
+    try:
+        if render_scene_cached(audio_path, media_path, output_path, aspect_ratio, threads, whisper_model, work_path) == work_path:
+            publish_scene_render(work_path, output_path)
+        return output_path
+    finally:
+        discard_scene_render(work_path)
+
+# ==========================================
+# OTIMIZAÇÃO #9: PIPELINE DE RENDERIZAÇÃO (POOL DE PROCESSOS)
+# ==========================================
+
+# Cenas codificando em paralelo; as threads do perfil são divididas entre elas
+RENDER_WORKERS = max(1, int(os.getenv("RENDER_WORKERS", str(max(1, SETTINGS['threads'] // 2)))))
+RENDER_THREADS_PER_WORKER = max(1, SETTINGS['threads'] // RENDER_WORKERS)
+
+_render_pool = None
+
+def _render_worker_warm():
+    """Carrega o Whisper num único worker. Os outros carregam só se chegarem a transcrever
+    (TTS com timestamps e cache de transcrição evitam o Whisper): sem N cópias do modelo na RAM"""
+    get_whisper_model()
+    return os.getpid()
+
+def get_render_pool():
+    """Pool de processos compartilhado para o encode das cenas (criado sob demanda)"""
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS)
+    return _render_pool
+
+# "local": pool de processos desta máquina
+# "queue": tarefas "render" na fila compartilhada, consumidas por render_worker.py em outros hosts
+RENDER_BACKEND = os.getenv("RENDER_BACKEND", "local")
+RENDER_PICKUP_TIMEOUT = float(os.getenv("RENDER_PICKUP_TIMEOUT", "120"))   # nenhum worker pegou -> render local
+RENDER_TASK_TIMEOUT = float(os.getenv("RENDER_TASK_TIMEOUT", "1800"))
+RENDER_FALLBACK_LOCAL = os.getenv("RENDER_FALLBACK_LOCAL", "1") == "1"
+
+async def render_scene_remote(audio_path, media_path, output_path, aspect_ratio, whisper_model=None):
+    """Publica a cena na fila e aguarda um worker remoto (caminhos relativos a PROJECTS_DIR)"""
+    task_id = await run_blocking(task_queue.enqueue, "render", {
+        "audio": shared_path(audio_path),
+        "media": shared_path(media_path),
+        "output": shared_path(output_path),
+        "aspect_ratio": aspect_ratio,
+        "whisper_model": whisper_model,
+        # O worker renderiza com o perfil do coordenador (resolução/fps/preset iguais em todas as cenas)
+        "profile": CURRENT_PROFILE,
+        "settings": {k: v for k, v in SETTINGS.items() if k != "threads"}
+    })
+    started = time.time()
+    try:
+        while True:
+            status, result, error = await run_blocking(task_queue.get, task_id)
+            if status == "done":
+                return local_path(result["output"])
+            if status in ("failed", "cancelled", None):
+                raise RuntimeError(f"render remoto falhou: {error}")
+            waited = time.time() - started
+            if (status == "pending" and waited > RENDER_PICKUP_TIMEOUT) or waited > RENDER_TASK_TIMEOUT:
+                await run_blocking(task_queue.cancel, task_id)
+                if not RENDER_FALLBACK_LOCAL:
+                    raise TimeoutError(f"render remoto sem resposta ({status}, {waited:.0f}s)")
+                print(f"   ⚠️ Nenhum worker de render respondeu ({status}, {waited:.0f}s); renderizando localmente")
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    get_render_pool(), render_scene_atomic,
+                    audio_path, media_path, output_path, aspect_ratio, RENDER_THREADS_PER_WORKER, whisper_model
+                )
+            await asyncio.sleep(0.5)
+    except asyncio.CancelledError:
+        await run_blocking(task_queue.cancel, task_id)
+        raise
+
+def submit_scene_render(audio_path, media_path, output_path, aspect_ratio, whisper_model=None):
+    """Envia a cena para o pool (ou para a fila distribuída) e retorna um future aguardável no event loop"""
+    if RENDER_BACKEND == "queue":
+        return asyncio.ensure_future(render_scene_remote(audio_path, media_path, output_path, aspect_ratio, whisper_model))
+    # O pool aceita tudo de uma vez; quem decide quando a cena começa é o scheduler (CPU/RAM/disco)
+    return start_scheduled(
+        scene_render_stages(), run_in_render_pool, render_scene_cached,
+        audio_path, media_path, output_path, aspect_ratio, RENDER_THREADS_PER_WORKER, whisper_model
+    )
+
+@app.on_event("startup")
+async def warm_render_workers():
+    """Depois que o servidor sobe: aquece o Whisper em um worker de render, sem bloquear"""
+    if not (WHISPER_WARMUP and SETTINGS['enable_subtitles']) or TRANSCRIPTION_BACKEND == "worker":
+        return
+    get_render_pool().submit(_render_worker_warm)
+
+# ==========================================
+# OTIMIZAÇÃO #11: ETAPAS BLOQUEANTES FORA DO EVENT LOOP
+# ==========================================
+# Encode/Whisper/PIL das cenas -> pool de processos (acima)
+# ffmpeg/ffprobe, stitch, PDF, busca DDGS -> pool de threads (abaixo)
+# Assim outras requisições e o keep-alive SSE continuam fluindo durante o trabalho pesado.
+
+BLOCKING_WORKERS = max(4, multiprocessing.cpu_count())
+_blocking_executor = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix="blocking")
+
+async def run_blocking(func, *args, **kwargs):
+    """Executa uma função bloqueante numa thread e aguarda o resultado"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_blocking_executor, functools.partial(func, *args, **kwargs))
+
+def start_blocking(func, *args, **kwargs):
+    """Agenda uma função bloqueante e retorna a task (para usar com keep_alive_until)"""
+    return asyncio.ensure_future(run_blocking(func, *args, **kwargs))
+
+async def run_subprocess(cmd, timeout=None, check=False):
+    """
+    subprocess.run numa thread. Preferido a asyncio.create_subprocess_exec porque
+    o uvicorn --reload no Windows usa SelectorEventLoop, que não suporta subprocessos.
+    """
+    return await run_blocking(subprocess.run, cmd, capture_output=True, text=True, timeout=timeout, check=check)
+
+# ==========================================
+# OTIMIZAÇÃO #22: ESCALONADOR DE ETAPAS (ADMISSÃO POR RECURSOS)
+# ==========================================
+# Cada etapa pesada pede um slot com o seu custo (núcleos, RAM, disco). O slot só é concedido
+# se a conta dos slots já concedidos E as leituras ao vivo do psutil (CPU, RSS, RAM livre,
+# disco livre) comportarem; senão a etapa espera. Jobs novos ficam na fila enquanto a máquina
+# está saturada, e são recusados ("ocupado") quando a fila ou o disco estão no limite.
+
+# cpu: núcleos ocupados; ram_mb: memória a mais durante a etapa; disk_mb: escrita temporária.
+# Etapas com cpu < 1 (rede) não esperam CPU: baixar assets deve continuar durante os encodes.
+STAGE_COSTS = {
+    "encode":      {"cpu": RENDER_THREADS_PER_WORKER, "ram_mb": 400, "disk_mb": 100},   # cena
+    "full_encode": {"cpu": SETTINGS['threads'], "ram_mb": 800, "disk_mb": 1000},        # stitch/compat/render único
+    "remux":       {"cpu": 0.5, "ram_mb": 100, "disk_mb": 1000},                        # cópia de streams
+    "whisper":     {"cpu": 2, "ram_mb": 600, "disk_mb": 0},                            # modelo já residente no worker
+    "subtitles":   {"cpu": 1, "ram_mb": SUBTITLE_MEMORY_CAP_MB, "disk_mb": 0},         # karaokê PIL
+    "network":     {"cpu": 0, "ram_mb": 50, "disk_mb": 20},                            # TTS/imagem por cena
+}
+
+SCHEDULER_CPU_BUDGET = float(os.getenv("SCHEDULER_CPU_BUDGET", str(multiprocessing.cpu_count())))  # núcleos concedíveis
+SCHEDULER_CPU_CEILING = float(os.getenv("SCHEDULER_CPU_CEILING", "90"))         # % de CPU medido: acima, nada pesado começa
+SCHEDULER_RAM_RESERVE_MB = int(os.getenv("SCHEDULER_RAM_RESERVE_MB", "1024"))   # RAM livre que sobra depois de conceder
+SCHEDULER_RSS_LIMIT_MB = int(os.getenv("SCHEDULER_RSS_LIMIT_MB", "0"))          # servidor + workers de render (0 = 75% da RAM)
+SCHEDULER_DISK_MIN_MB = int(os.getenv("SCHEDULER_DISK_MIN_MB", "2048"))         # disco livre mínimo em PROJECTS_DIR
+SCHEDULER_RECHECK = 1.0            # leituras mudam sozinhas: quem espera reavalia nesse intervalo
+SCHEDULER_SAMPLE_INTERVAL = 1.0    # psutil é lido numa thread a cada intervalo (nunca no event loop)
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", "20"))   # jobs aguardando: acima, recusa com "ocupado"
+
+class StageScheduler:
+    """Concede slots às etapas pesadas de todos os jobs deste processo"""
+
+    def __init__(self):
+        self.granted = {}        # etapa -> slots ativos
+        self.waiting = {}        # etapa -> etapas aguardando
+        self.cpu_in_use = 0.0
+        self.ram_in_use_mb = 0
+        self.disk_in_use_mb = 0
+        self._ram_grants = []    # [instante, ram_mb] de cada slot ativo
+        self._changed = None
+        self._sampler = None
+        self._readings = None
+        self._readings_at = 0.0  # time.monotonic() do início da última leitura
+        try:
+            import psutil
+            self._psutil = psutil
+            self._process = psutil.Process()
+            self._psutil.cpu_percent(interval=None)  # primeira leitura é a base das seguintes
+            self.rss_limit_mb = SCHEDULER_RSS_LIMIT_MB or int(psutil.virtual_memory().total / 1024 / 1024 * 0.75)
+        except Exception:
+            self._psutil = None      # sem psutil: só a contabilidade dos slots
+            self.rss_limit_mb = SCHEDULER_RSS_LIMIT_MB
+
+    def _sample(self):
+        """CPU, RSS (servidor + filhos), RAM disponível e disco livre (bloqueante: roda numa thread)"""
+        rss = self._process.memory_info().rss
+        for child in self._process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except self._psutil.Error:
+                pass
+        os.makedirs(PROJECTS_DIR, exist_ok=True)
+        return {
+            "cpu_percent": self._psutil.cpu_percent(interval=None),
+            "rss_mb": int(rss / 1024 / 1024),
+            "ram_available_mb": int(self._psutil.virtual_memory().available / 1024 / 1024),
+            "disk_free_mb": int(shutil.disk_usage(PROJECTS_DIR).free / 1024 / 1024),
+        }
+
+    async def _sample_forever(self):
+        while True:
+            started = time.monotonic()
+            try:
+                self._readings = await run_blocking(self._sample)
+                self._readings_at = started
+            except Exception as e:
+                print(f"⚠️ Scheduler: leitura do psutil falhou ({e})")
+            await asyncio.sleep(SCHEDULER_SAMPLE_INTERVAL)
+
+    def start_sampling(self):
+        """Liga o amostrador em segundo plano (precisa do event loop rodando)"""
+        if self._psutil is not None and self._sampler is None:
+            self._sampler = asyncio.ensure_future(self._sample_forever())
+
+    def readings(self):
+        """Última leitura do amostrador; None sem psutil ou antes da primeira leitura"""
+        return self._readings
+
+    def ram_granted_since(self, instant):
+        """RAM reservada por slots concedidos depois do instante (ainda fora das leituras)"""
+        return sum(ram_mb for granted_at, ram_mb in self._ram_grants if granted_at >= instant)
+
+    def cost(self, stages):
+        total = {"cpu": 0.0, "ram_mb": 0, "disk_mb": 0}
+        for stage in stages:
+            for key, value in STAGE_COSTS[stage].items():
+                total[key] += value
+        return total
+
+    def blocked_by(self, cost):
+        """Motivo pelo qual o custo não cabe agora (None = cabe)"""
+        if cost["cpu"] >= 1 and self.cpu_in_use + cost["cpu"] > SCHEDULER_CPU_BUDGET:
+            return f"CPU reservada ({self.cpu_in_use:g}/{SCHEDULER_CPU_BUDGET:g} núcleos)"
+        r = self.readings()
+        if r is None:
+            return None
+        if cost["cpu"] >= 1 and r["cpu_percent"] > SCHEDULER_CPU_CEILING:
+            return f"CPU em {r['cpu_percent']:.0f}%"
+        # Só slots concedidos depois da leitura ainda não aparecem nela: os anteriores já estão
+        # no RSS/RAM livre medidos e descontar de novo recusaria trabalho com RAM sobrando
+        pending_ram = self.ram_granted_since(self._readings_at)
+        if r["ram_available_mb"] - pending_ram - cost["ram_mb"] < SCHEDULER_RAM_RESERVE_MB:
+            return f"RAM livre {r['ram_available_mb']}MB"
+        if self.rss_limit_mb and r["rss_mb"] + pending_ram + cost["ram_mb"] > self.rss_limit_mb:
+            return f"RSS {r['rss_mb']}/{self.rss_limit_mb}MB"
+        if r["disk_free_mb"] - self.disk_in_use_mb - cost["disk_mb"] < SCHEDULER_DISK_MIN_MB:
+            return f"disco livre {r['disk_free_mb']}MB"
+        return None
+
+    def busy(self):
+        return any(self.granted.values())
+
+    @contextlib.asynccontextmanager
+    async def slot(self, *stages):
+        """async with scheduler.slot("encode", "whisper"): ... — espera até o custo caber"""
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        self.start_sampling()
+        cost = self.cost(stages)
+        key = "+".join(stages) or "-"
+        async with self._changed:
+            self.waiting[key] = self.waiting.get(key, 0) + 1
+            try:
+                # Sem nada rodando, a etapa sempre anda (custo maior que a máquina não trava o job)
+                while self.busy() and self.blocked_by(cost):
+                    try:
+                        await asyncio.wait_for(self._changed.wait(), SCHEDULER_RECHECK)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self.waiting[key] -= 1
+            self.granted[key] = self.granted.get(key, 0) + 1
+            self.cpu_in_use += cost["cpu"]
+            self.ram_in_use_mb += cost["ram_mb"]
+            self.disk_in_use_mb += cost["disk_mb"]
+            grant = [time.monotonic(), cost["ram_mb"]]
+            self._ram_grants.append(grant)
+        try:
+            yield
+        finally:
+            async with self._changed:
+                self._ram_grants.remove(grant)
+                self.granted[key] -= 1
+                self.cpu_in_use -= cost["cpu"]
+                self.ram_in_use_mb -= cost["ram_mb"]
+                self.disk_in_use_mb -= cost["disk_mb"]
+                self._changed.notify_all()
+
+    def has_headroom(self):
+        """Um job novo pode começar? (CPU/RAM/disco com folga para ao menos um encode de cena)"""
+        return not self.busy() or self.blocked_by(self.cost(["encode"])) is None
+
+    def admission(self, pending_jobs):
+        """(aceito, motivo): recusa quando a fila de jobs ou o disco estão no limite"""
+        if pending_jobs >= JOB_QUEUE_LIMIT:
+            return False, f"fila cheia ({pending_jobs} jobs aguardando, limite {JOB_QUEUE_LIMIT})"
+        r = self.readings()
+        if r and r["disk_free_mb"] < SCHEDULER_DISK_MIN_MB:
+            return False, f"disco quase cheio ({r['disk_free_mb']}MB livres, mínimo {SCHEDULER_DISK_MIN_MB}MB)"
+        return True, ""
+
+    def stats(self):
+        return {
+            "granted": {k: v for k, v in self.granted.items() if v},
+            "waiting": {k: v for k, v in self.waiting.items() if v},
+            "cpu_in_use": self.cpu_in_use,
+            "cpu_budget": SCHEDULER_CPU_BUDGET,
+            "ram_reserved_mb": self.ram_in_use_mb,
+            "rss_limit_mb": self.rss_limit_mb,
+            "readings": self.readings(),
+        }
+
+scheduler = StageScheduler()
+
+@app.on_event("startup")
+async def start_scheduler_sampling():
+    scheduler.start_sampling()
+
+def scene_render_stages():
+    """Etapas que o render de uma cena executa no pool com o perfil atual"""
+    stages = ["encode"]
+    if SETTINGS['enable_subtitles']:
+        if TRANSCRIPTION_BACKEND != "worker":
+            stages.append("whisper")
+        if subtitle_backend() == "moviepy":
+            stages.append("subtitles")
+    return stages
+
+def scene_prepare_stages():
+    """Preparação do render único: só Whisper (o ASS é texto)"""
+    return ["whisper"] if SETTINGS['enable_subtitles'] and TRANSCRIPTION_BACKEND != "worker" else []
+
+async def run_in_render_pool(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_render_pool(), func, *args)
+
+def start_scheduled(stages, func, *args, **kwargs):
+    """Agenda func (corrotina) para rodar quando o scheduler conceder o slot; retorna a task"""
+    async def run():
+        async with scheduler.slot(*stages):
+            return await func(*args, **kwargs)
+    return asyncio.ensure_future(run())
+
+# ==========================================
+# OTIMIZAÇÃO #18: RENDER ÚNICO (DOCUMENTÁRIO INTEIRO NUM SÓ ENCODE)
+# ==========================================
+# Cenas -> (áudio, imagem, legenda ASS) -> um filtergraph com xfade/acrossfade -> MP4 final.
+# Cada frame é codificado uma vez só (sem encode por cena, re-encode no stitch e passe de compat).
+
+XFADE_TRANSITION = "fadeblack"               # mesma "piscada" para o preto dos fades por cena
+XFADE_DURATION = SCENE_FADE_DURATION * 2     # fade-out + fade-in das cenas separadas
+
+def prepare_single_pass_scene(audio_path, media_path, ass_path, aspect_ratio="horizontal", whisper_model=None):
+    """Roda no pool de render: legendas (Whisper/ASS) e duração da cena. Retorna a spec da cena"""
+    target_w, target_h = ASPECT_RATIOS[aspect_ratio]["resolutions"][CURRENT_PROFILE]
+    spec = {"audio": audio_path, "image": media_path, "ass": None,
+            "duration": probe_duration(audio_path) + SCENE_TAIL}
+    if SETTINGS['enable_subtitles']:
+        if SubtitleGenerator().generate_ass(audio_path, target_w, target_h, ass_path, whisper_model):
+            spec["ass"] = ass_path
+    return spec
+
+def submit_scene_prepare(audio_path, media_path, ass_path, aspect_ratio, whisper_model=None):
+    return start_scheduled(
+        scene_prepare_stages(), run_in_render_pool, prepare_single_pass_scene,
+        audio_path, media_path, ass_path, aspect_ratio, whisper_model
+    )
+
+def single_pass_filtergraph(scenes, target_w, target_h, fps):
+    """Filtergraph do documentário: cadeias por cena encadeadas com xfade (vídeo) e acrossfade (áudio)"""
+    font = SubtitleGenerator().get_font(int(target_h * 0.055))
+    n = len(scenes)
+    graph = []
+    for k, scene in enumerate(scenes):
+        # Cenas que não são a última ganham a duração do crossfade (a narração não é encoberta)
+        duration = scene["duration"] + (XFADE_DURATION if k < n - 1 else 0)
+        chain = ken_burns_filters(target_w, target_h, fps) + [f"trim=duration={duration:.3f}", "setpts=PTS-STARTPTS"]
+        if scene["ass"]:
+            chain.append(ass_filter(scene["ass"], font))
+        chain.append("format=yuv420p")
+        graph.append(f"[{2*k}:v]{','.join(chain)}[v{k}]")
+        graph.append(f"[{2*k+1}:a]apad=whole_dur={duration:.3f},atrim=duration={duration:.3f},"
+                     f"aformat=sample_rates=44100:channel_layouts=stereo,asetpts=PTS-STARTPTS[a{k}]")
+        scene["render_duration"] = duration
+
+    v_prev, a_prev = "v0", "a0"
+    offset = 0.0
+    for k in range(1, n):
+        offset += scenes[k - 1]["render_duration"] - XFADE_DURATION
+        graph.append(f"[{v_prev}][v{k}]xfade=transition={XFADE_TRANSITION}:duration={XFADE_DURATION}:offset={offset:.3f}[vx{k}]")
+        graph.append(f"[{a_prev}][a{k}]acrossfade=d={XFADE_DURATION}[ax{k}]")
+        v_prev, a_prev = f"vx{k}", f"ax{k}"
+
+    total = offset + scenes[-1]["render_duration"]
+    graph.append(f"[{v_prev}]fade=t=in:st=0:d={SCENE_FADE_DURATION},"
+                 f"fade=t=out:st={max(0, total - SCENE_FADE_DURATION):.3f}:d={SCENE_FADE_DURATION}[vout]")
+    graph.append(f"[{a_prev}]afade=t=in:st=0:d={SCENE_FADE_DURATION},"
+                 f"afade=t=out:st={max(0, total - SCENE_FADE_DURATION):.3f}:d={SCENE_FADE_DURATION}[aout]")
+    return ";\n".join(graph), total
+
+def render_documentary_single_pass(scenes, output_path, aspect_ratio="horizontal"):
+    """Renderiza todas as cenas num único ffmpeg. Retorna True/False como stitch_video_files"""
+    if not scenes:
+        return False
+    if any(scene["ass"] for scene in scenes) and not libass_available():
+        print("⚠️ Render único exige libass para as legendas")
+        return False
+
+    target_w, target_h = ASPECT_RATIOS[aspect_ratio]["resolutions"][CURRENT_PROFILE]
+    fps = SETTINGS['fps']
+    graph, total = single_pass_filtergraph(scenes, target_w, target_h, fps)
+
+    # Grafo em arquivo: com dezenas de cenas a linha de comando estoura o limite do Windows
+    graph_path = f"{output_path}.filtergraph.txt"
+    with open(graph_path, "w", encoding="utf-8") as f:
+        f.write(graph)
+
+    cmd = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error"]
+    for scene in scenes:
+        cmd += ["-loop", "1", "-framerate", str(fps), "-t", f"{scene['render_duration']:.3f}", "-i", scene["image"]]
+        cmd += ["-i", scene["audio"]]
+    cmd += [
+        "-filter_complex_script", graph_path,
+        "-map", "[vout]", "-map", "[aout]",
+        "-c:v", "libx264", "-preset", SETTINGS['preset'], "-b:v", SETTINGS['bitrate'],
+        "-r", str(fps),
+        "-c:a", "aac", "-b:a", "128k",
+        "-threads", str(SETTINGS['threads']),
+    ] + SCENE_OUTPUT_PARAMS + [output_path]
+
+    print(f"\n🎬 RENDER ÚNICO: {len(scenes)} cenas, {total:.1f}s, transição {XFADE_TRANSITION} {XFADE_DURATION}s")
+    started = time.time()
+    try:
+        subprocess.run(cmd, check=True, capture_output=True, text=True)
+        print(f"✅ Render único em {time.time() - started:.1f}s: {os.path.getsize(output_path)/1024/1024:.2f}MB")
+        return True
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Render único FALHOU")
+        print(f"STDERR: {e.stderr[-500:]}")
+        return False
+    finally:
+        for path in [graph_path] + [scene["ass"] for scene in scenes if scene["ass"]]:
+            if os.path.exists(path):
+                os.remove(path)
+
 
 # ==========================================
 # FUNÇÃO COMPLETA: GERAÇÃO DE THUMBNAIL
@@ -1908,6 +4303,7 @@ Focus on visual elements, composition, mood, and style.
             prompt=enhanced_prompt,
             provider=image_provider,
             aspect_ratio=thumb_aspect,
+            output_path=thumbnail_path,
             seed=None,  # Thumbnails não precisam de seed consistente
             style_template="cinematic"  # Força estilo cinematic para thumbnails
         )
@@ -1916,11 +4312,6 @@ Focus on visual elements, composition, mood, and style.
         if isinstance(result, dict) and "error" in result:
             return result
         
-        # Salva thumbnail
-        image_data, provider_used = result
-        with open(thumbnail_path, 'wb') as f:
-            f.write(image_data)
-        
         project_id = os.path.basename(project_path)
         thumbnail_url = f"http://localhost:8000/projects/{project_id}/thumbnail.png"
         
@@ -1930,9 +4321,14 @@ Focus on visual elements, composition, mood, and style.
         return {"error": f"Erro ao gerar thumbnail: {str(e)}"}
 
 
+# --- PESQUISA ---
+def search_facts(topic):
+    """Busca fatos no DuckDuckGo (bloqueante: chamar via run_blocking)"""
+    with DDGS() as ddgs:
+        return "\n".join([f"- {r['title']}: {r['body']}" for r in ddgs.text(topic, max_results=5)])
+
 # --- STREAMING ---
-@app.get("/create-stream")
-async def create_documentary_stream(
+def documentary_events(
     topic: str, 
     writer_provider: str, 
     writer_model: str, 
@@ -1947,8 +4343,25 @@ async def create_documentary_stream(
     visual_style: str = "documentary",
     script_mode: str = "ai",        # ✅ NOVO
     manual_script: str = "",          # ✅ NOVO
-    thumbnail_prompt: str = ""  # NOVO
+    thumbnail_prompt: str = "",  # NOVO
+    whisper_model: str = "",  # Vazio = modelo do perfil
+    resume_id: str = "",  # Projeto a retomar do checkpoint (ver /resume-stream)
+    job_id: str = ""  # ID do job na fila (vira o ID do projeto)
 ):
+    """
+    Pipeline completo de um documentário, como gerador de eventos SSE.
+    Roda nos workers da fila de jobs; o navegador só observa (/jobs/<id>/stream).
+    """
+    # Parâmetros do job (vão para o checkpoint; a retomada chama esta função com eles)
+    params = {
+        "topic": topic, "writer_provider": writer_provider, "writer_model": writer_model,
+        "critic_provider": critic_provider, "critic_model": critic_model, "duration": duration,
+        "voice_config": voice_config, "voice_style": voice_style, "aspect_ratio": aspect_ratio,
+        "image_provider": image_provider, "use_consistent_seed": use_consistent_seed,
+        "visual_style": visual_style, "script_mode": script_mode, "manual_script": manual_script,
+        "thumbnail_prompt": thumbnail_prompt, "whisper_model": whisper_model
+    }
+
     # ✅ DEBUG: Confirma que a função foi chamada
     print(f"\n{'='*60}")
     print(f"🚀 ENDPOINT CHAMADO!")
@@ -1995,9 +4408,38 @@ async def create_documentary_stream(
                     return
                 
             print("✅ API keys validadas")
+
+            if whisper_model and whisper_model not in WHISPER_MODELS:
+                yield f"data: {json.dumps({'status': 'error', 'message': f'Modelo Whisper inválido: {whisper_model}'})}\n\n"
+                return
             
             # Gera seed único para o projeto (se consistência habilitada)
-            project_seed = random.randint(1000, 99999) if use_consistent_seed else None
+            if resume_id:
+                pid = resume_id
+                path = os.path.join(PROJECTS_DIR, pid)
+                if not re.fullmatch(r"[\w-]+", pid) or not os.path.exists(os.path.join(path, JobManifest.FILENAME)):
+                    yield f"data: {json.dumps({'status': 'error', 'message': f'Checkpoint não encontrado: {pid}'})}\n\n"
+                    return
+                manifest = JobManifest.load(path)
+                yield await send_log(f"♻️ Retomando projeto {pid} do último checkpoint")
+
+                final_data = manifest.get("final")
+                if final_data and os.path.exists(os.path.join(path, final_data['filename'])):
+                    yield await send_log("✅ Projeto já estava finalizado")
+                    yield f"data: {json.dumps(final_data)}\n\n"
+                    return
+            else:
+                pid = job_id or new_job_id()
+                path = os.path.join(PROJECTS_DIR, pid)
+                os.makedirs(path, exist_ok=True)
+                manifest = JobManifest(path, params)
+
+            # Seed do checkpoint na retomada: cenas novas seguem consistentes com as já geradas
+            if "seed" in manifest.data["stages"]:
+                project_seed = manifest.get("seed")
+            else:
+                project_seed = random.randint(1000, 99999) if use_consistent_seed else None
+                manifest.set("seed", project_seed)
             
             aspect_info = ASPECT_RATIOS[aspect_ratio]
             resolution = aspect_info["resolutions"][CURRENT_PROFILE]
@@ -2018,10 +4460,6 @@ async def create_documentary_stream(
 
             print("✅ Logs iniciais enviados!")
 
-            pid = datetime.now().strftime("%Y%m%d_%H%M%S")
-            path = os.path.join(PROJECTS_DIR, pid)
-            os.makedirs(path, exist_ok=True)
-
             duration_map = {
                 "short": {"structure": "1 ACT.", "constraint": "MAX 150 WORDS. FAST PACED.", "acts_prompt": "Output JSON: { \"acts\": [ { \"title\": \"The Story\", \"focus\": \"Hook\" } ] }"},
                 "medium": {"structure": "3 Acts.", "constraint": "Standard Length (400-600 words).", "acts_prompt": "Output JSON: { \"acts\": [ { \"title\": \"Hook\", \"focus\": \"Mystery\" }, { \"title\": \"Body\", \"focus\": \"Analysis\" }, { \"title\": \"Payoff\", \"focus\": \"Conclusion\" } ] }"},
@@ -2032,7 +4470,7 @@ async def create_documentary_stream(
 
             writer_conf = {"provider": writer_provider, "model": writer_model}
             critic_conf = {"provider": critic_provider, "model": critic_model}
-            logger = ProjectLogger(path, topic, writer_conf, critic_conf, duration, voice_config, voice_style)
+            logger = ProjectLogger(path, topic, writer_conf, critic_conf, duration, voice_config, voice_style, resume=bool(resume_id))
 
             pdf_gen = PDFGenerator()
             generated_files = []
@@ -2042,7 +4480,15 @@ async def create_documentary_stream(
             # NOVA LÓGICA: MODO MANUAL vs AI
             # ========================================
             
-            if script_mode == "manual" and manual_script.strip():
+            saved_script = manifest.get("script")
+            saved_acts = manifest.get("scripts", {})
+
+            if saved_script:
+                # ===== CHECKPOINT: roteiro completo já existe =====
+                full_script_data = saved_script
+                yield await send_log(f"♻️ Roteiro recuperado do checkpoint: {len(full_script_data)} atos")
+
+            elif script_mode == "manual" and manual_script.strip():
                 # ===== MODO MANUAL =====
                 yield await send_log("📝 Processando roteiro manual...")
                 
@@ -2070,6 +4516,12 @@ async def create_documentary_stream(
                 for i in range(0, len(paragraphs), scenes_per_act):
                     act_scenes_text = paragraphs[i:i+scenes_per_act]
                     act_title = f"Act {act_number}"
+
+                    if str(act_number - 1) in saved_acts:
+                        full_script_data.append(saved_acts[str(act_number - 1)])
+                        yield await send_log(f"♻️ {act_title}: recuperado do checkpoint")
+                        act_number += 1
+                        continue
                     
                     yield await send_log(f"🎭 {act_title}: {len(act_scenes_text)} cenas")
                     
@@ -2121,6 +4573,7 @@ async def create_documentary_stream(
                         "title": act_title,
                         "scenes": scenes_data
                     })
+                    manifest.set_item("scripts", act_number - 1, full_script_data[-1])
                     
                     act_number += 1
                 
@@ -2130,25 +4583,39 @@ async def create_documentary_stream(
                 # ===== MODO AI (ORIGINAL) =====
                 viral_brain = ViralBrain(writer_provider, writer_model, critic_provider, critic_model, duration, d_config)
                 
-                yield await send_log("🕵️ Pesquisando dados...")
-                with DDGS() as ddgs:
-                    facts = "\n".join([f"- {r['title']}: {r['body']}" for r in ddgs.text(topic, max_results=5)])
+                facts = manifest.get("research")
+                if facts is None:
+                    yield await send_log("🕵️ Pesquisando dados...")
+                    research_task = asyncio.ensure_future(research_topic(topic))
+                    async for beat in keep_alive_until(research_task):
+                        yield beat
+                    facts = research_task.result()
+                    manifest.set("research", facts)
+                else:
+                    yield await send_log("♻️ Pesquisa recuperada do checkpoint")
 
-                yield await send_log("🏗️ Arquitetura Viral...")
-                struct_prompt = f"Context: Viral Doc '{topic}'. Data: {facts}. {d_config['structure']} {d_config['acts_prompt']} LANGUAGE: ENGLISH ONLY."
+                acts = manifest.get("acts")
+                if acts is None:
+                    yield await send_log("🏗️ Arquitetura Viral...")
+                    struct_prompt = f"Context: Viral Doc '{topic}'. Data: {facts}. {d_config['structure']} {d_config['acts_prompt']} LANGUAGE: ENGLISH ONLY."
 
-                res = await generate_text(writer_provider, writer_model, struct_prompt)
-                if 'error' in res:
-                    yield await send_log(f"❌ Erro Inicial: {res['error']}")
-                    yield f"data: {json.dumps({'status': 'error', 'message': res['error']})}\n\n"
-                    return
-                
-                try: 
-                    acts = json.loads(res['text'].replace("```json","").replace("```","").strip())['acts']
-                except: 
-                    acts = [{"title": "Intro", "focus": "Start"}]
+                    res = await generate_text(writer_provider, writer_model, struct_prompt)
+                    if 'error' in res:
+                        yield await send_log(f"❌ Erro Inicial: {res['error']}")
+                        yield f"data: {json.dumps({'status': 'error', 'message': res['error']})}\n\n"
+                        return
+                    
+                    try: 
+                        acts = json.loads(res['text'].replace("```json","").replace("```","").strip())['acts']
+                    except: 
+                        acts = [{"title": "Intro", "focus": "Start"}]
+                    manifest.set("acts", acts)
 
                 for idx, act in enumerate(acts):
+                    if str(idx) in saved_acts:
+                        full_script_data.append(saved_acts[str(idx)])
+                        yield await send_log(f"♻️ Ato {idx+1}: {act['title']} (checkpoint)")
+                        continue
                     yield await send_log(f"🎬 Ato {idx+1}: {act['title']}...")
 
                     plan = None
@@ -2164,19 +4631,67 @@ async def create_documentary_stream(
 
                     if not plan: continue
                     full_script_data.append({"title": act['title'], "scenes": plan.get('scenes', [])})
+                    manifest.set_item("scripts", idx, full_script_data[-1])
+
+            if not saved_script:
+                manifest.set("script", full_script_data)
 
             # ========================================
             # RENDERIZAÇÃO (COMUM PARA AMBOS MODOS)
             # ========================================
             
-            for idx, act_data in enumerate(full_script_data):
-                scenes = act_data.get('scenes', [])
-                
-                for i, scene in enumerate(scenes):
+            # Todas as cenas de todos os atos produzem assets em paralelo;
+            # o consumo (render) continua na ordem ato/cena.
+            asset_jobs = start_asset_production(full_script_data, path, voice_config, voice_style, image_provider, project_seed, visual_style,
+                                                completed=manifest.get("assets"))
+            yield await send_log(f"⚡ Produzindo assets de {len(asset_jobs)} cenas em paralelo (máx. {ASSET_CONCURRENCY} simultâneas)...")
+
+            pending_renders = []
+            single_pass_jobs = []     # render único: (índice, cena, áudio, imagem, preparação no pool)
+            single_pass_output = None
+
+            async def collect_render(i, temp, render_future):
+                """Aguarda o render da cena, valida o arquivo e registra em generated_files"""
+                async for beat in keep_alive_until(render_future):
+                    yield beat
+                try:
+                    render_future.result()
+                    
+                    # Verificação do arquivo gerado
+                    if os.path.exists(temp):
+                        size = os.path.getsize(temp)
+                        yield await send_log(f"   📹 Arquivo gerado: {size/1024:.1f}KB")
+                        
+                        try:
+                            probe_cmd = ["ffprobe", "-v", "error", "-select_streams", "v:0",
+                                         "-show_entries", "stream=codec_name,width,height", 
+                                         "-of", "json", temp]
+                            result = await run_subprocess(probe_cmd, timeout=30)
+                            info = json.loads(result.stdout)
+                            if info.get('streams'):
+                                stream = info['streams'][0]
+                                yield await send_log(f"   🎥 Codec: {stream.get('codec_name')}, Resolução: {stream.get('width')}x{stream.get('height')}")
+                            else:
+                                yield await send_log(f"   ⚠️ AVISO: Vídeo sem stream de vídeo!")
+                        except subprocess.TimeoutExpired:
+                            yield await send_log(f"   ⏳ Verificação demorada, mas arquivo existe")
+                        except Exception as probe_e:
+                            yield await send_log(f"   ⚠️ Verificação ignorada: {str(probe_e)[:50]}")
+                    
+                    generated_files.append(temp)
+                    manifest.set_item("renders", os.path.basename(temp), "completed")
+                    yield await send_log(f"   ✅ Cena {i+1}: Completa!")
+                except Exception as e:
+                    yield await send_log(f"⚠️ Erro render cena {i+1}: {e}")
+
+            try:
+                for idx, i, total_scenes, asset_task in asset_jobs:
                     yield f": keep-alive\n\n"
-                    yield await send_log(f"   🎥 Cena {i+1}/{len(scenes)}: Produzindo assets...")
+                    yield await send_log(f"   🎥 Ato {idx+1} - Cena {i+1}/{total_scenes}: Aguardando assets...")
 
-                    result = await generate_visuals_and_audio(scene, i, idx, path, voice_config, voice_style, image_provider, project_seed, visual_style)
+                    async for beat in keep_alive_until(asset_task):
+                        yield beat
+                    result = asset_task.result()
 
                     if isinstance(result, dict) and "error" in result:
                         yield await send_log(f"❌ Erro Assets: {result['error']}")
@@ -2186,43 +4701,74 @@ async def create_documentary_stream(
 
                     audio_p, media_p, tts_u, vis_u = result
                     logger.log_event("cena_assets", "completed", {"tts": tts_u, "visual": vis_u})
-
-                    yield await send_log(f"   ⚡ Cena {i+1}: Renderizando ({SETTINGS['preset']}, {SETTINGS['fps']}fps)...")
-
-                    try:
-                        temp = os.path.join(path, f"scene_{idx}_{i}.mp4")
-                        render_scene_optimized(audio_p, media_p, temp, aspect_ratio)
-                        
-                        # Verificação do arquivo gerado
-                        if os.path.exists(temp):
-                            size = os.path.getsize(temp)
-                            yield await send_log(f"   📹 Arquivo gerado: {size/1024:.1f}KB")
-                            
-                            try:
-                                probe_cmd = ["ffprobe", "-v", "error", "-select_streams", "v:0",
-                                             "-show_entries", "stream=codec_name,width,height", 
-                                             "-of", "json", temp]
-                                result = subprocess.run(probe_cmd, capture_output=True, text=True, timeout=30)
-                                info = json.loads(result.stdout)
-                                if info.get('streams'):
-                                    stream = info['streams'][0]
-                                    yield await send_log(f"   🎥 Codec: {stream.get('codec_name')}, Resolução: {stream.get('width')}x{stream.get('height')}")
-                                else:
-                                    yield await send_log(f"   ⚠️ AVISO: Vídeo sem stream de vídeo!")
-                            except subprocess.TimeoutExpired:
-                                yield await send_log(f"   ⏳ Verificação demorada, mas arquivo existe")
-                            except Exception as probe_e:
-                                yield await send_log(f"   ⚠️ Verificação ignorada: {str(probe_e)[:50]}")
-                        
-                        generated_files.append(temp)
-                        yield await send_log(f"   ✅ Cena {i+1}: Completa!")
-                    except Exception as e:
-                        yield await send_log(f"⚠️ Erro render cena {i+1}: {e}")
+                    manifest.set_item("assets", f"{idx}_{i}", [audio_p, media_p, tts_u, vis_u])
+
+                    temp = os.path.join(path, f"scene_{idx}_{i}.mp4")
+                    if SETTINGS['single_pass']:
+                        # Render único: o pool só prepara legendas/duração; o encode acontece uma vez no final
+                        yield await send_log(f"   ⚡ Cena {i+1}: Preparando legendas para o render único...")
+                        single_pass_jobs.append((idx, i, audio_p, media_p,
+                                                 submit_scene_prepare(audio_p, media_p, f"{temp}.ass", aspect_ratio, whisper_model or None)))
+                        continue
+
+                    # Encode vai para o pool; as próximas cenas seguem baixando assets
+                    yield await send_log(f"   ⚡ Cena {i+1}: Na fila de render ({SETTINGS['preset']}, {SETTINGS['fps']}fps)...")
+                    pending_renders.append((i, temp, submit_scene_render(audio_p, media_p, temp, aspect_ratio, whisper_model or None)))
+
+                    # Reporta (em ordem) os renders que já terminaram
+                    while pending_renders and pending_renders[0][2].done():
+                        async for line in collect_render(*pending_renders.pop(0)):
+                            yield line
+
+                # Aguarda o restante do pipeline, ainda em ordem
+                while pending_renders:
+                    async for line in collect_render(*pending_renders.pop(0)):
+                        yield line
+
+                if single_pass_jobs:
+                    scene_specs = []
+                    for idx, i, _, _, prep_future in single_pass_jobs:
+                        async for beat in keep_alive_until(prep_future):
+                            yield beat
+                        try:
+                            scene_specs.append(prep_future.result())
+                        except Exception as e:
+                            yield await send_log(f"⚠️ Erro preparando cena {i+1}: {e}")
+
+                    yield await send_log(f"🎞️ Render único: {len(scene_specs)} cenas num só encode ({XFADE_TRANSITION})...")
+                    single_pass_output = os.path.join(path, "single_pass.mp4")
+                    started = time.time()
+                    single_task = start_scheduled(["full_encode"], run_blocking, render_documentary_single_pass, scene_specs, single_pass_output, aspect_ratio)
+                    async for beat in keep_alive_until(single_task):
+                        yield beat
+                    if single_task.result():
+                        logger.log_event("render_unico", "completed", {"cenas": len(scene_specs), "segundos": round(time.time() - started, 1)})
+                        yield await send_log(f"   ✅ Render único concluído em {time.time() - started:.1f}s")
+                    else:
+                        # Fallback: encode por cena + stitch, como no modo normal
+                        single_pass_output = None
+                        logger.log_event("render_unico", "failed")
+                        yield await send_log("⚠️ Render único falhou; renderizando cena a cena...")
+                        for idx, i, audio_p, media_p, _ in single_pass_jobs:
+                            temp = os.path.join(path, f"scene_{idx}_{i}.mp4")
+                            pending_renders.append((i, temp, submit_scene_render(audio_p, media_p, temp, aspect_ratio, whisper_model or None)))
+                        while pending_renders:
+                            async for line in collect_render(*pending_renders.pop(0)):
+                                yield line
+            finally:
+                # Aborto/erro: não deixa produção de assets órfã rodando
+                for *_, asset_task in asset_jobs:
+                    if not asset_task.done():
+                        asset_task.cancel()
+                for *_, render_future in pending_renders:
+                    render_future.cancel()
+                for *_, prep_future in single_pass_jobs:
+                    prep_future.cancel()
 
             # Salva PDF do roteiro
             if full_script_data:
                 try: 
-                    pdf_gen.save_script(path, topic, full_script_data)
+                    await run_blocking(pdf_gen.save_script, path, topic, full_script_data)
                 except: 
                     pass
 
@@ -2230,8 +4776,9 @@ async def create_documentary_stream(
             # FINALIZAÇÃO E CONCATENAÇÃO
             # ========================================
             
-            if generated_files:
-                yield await send_log(f"🧶 Costurando {len(generated_files)} cenas...")
+            if generated_files or single_pass_output:
+                if not single_pass_output:
+                    yield await send_log(f"🧶 Costurando {len(generated_files)} cenas...")
                 
                 # Geração de metadados YouTube
                 yield await send_log("🧠 Gerando SEO para YouTube (Título, Descrição, Tags)...")
@@ -2348,7 +4895,12 @@ OUTPUT FORMAT (VALID JSON ONLY - NO MARKDOWN):
 }}
 
     """
-                    seo_res = await generate_text(writer_provider, writer_model, seo_prompt)
+                    # SEO já gerado (checkpoint) não é pago de novo
+                    seo_res = manifest.get("seo")
+                    if seo_res is None:
+                        seo_res = await generate_text(writer_provider, writer_model, seo_prompt)
+                        if 'error' not in seo_res:
+                            manifest.set("seo", seo_res)
                     
                     try:
                         clean_json = seo_res['text'].replace("```json","").replace("```","").strip()
@@ -2376,40 +4928,57 @@ OUTPUT FORMAT (VALID JSON ONLY - NO MARKDOWN):
 
                 output_path = os.path.join(path, output_name)
 
-                success = stitch_video_files(generated_files, output_path)
+                saved_stitch = manifest.get("stitch")
+                already_final = (not single_pass_output and saved_stitch and saved_stitch.get("output") == output_name
+                                 and os.path.exists(output_path))
+                if single_pass_output:
+                    # Render único já saiu no formato final (baseline/yuv420p/faststart)
+                    os.replace(single_pass_output, output_path)
+                    success = True
+                elif already_final:
+                    yield await send_log("♻️ Vídeo final já costurado (checkpoint)")
+                    success = True
+                else:
+                    stitch_task = start_scheduled(["full_encode"], run_blocking, stitch_video_files, generated_files, output_path)
+                    async for beat in keep_alive_until(stitch_task):
+                        yield beat
+                    success = stitch_task.result()
                 
                 if success and os.path.exists(output_path) and os.path.getsize(output_path) > 1000:
-                    # Pós-processamento de compatibilidade
-                    yield await send_log("🔧 Otimizando compatibilidade do vídeo...")
-                    temp_output = output_path.replace(".mp4", "_temp.mp4")
-                    
-                    try:
-                        compat_cmd = [
-                            "ffmpeg", "-y", "-i", output_path,
-                            "-c:v", "libx264",
-                            "-preset", "fast",
-                            "-crf", "23",
-                            "-pix_fmt", "yuv420p",
-                            "-profile:v", "baseline",
-                            "-level", "3.0",
-                            "-movflags", "+faststart",
-                            "-c:a", "aac",
-                            "-b:a", "128k",
-                            "-ar", "44100",
-                            "-ac", "2",
-                            temp_output
-                        ]
-                        
-                        subprocess.run(compat_cmd, check=True, capture_output=True, text=True)
-                        os.remove(output_path)
-                        os.rename(temp_output, output_path)
-                        
-                        yield await send_log("✅ Vídeo otimizado para navegadores!")
-                    except Exception as e:
-                        yield await send_log(f"⚠️ Otimização ignorada: {str(e)}")
-                        if os.path.exists(temp_output):
-                            os.remove(temp_output)
+                    if single_pass_output:
+                        yield await send_log("✅ Render único: sem stitch nem re-encode de compatibilidade")
+                    elif already_final:
+                        pass
+                    else:
+                        # Pós-processamento de compatibilidade: só re-encoda o que não estiver no formato de entrega
+                        temp_output = output_path.replace(".mp4", "_temp.mp4")
+                        try:
+                            mode, reasons, probe = await run_blocking(encode_plan, output_path)
+                            yield await send_log(f"🔧 Compatibilidade: {mode} ({'; '.join(reasons)})")
+                            started = time.time()
+                            if mode != "skip":
+                                compat_task = start_scheduled(["full_encode" if mode == "full" else "remux"], run_subprocess,
+                                                              compat_command(mode, output_path, temp_output), check=True)
+                                async for beat in keep_alive_until(compat_task):
+                                    yield beat
+                                compat_task.result()
+                                os.remove(output_path)
+                                os.rename(temp_output, output_path)
+                            elapsed = time.time() - started
+                            saved = 0.0 if mode == "full" else max(0.0, estimated_full_encode_seconds(probe["duration"]) - elapsed)
+                            logger.log_event("compatibilidade", mode, {
+                                "motivos": reasons,
+                                "segundos": round(elapsed, 1),
+                                "economia_estimada_s": round(saved, 1)
+                            })
+                            yield await send_log(f"✅ Vídeo pronto para navegadores! ({elapsed:.1f}s, ~{saved:.0f}s economizados)")
+                        except Exception as e:
+                            yield await send_log(f"⚠️ Otimização ignorada: {str(e)}")
+                            if os.path.exists(temp_output):
+                                os.remove(temp_output)
                     
+                    manifest.set("stitch", {"output": output_name, "status": "completed"})
+
                     # Validação final
                     final_size = os.path.getsize(output_path)
                     yield await send_log(f"📊 Tamanho final: {final_size/1024/1024:.2f}MB")
@@ -2474,6 +5043,8 @@ OUTPUT FORMAT (VALID JSON ONLY - NO MARKDOWN):
                     }
                     
                     logger.finish("completed")
+                    manifest.set("final", final_data)
+                    manifest.finish("completed")
                     yield await send_log("🎉 VÍDEO FINALIZADO!")
 
                     if thumbnail_url:
@@ -2484,10 +5055,12 @@ OUTPUT FORMAT (VALID JSON ONLY - NO MARKDOWN):
 
                 else:
                     logger.finish("failed", "Falha ao concatenar vídeos")
+                    manifest.finish("failed")
                     yield await send_log("❌ Erro ao unir vídeos")
                     yield f"data: {json.dumps({'status': 'error', 'message': 'Falha na concatenação'})}\n\n"
             else:
                 logger.finish("failed")
+                manifest.finish("failed")
                 yield f"data: {json.dumps({'status': 'error', 'message': 'Nenhum clipe gerado'})}\n\n"
 
         except Exception as e:
@@ -2496,16 +5069,336 @@ OUTPUT FORMAT (VALID JSON ONLY - NO MARKDOWN):
             traceback.print_exc()
             yield await send_log(f"❌ Erro Fatal: {str(e)}")
             yield f"data: {json.dumps({'status': 'error', 'message': str(e)})}\n\n"
-    print("🔵 Retornando StreamingResponse...")
+    return event_generator()
+
+# ==========================================
+# OTIMIZAÇÃO #21: FILA DE JOBS (PRODUÇÃO DESACOPLADA DO NAVEGADOR)
+# ==========================================
+# /create-stream e POST /jobs só enfileiram (tipo "documentary" na fila SQLite); JOB_WORKERS
+# tasks em background produzem os vídeos. O SSE apenas observa: fechar a aba não para o job,
+# e um dia inteiro de vídeos pode ficar na fila.
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))   # jobs simultâneos (roteiro de um sobrepõe render de outro)
+JOB_POLL_INTERVAL = 1.0
+# Posse do job renovada por heartbeat: processo morto/travado => lease vence e outro worker
+# retoma do checkpoint (reiniciar um servidor não rouba jobs que outro ainda está rodando)
+JOB_LEASE = int(os.getenv("JOB_LEASE", "60"))
+
+def new_job_id():
+    """ID único e ordenável (dois jobs no mesmo segundo não colidem): 20260201_142001_a1b2c3"""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+def job_params(
+    topic: str, 
+    writer_provider: str, 
+    writer_model: str, 
+    critic_provider: str, 
+    critic_model: str, 
+    duration: str = "medium", 
+    voice_config: str = "edge_tts", 
+    voice_style: str = "documentary", 
+    aspect_ratio: str = "horizontal",
+    image_provider: str = "pollinations",
+    use_consistent_seed: bool = True,
+    visual_style: str = "documentary",
+    script_mode: str = "ai",
+    manual_script: str = "",
+    thumbnail_prompt: str = "",
+    whisper_model: str = ""
+):
+    """Parâmetros do job (query string), compartilhados por /create-stream e POST /jobs"""
+    return {
+        "topic": topic, "writer_provider": writer_provider, "writer_model": writer_model,
+        "critic_provider": critic_provider, "critic_model": critic_model, "duration": duration,
+        "voice_config": voice_config, "voice_style": voice_style, "aspect_ratio": aspect_ratio,
+        "image_provider": image_provider, "use_consistent_seed": use_consistent_seed,
+        "visual_style": visual_style, "script_mode": script_mode, "manual_script": manual_script,
+        "thumbnail_prompt": thumbnail_prompt, "whisper_model": whisper_model
+    }
+
+class JobEvents:
+    """
+    Eventos SSE de cada job: em memória (observadores ao vivo) e em projects/<id>/events.jsonl
+    (replay depois de reiniciar o servidor ou para quem chega atrasado).
+    Jobs terminados saem da memória após GRACE segundos; o replay passa a vir do disco.
+    """
+    FILENAME = "events.jsonl"
+    GRACE = int(os.getenv("JOB_EVENTS_GRACE", "300"))
+
+    def __init__(self):
+        self._jobs = {}
+
+    def _state(self, job_id):
+        state = self._jobs.get(job_id)
+        if state is None:
+            state = self._jobs[job_id] = {"events": [], "done": False, "changed": asyncio.Event(),
+                                          "unwritten": [], "flushing": False, "file": None}
+        return state
+
+    def _wake(self, state):
+        changed, state["changed"] = state["changed"], asyncio.Event()
+        changed.set()
+
+    def publish(self, job_id, event):
+        state = self._state(job_id)
+        state["events"].append(event)
+        state["unwritten"].append(event)
+        self._flush_later(job_id, state)
+        self._wake(state)
+
+    def finish(self, job_id):
+        state = self._state(job_id)
+        state["done"] = True
+        self._wake(state)
+        self._flush_later(job_id, state)   # fecha o arquivo depois da última escrita
+        self._evict_later(job_id, state)
+
+    def _flush_later(self, job_id, state):
+        """Disco fora do event loop: uma escrita por job de cada vez, em lote e na ordem dos eventos"""
+        if not state["flushing"]:
+            state["flushing"] = True
+            asyncio.ensure_future(self._flush(job_id, state))
+
+    def _append(self, job_id, state, events):
+        if state["file"] is None:
+            path = os.path.join(PROJECTS_DIR, job_id)
+            os.makedirs(path, exist_ok=True)
+            state["file"] = open(os.path.join(path, self.FILENAME), "a", encoding="utf-8")
+        state["file"].write("".join(json.dumps(event) + "\n" for event in events))
+        state["file"].flush()
+
+    async def _flush(self, job_id, state):
+        try:
+            while state["unwritten"]:
+                events, state["unwritten"] = state["unwritten"], []
+                await run_blocking(self._append, job_id, state, events)
+            if state["done"] and state["file"] is not None:
+                handle, state["file"] = state["file"], None
+                await run_blocking(handle.close)
+        except Exception as e:
+            print(f"⚠️ Falha ao gravar {self.FILENAME} do job {job_id}: {e}")
+        finally:
+            state["flushing"] = False
+
+    def _evict_later(self, job_id, state):
+        """Quem já acompanha segura a própria referência; só novos observadores relêem o disco"""
+        if state.get("evicting"):
+            return
+        state["evicting"] = True
+        def evict():
+            if self._jobs.get(job_id) is state:
+                del self._jobs[job_id]
+        asyncio.get_running_loop().call_later(self.GRACE, evict)
+
+    def reset(self, job_id):
+        """Nova execução do mesmo job (retomada): o histórico anterior vai para events.prev.jsonl"""
+        self._jobs.pop(job_id, None)
+        events_file = os.path.join(PROJECTS_DIR, job_id, self.FILENAME)
+        if os.path.exists(events_file):
+            os.replace(events_file, events_file.replace(".jsonl", ".prev.jsonl"))
+
+    def _load(self, job_id, done):
+        """Job que não está na memória (servidor reiniciou): recupera os eventos do disco"""
+        state = self._state(job_id)
+        events_file = os.path.join(PROJECTS_DIR, job_id, self.FILENAME)
+        if not state["events"] and os.path.exists(events_file):
+            with open(events_file, "r", encoding="utf-8") as f:
+                state["events"] = [json.loads(line) for line in f if line.strip()]
+        state["done"] = state["done"] or done
+        if state["done"]:
+            self._evict_later(job_id, state)
+        return state
+
+    async def follow(self, job_id):
+        """Replay + eventos novos até o job terminar (com keep-alive enquanto espera)"""
+        found = await run_blocking(task_queue.find, "documentary", "job_id", job_id)
+        if not found:
+            yield f"data: {json.dumps({'status': 'error', 'message': f'Job não encontrado: {job_id}'})}\n\n"
+            return
+        status = found[1]
+        # Primeiro evento: o id do job (o frontend usa para cancelar)
+        yield f"data: {json.dumps({'job_id': job_id})}\n\n"
+        if status == "pending":
+            position = await run_blocking(task_queue.count, "documentary")
+            yield await send_log(f"🎫 Job {job_id} na fila ({position} aguardando, {JOB_WORKERS} workers)")
+
+        state = self._load(job_id, done=status in ("done", "failed", "cancelled"))
+        index = 0
+        while True:
+            while index < len(state["events"]):
+                yield state["events"][index]
+                index += 1
+            if state["done"]:
+                return
+            try:
+                await asyncio.wait_for(state["changed"].wait(), KEEP_ALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+
+job_events = JobEvents()
+running_jobs = {}   # job_id -> asyncio.Task de run_job neste processo (para cancelar)
+
+JOB_CANCELLED_EVENT = f"data: {json.dumps({'status': 'error', 'cancelled': True, 'message': 'Job cancelado pelo usuário'})}\n\n"
+
+async def run_job(task_id, job, worker_id=None):
+    """Executa um job da fila publicando os eventos; o status final vai para a fila"""
+    job_id = job["job_id"]
+    # Job interrompido (crash/restart) com checkpoint: retoma em vez de recomeçar
+    resume = os.path.exists(os.path.join(PROJECTS_DIR, job_id, JobManifest.FILENAME))
+    outcome = None
+    try:
+        async for event in documentary_events(**job["params"], job_id=job_id, resume_id=job_id if resume else ""):
+            if event.startswith(":"):
+                continue  # keep-alive é por conexão (JobEvents.follow)
+            job_events.publish(job_id, event)
+            if event.startswith("data: "):
+                data = json.loads(event[6:])
+                if data.get("status") in ("done", "error"):
+                    outcome = data
+        if outcome and outcome.get("status") == "done":
+            await run_blocking(task_queue.complete, task_id, outcome, worker_id)
+        else:
+            await run_blocking(task_queue.fail, task_id, (outcome or {}).get("message", "job terminou sem resultado"), worker_id)
+    except asyncio.CancelledError:
+        # Quem cancelou (POST /jobs/<id>/cancel ou lease perdido) já avisou os observadores
+        print(f"🛑 Job {job_id} interrompido")
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        job_events.publish(job_id, f"data: {json.dumps({'status': 'error', 'message': str(e)})}\n\n")
+        await run_blocking(task_queue.fail, task_id, e, worker_id)
+    finally:
+        job_events.finish(job_id)
+
+async def job_worker(name):
+    worker_id = f"{name}@{os.getpid()}"
+    while True:
+        # Máquina saturada: o job continua na fila em vez de disputar CPU/RAM com os que já rodam
+        if not scheduler.has_headroom():
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+            continue
+        try:
+            claimed = await run_blocking(task_queue.claim, "documentary", worker_id, 1, JOB_LEASE)
+        except Exception as e:
+            print(f"⚠️ {worker_id}: erro na fila ({e})")
+            claimed = []
+        if not claimed:
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+            continue
+        task_id, job = claimed[0]
+        print(f"🏭 {worker_id}: iniciando job {job['job_id']}")
+        running = running_jobs[job["job_id"]] = asyncio.ensure_future(run_job(task_id, job, worker_id))
+        try:
+            with LeaseHeartbeat([task_id], worker_id, JOB_LEASE) as heartbeat:
+                while not running.done():
+                    await asyncio.wait([running], timeout=JOB_LEASE / 3)   # cancelar o job não derruba o worker
+                    if heartbeat.lost and not running.done():
+                        # Cancelado em outro processo ou re-despachado: este worker para de produzir
+                        print(f"⚠️ {worker_id}: job {job['job_id']} não é mais deste worker; parando")
+                        job_events.publish(job["job_id"], f"data: {json.dumps({'status': 'error', 'message': 'Job cancelado ou assumido por outro worker'})}\n\n")
+                        running.cancel()
+        finally:
+            running_jobs.pop(job["job_id"], None)
+
+@app.on_event("startup")
+async def start_job_workers():
+    # Jobs de um processo que caiu voltam sozinhos: o lease vence e o próximo claim retoma do checkpoint
+    for n in range(JOB_WORKERS):
+        asyncio.create_task(job_worker(f"job-worker-{n}"))
+
+BUSY_RETRY_AFTER = 60   # segundos sugeridos ao cliente quando o servidor recusa um job
+
+async def submit_job(params):
+    """Enfileira o job; retorna (job_id, None) ou (None, motivo) quando o servidor está ocupado"""
+    accepted, reason = scheduler.admission(await run_blocking(task_queue.count, "documentary"))
+    if not accepted:
+        print(f"🚦 Job recusado: {reason}")
+        return None, reason
+    job_id = new_job_id()
+    await run_blocking(task_queue.enqueue, "documentary", {"job_id": job_id, "params": params})
+    return job_id, None
+
+@app.post("/jobs")
+async def create_job(params: dict = Depends(job_params)):
+    """Enfileira um documentário. Progresso em GET /jobs/<job_id>/stream"""
+    job_id, busy = await submit_job(params)
+    if busy:
+        return JSONResponse(status_code=503, headers={"Retry-After": str(BUSY_RETRY_AFTER)},
+                            content={"status": "busy", "message": f"Servidor ocupado: {busy}",
+                                     "retry_after": BUSY_RETRY_AFTER})
+    return {"job_id": job_id, "stream": f"/jobs/{job_id}/stream",
+            "pending": await run_blocking(task_queue.count, "documentary")}
+
+@app.get("/jobs")
+async def list_jobs(limit: int = 50):
+    rows = await run_blocking(task_queue.list, "documentary", limit)
+    return {"workers": JOB_WORKERS, "jobs": [
+        {"job_id": payload["job_id"], "status": status, "topic": payload["params"].get("topic"),
+         "created_at": created, "finished_at": finished}
+        for _, status, payload, created, finished in rows
+    ]}
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancela um job na fila ou rodando (o botão Abort do frontend)"""
+    found = await run_blocking(task_queue.find, "documentary", "job_id", job_id)
+    if not found:
+        return JSONResponse(status_code=404, content={"status": "error", "message": f"Job não encontrado: {job_id}"})
+    task_id, status = found
+    if status not in ("pending", "running"):
+        return {"job_id": job_id, "status": status}
+    await run_blocking(task_queue.cancel, task_id)
+    job_events.publish(job_id, JOB_CANCELLED_EVENT)
+    running = running_jobs.get(job_id)
+    if running:
+        running.cancel()
+    else:
+        # Na fila (ou rodando em outro processo, que para pelo heartbeat): encerra os streams daqui
+        job_events.finish(job_id)
+    return {"job_id": job_id, "status": "cancelled"}
 
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+@app.get("/jobs/{job_id}/stream")
+async def observe_job(job_id: str):
+    """SSE só de observação: reconectar não reinicia nem duplica o job"""
+    return StreamingResponse(job_events.follow(job_id), media_type="text/event-stream")
+
+@app.get("/create-stream")
+async def create_documentary_stream(params: dict = Depends(job_params)):
+    """Compatível com o frontend: enfileira e já observa o job na mesma conexão"""
+    job_id, busy = await submit_job(params)
+    if busy:
+        # EventSource não expõe o corpo de um 503: a recusa vai como evento de erro
+        async def rejected():
+            yield f"data: {json.dumps({'status': 'error', 'busy': True, 'retry_after': BUSY_RETRY_AFTER, 'message': f'Servidor ocupado: {busy}. Tente em {BUSY_RETRY_AFTER}s.'})}\n\n"
+        return StreamingResponse(rejected(), media_type="text/event-stream")
+    return StreamingResponse(job_events.follow(job_id), media_type="text/event-stream")
+
+@app.get("/resume-stream/{project_id}")
+async def resume_documentary_stream(project_id: str):
+    """Retoma um job interrompido (queda do SSE / crash) a partir do job_manifest.json do projeto"""
+    path = os.path.join(PROJECTS_DIR, project_id)
+    manifest_file = os.path.join(path, JobManifest.FILENAME)
+    if not re.fullmatch(r"[\w-]+", project_id) or not os.path.exists(manifest_file):
+        async def not_found():
+            yield f"data: {json.dumps({'status': 'error', 'message': f'Checkpoint não encontrado: {project_id}'})}\n\n"
+        return StreamingResponse(not_found(), media_type="text/event-stream")
+
+    # Já na fila/rodando: só observa
+    found = await run_blocking(task_queue.find, "documentary", "job_id", project_id)
+    if not found or found[1] not in ("pending", "running"):
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            params = json.load(f)["params"]
+        await run_blocking(task_queue.enqueue, "documentary", {"job_id": project_id, "params": params})
+        job_events.reset(project_id)
+    return StreamingResponse(job_events.follow(project_id), media_type="text/event-stream")
 
 @app.get("/available-models")
-def get_available_models():
+async def get_available_models():
     models = {"gemini": [], "openai": []}
     if GEMINI_API_KEY:
         try:
-            data = requests.get(f"https://generativelanguage.googleapis.com/v1beta/models?key={GEMINI_API_KEY}", timeout=5).json()
+            r = await get_http_client("gemini").get(f"https://generativelanguage.googleapis.com/v1beta/models?key={GEMINI_API_KEY}", timeout=5)
+            data = r.json()
             if 'error' not in data:
                 blacklist = ["tts", "audio", "embedding", "aqa", "vision-only"]
                 for m in data.get('models', []):
@@ -2515,8 +5408,8 @@ def get_available_models():
         except: pass
     if OPENAI_API_KEY:
         try:
-            client = OpenAI(api_key=OPENAI_API_KEY)
-            for m in client.models.list().data:
+            page = await get_openai_client().models.list()
+            for m in page.data:
                 if m.id.startswith(("gpt-", "o1-")):
                     models["openai"].append({"id": m.id, "name": m.id})
             models["openai"].sort(key=lambda x: x['name'], reverse=True)
@@ -2524,7 +5417,7 @@ def get_available_models():
     return models
 
 @app.get("/available-voices")
-def get_available_voices():
+async def get_available_voices():
     """Retorna vozes e estilos disponíveis (Incluindo dinâmicas do ElevenLabs)"""
     voices = []
     
@@ -2554,7 +5447,7 @@ def get_available_voices():
             print("🔍 Buscando vozes na ElevenLabs...")
             url = "https://api.elevenlabs.io/v1/voices" 
             headers = {"xi-api-key": ELEVENLABS_API_KEY}
-            response = requests.get(url, headers=headers, timeout=10)
+            response = await get_http_client("elevenlabs").get(url, headers=headers, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -2627,6 +5520,24 @@ def get_available_voices():
         "styles": styles
     }
 
+@app.get("/cache-stats")
+def get_cache_stats():
+    """Contadores de hit/miss dos caches em disco (deste processo)"""
+    return {
+        "tts": tts_cache.stats(),
+        "images": image_cache.stats(),
+        "llm": llm_cache.stats()
+        # Whisper fica de fora: as consultas acontecem no pool de render, não neste processo
+    }
+
+@app.get("/scheduler-stats")
+async def get_scheduler_stats():
+    """Slots por etapa, leituras do psutil, fila de jobs, limitadores de taxa e hedging de imagens"""
+    return {**scheduler.stats(), "jobs_pending": await run_blocking(task_queue.count, "documentary"),
+            "job_queue_limit": JOB_QUEUE_LIMIT,
+            "providers": {name: limiter.stats() for name, limiter in _provider_limiters.items()},
+            "image_hedging": hedge_stats.stats()}
+
 @app.get("/available-image-providers")
 def get_available_image_providers():
     """Retorna providers de imagem disponíveis"""
@@ -6,13 +6,13 @@ import subprocess
 from dotenv import load_dotenv
 
 # --- IMPORTAÇÕES DO MAIN (REUTILIZAÇÃO) ---
-# Isso vai carregar o modelo Whisper e as configurações, 
-# mas não vai iniciar o servidor web. Pode demorar alguns segundos.
+# Isso carrega as configurações (o Whisper só é carregado se alguma legenda precisar),
+# mas não vai iniciar o servidor web.
 print("⏳ Carregando ferramentas do sistema principal...")
 try:
     from main import (
         generate_visuals_and_audio, 
-        render_scene_optimized, 
+        render_scene_cached, 
         stitch_video_files, 
         generate_text, 
         clean_text_for_tts,
@@ -91,8 +91,13 @@ async def recover_and_finish():
         print(f"❌ Pasta não encontrada: {base_path}")
         return
 
+    # Projetos novos têm checkpoint: a retomada continua o roteiro original sem refazer chamadas pagas
+    if os.path.exists(os.path.join(base_path, "job_manifest.json")):
+        print(f"💡 Este projeto tem job_manifest.json: prefira retomar com GET /resume-stream/{PROJECT_ID}")
+
     # 1. Escaneia o que já existe
-    existing_files = [f for f in os.listdir(base_path) if f.startswith("scene_") and f.endswith(".mp4")]
+    # *.tmp.mp4: render em andamento (ou interrompido) de um worker, ainda não publicado
+    existing_files = [f for f in os.listdir(base_path) if f.startswith("scene_") and f.endswith(".mp4") and ".tmp." not in f]
     existing_files.sort(key=natural_sort_key)
     
     print(f"\n📂 Encontrados {len(existing_files)} clipes renderizados.")
@@ -160,7 +165,7 @@ async def recover_and_finish():
                     
                     print(f"⚡ Renderizando Cena Final {i+1}...")
                     try:
-                        render_scene_optimized(audio_p, media_p, output_path, ASPECT_RATIO)
+                        render_scene_cached(audio_p, media_p, output_path, ASPECT_RATIO)
                         if os.path.exists(output_path):
                             new_files.append(output_path)
                             print("✅ Cena salva!")
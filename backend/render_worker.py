@@ -0,0 +1,114 @@
+# Salve como: backend/render_worker.py
+# Worker de render: processo (em qualquer host Linux) que consome a fila "render" e renderiza
+# cenas com render_scene_cached. Vários workers em várias máquinas = render em paralelo.
+#
+# Uso (a partir da raiz do repositório):
+#   PROJECTS_DIR=/mnt/shared/projects TASK_QUEUE_PATH=/mnt/shared/tasks.sqlite3 \
+#   TASK_QUEUE_JOURNAL_MODE=DELETE python backend/render_worker.py [threads]
+# E no servidor: RENDER_BACKEND=queue (mesmas PROJECTS_DIR / TASK_QUEUE_PATH)
+import os
+import sys
+import time
+import signal
+import socket
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import main
+from main import (task_queue, render_scene_cached, scene_work_path, publish_scene_render, discard_scene_render,
+                  local_path, shared_path, LeaseHeartbeat)
+
+# --- CONFIGURAÇÃO ---
+THREADS = int(sys.argv[1]) if len(sys.argv) > 1 else max(1, multiprocessing.cpu_count() - 1)
+POLL_INTERVAL = 1.0      # espera entre consultas quando a fila está vazia
+LEASE = 60.0             # sem heartbeat por esse tempo, a cena volta para a fila (worker morto)
+
+WORKER_ID = f"render@{socket.gethostname()}:{os.getpid()}"
+
+def apply_coordinator_profile(payload):
+    """Renderiza com o perfil do coordenador: todas as cenas do vídeo saem iguais (concat por cópia)"""
+    main.CURRENT_PROFILE = payload["profile"]
+    main.SETTINGS.update(payload["settings"])
+
+def render_task(payload, output_path, work_path):
+    """Roda no processo de render: MP4 e manifesto vão para work_path (publicados depois)"""
+    apply_coordinator_profile(payload)
+    return render_scene_cached(local_path(payload["audio"]), local_path(payload["media"]), output_path,
+                               payload["aspect_ratio"], THREADS, payload.get("whisper_model"), work_path)
+
+class RenderProcess:
+    """
+    Processo de render de vida longa (o Whisper continua carregado entre cenas) num grupo de
+    processos próprio: kill() derruba ele e o ffmpeg que estiver codificando.
+    """
+    def __init__(self):
+        self._pool = None
+        self.pid = None
+
+    def submit(self, *args):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=1, initializer=os.setpgrp)
+            self.pid = self._pool.submit(os.getpid).result()
+        return self._pool.submit(render_task, *args)
+
+    def kill(self):
+        if self._pool is None:
+            return
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self._pool.shutdown(wait=True)
+        self._pool = None
+
+def run_worker():
+    print(f"🖥️ Worker de render iniciado ({WORKER_ID}), {THREADS} threads, lease {LEASE:.0f}s")
+    print(f"   Projetos: {os.path.abspath(main.PROJECTS_DIR)} | Fila: {os.path.abspath(main.TASK_QUEUE_PATH)}")
+    renderer = RenderProcess()
+    while True:
+        claimed = task_queue.claim("render", WORKER_ID, limit=1, lease=LEASE)
+        if not claimed:
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        task_id, payload = claimed[0]
+        output_path = local_path(payload["output"])
+        # Caminho só deste worker: uma re-despachada da mesma cena não escreve no mesmo arquivo
+        work_path = scene_work_path(output_path, WORKER_ID)
+        print(f"🎬 Tarefa {task_id}: {payload['output']}")
+        started = time.time()
+        with LeaseHeartbeat([task_id], WORKER_ID, LEASE) as heartbeat:
+            future = renderer.submit(payload, output_path, work_path)
+            while not wait([future], timeout=POLL_INTERVAL).done:
+                if task_id in heartbeat.lost:
+                    # Re-despachada ou cancelada: para o encode agora em vez de gastar CPU à toa
+                    renderer.kill()
+                    break
+            try:
+                rendered = future.result()
+                error = None
+            except BrokenProcessPool as e:
+                error = e
+                renderer.kill()   # processo morreu (OOM?): a próxima cena sobe um novo
+            except Exception as e:
+                error = e
+            # Posse confirmada na hora da troca (o heartbeat em background pode estar atrasado)
+            owned = task_id not in heartbeat.lost and task_queue.heartbeat(task_id, WORKER_ID, LEASE)
+            if owned and not error and rendered == work_path:
+                publish_scene_render(work_path, output_path)
+
+        discard_scene_render(work_path)
+        if not owned:
+            # Re-despachada ou cancelada enquanto renderizava: o resultado não é mais nosso
+            print(f"⚠️ Tarefa {task_id}: posse perdida, resultado descartado")
+        elif error:
+            task_queue.fail(task_id, error, worker_id=WORKER_ID)
+            print(f"❌ Tarefa {task_id} falhou: {error}")
+        else:
+            task_queue.complete(task_id, {"output": shared_path(output_path), "worker": WORKER_ID,
+                                          "seconds": round(time.time() - started, 1)}, worker_id=WORKER_ID)
+            print(f"✅ Tarefa {task_id} em {time.time() - started:.1f}s")
+
+if __name__ == "__main__":
+    run_worker()
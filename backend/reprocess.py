@@ -3,7 +3,7 @@ import os
 import sys
 import glob
 # Importa configurações do main original
-from main import render_scene_optimized, stitch_video_files, PROJECTS_DIR, whisper
+from main import render_scene_cached, stitch_video_files, PROJECTS_DIR
 
 # --- CONFIGURAÇÃO ---
 # Se não passar ID via comando, usa este:
@@ -22,10 +22,10 @@ def reprocess_project(pid):
     print(f"🔄 Reprocessando projeto: {pid}")
     print(f"📂 Diretório: {project_path}")
     
-    # 1. Forçar modelo Whisper melhor
-    print(f"⏳ Carregando Whisper '{FORCED_MODEL}'...")
+    # 1. Forçar modelo Whisper melhor (carregado sob demanda na primeira legenda)
+    print(f"⏳ Usando Whisper '{FORCED_MODEL}'...")
     import main
-    main.whisper_model = whisper.load_model(FORCED_MODEL)
+    main.SETTINGS['whisper_model'] = FORCED_MODEL
 
     # 2. Listar arquivos de áudio
     audio_files = sorted(glob.glob(os.path.join(project_path, "*.mp3")))
@@ -67,7 +67,8 @@ def reprocess_project(pid):
         
         try:
             print(f"🎬 Renderizando: {filename_base}...")
-            video_path = render_scene_optimized(
+            # Cenas com mesmo áudio/imagem/config do último reprocessamento são reaproveitadas
+            video_path = render_scene_cached(
                 audio_path, 
                 media_path, 
                 output_scene_path, 
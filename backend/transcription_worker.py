@@ -0,0 +1,106 @@
+# Salve como: backend/transcription_worker.py
+# Worker de transcrição: processo separado que consome a fila "transcribe" (SQLite)
+# e roda o Whisper em lote para várias cenas/jobs de uma vez.
+#
+# Uso (a partir da raiz do repositório, como o servidor):
+#   python backend/transcription_worker.py [tamanho_do_lote]
+# E no servidor: TRANSCRIPTION_BACKEND=worker
+# Em outro host: mesmas PROJECTS_DIR / TASK_QUEUE_PATH apontando para o disco compartilhado.
+import os
+import sys
+import time
+import socket
+import numpy as np
+
+from main import task_queue, get_whisper_model, compact_segments, local_path, LeaseHeartbeat
+
+# --- CONFIGURAÇÃO ---
+BATCH_SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+POLL_INTERVAL = 0.5          # espera entre consultas quando a fila está vazia
+BATCH_WINDOW = 1.0           # espera curta para juntar mais cenas no mesmo lote
+SILENCE_GAP = 1.0            # silêncio (s) entre áudios concatenados: evita palavras cruzando cenas
+SAMPLE_RATE = 16000          # taxa do Whisper
+LEASE = 120.0                # sem heartbeat por esse tempo, o lote volta para a fila
+
+WORKER_ID = f"transcriber@{socket.gethostname()}:{os.getpid()}"
+
+def split_words_by_clip(segments, offsets, durations):
+    """Devolve os segmentos de cada áudio com tempos relativos ao início do próprio áudio"""
+    per_clip = [[] for _ in offsets]
+    for seg in segments:
+        current = {}  # clip -> palavras deste segmento
+        for word in seg.get("words", []):
+            for k, (offset, duration) in enumerate(zip(offsets, durations)):
+                if offset <= word["start"] < offset + duration + SILENCE_GAP:
+                    current.setdefault(k, []).append({
+                        "word": word["word"],
+                        "start": round(max(0.0, word["start"] - offset), 3),
+                        "end": round(min(duration, word["end"] - offset), 3)
+                    })
+                    break
+        for k, words in current.items():
+            per_clip[k].append({"words": words})
+    return per_clip
+
+def transcribe_batch(tasks):
+    """Concatena os áudios (com silêncio entre eles) e faz uma só passada do Whisper"""
+    import whisper
+
+    model_name = tasks[0][1]["model"]
+    options = tasks[0][1]["options"]
+    model = get_whisper_model(model_name)
+
+    pieces, offsets, durations = [], [], []
+    cursor = 0.0
+    gap = np.zeros(int(SILENCE_GAP * SAMPLE_RATE), dtype=np.float32)
+    for _, payload in tasks:
+        audio = whisper.load_audio(local_path(payload["audio_path"]), sr=SAMPLE_RATE)
+        offsets.append(cursor)
+        durations.append(len(audio) / SAMPLE_RATE)
+        pieces.extend([audio, gap])
+        cursor += len(audio) / SAMPLE_RATE + SILENCE_GAP
+
+    result = model.transcribe(np.concatenate(pieces), **options)
+    return split_words_by_clip(compact_segments(result["segments"]), offsets, durations)
+
+def group_by_config(claimed):
+    """Só cenas com mesmo modelo/opções podem dividir uma passada"""
+    groups = {}
+    for task_id, payload in claimed:
+        key = (payload["model"], repr(sorted(payload["options"].items())))
+        groups.setdefault(key, []).append((task_id, payload))
+    return groups.values()
+
+def run_worker():
+    print(f"🎧 Worker de transcrição iniciado ({WORKER_ID}), lote máximo: {BATCH_SIZE}")
+    while True:
+        claimed = task_queue.claim("transcribe", WORKER_ID, limit=BATCH_SIZE, lease=LEASE)
+        if not claimed:
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        # Lote pequeno: espera um pouco por mais cenas (render de várias cenas em paralelo)
+        if len(claimed) < BATCH_SIZE:
+            time.sleep(BATCH_WINDOW)
+            claimed += task_queue.claim("transcribe", WORKER_ID, limit=BATCH_SIZE - len(claimed), lease=LEASE)
+
+        # Heartbeat de todas as tarefas do lote enquanto o Whisper roda
+        with LeaseHeartbeat([task_id for task_id, _ in claimed], WORKER_ID, LEASE):
+            for batch in group_by_config(claimed):
+                started = time.time()
+                try:
+                    results = transcribe_batch(batch)
+                    for (task_id, _), segments in zip(batch, results):
+                        task_queue.complete(task_id, segments, worker_id=WORKER_ID)
+                    print(f"✅ Lote de {len(batch)} áudios transcrito em {time.time() - started:.1f}s")
+                except Exception as e:
+                    print(f"⚠️ Lote falhou ({e}); transcrevendo individualmente")
+                    # Um áudio ruim não derruba o lote inteiro
+                    for task_id, payload in batch:
+                        try:
+                            task_queue.complete(task_id, transcribe_batch([(task_id, payload)])[0], worker_id=WORKER_ID)
+                        except Exception as single_e:
+                            task_queue.fail(task_id, single_e, worker_id=WORKER_ID)
+
+if __name__ == "__main__":
+    run_worker()
@@ -209,6 +209,7 @@ export default function MagnateAI() {
   const [logs, setLogs] = useState([]);
   const [videoUrl, setVideoUrl] = useState(null);
   const eventSourceRef = useRef(null);
+  const jobIdRef = useRef(null);
   const [youtubeMetadata, setYoutubeMetadata] = useState(null);
 
   // Estado para thumbnail_prompt
@@ -286,6 +287,7 @@ export default function MagnateAI() {
     setLogs([]);
     setYoutubeMetadata(null);
     if (eventSourceRef.current) eventSourceRef.current.close();
+    jobIdRef.current = null;
 
     const params = new URLSearchParams({
       topic: scriptMode === 'ai' ? topic : 'Custom Script',
@@ -312,6 +314,7 @@ export default function MagnateAI() {
     es.onmessage = (event) => {
       if (event.data.startsWith(":")) return;
       const data = JSON.parse(event.data);
+      if (data.job_id) jobIdRef.current = data.job_id;
       if (data.youtube_metadata) setYoutubeMetadata(data.youtube_metadata);
       if (data.log) {
         setLogs(prev => [...prev, { 
@@ -345,6 +348,11 @@ export default function MagnateAI() {
   const handleAbort = () => {
     if (eventSourceRef.current) {
       eventSourceRef.current.close();
+      // Fechar o SSE só para de observar: o job roda no servidor até ser cancelado
+      if (jobIdRef.current) {
+        axios.post(`http://localhost:8000/jobs/${jobIdRef.current}/cancel`).catch(() => {});
+        jobIdRef.current = null;
+      }
       setLogs(prev => [...prev, { 
         text: "🛑 Sequence Aborted by User.",
         time: new Date().toLocaleTimeString([], {hour12:false, hour:'2-digit', minute:'2-digit', second:'2-digit'})